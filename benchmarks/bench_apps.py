@@ -0,0 +1,91 @@
+"""
+Fuzzy app matching latency of the cached app catalog, using generated
+.desktop files so it runs on Linux without AppOpener. Also times a cold
+catalog build, a warm start from the persisted catalog, and a fresh
+AppOpener-style difflib scan over the same names for comparison.
+
+    python benchmarks/bench_apps.py --apps 2000
+"""
+import os
+import sys
+import time
+import random
+import difflib
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines.app_catalog import AppCatalog, DesktopFileSource
+from metrics import percentile
+
+WORDS = ("visual studio code microsoft word excel powerpoint google chrome mozilla firefox spotify discord "
+         "steam minecraft launcher adobe photoshop acrobat reader notepad calculator terminal settings "
+         "file explorer obs studio zoom teams slack vlc media player blender gimp inkscape").split()
+
+
+def write_desktop_files(directory, count, rng):
+    names = set()
+    while len(names) < count:
+        names.add(" ".join(w.capitalize() for w in rng.sample(WORDS, rng.randint(1, 3))) + f" {len(names)}")
+    for i, name in enumerate(sorted(names)):
+        with open(os.path.join(directory, f"app{i}.desktop"), "w", encoding="utf-8") as f:
+            f.write(f"[Desktop Entry]\nType=Application\nName={name}\nExec=/usr/bin/true %U\n")
+    return sorted(names)
+
+
+def typo(name, rng):
+    """What a user might say: a prefix, a word or two, or a misspelling"""
+    words = name.lower().split()[:-1]
+    kind = rng.random()
+    if kind < 0.3:
+        return words[0][:rng.randint(3, len(words[0]))]
+    if kind < 0.6:
+        return " ".join(rng.sample(words, min(2, len(words))))
+    word = rng.choice(words)
+    i = rng.randrange(len(word))
+    return " ".join(words).replace(word, word[:i] + word[i + 1:], 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", type=int, default=2_000)
+    parser.add_argument("--queries", type=int, default=1_000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        apps_dir = os.path.join(tmp, "applications")
+        os.makedirs(apps_dir)
+        names = write_desktop_files(apps_dir, args.apps, rng)
+        cache = os.path.join(tmp, "app_catalog.json")
+
+        started = time.perf_counter()
+        AppCatalog(DesktopFileSource([apps_dir]), cache_file=cache, aliases_file=None)
+        cold_s = time.perf_counter() - started
+        started = time.perf_counter()
+        catalog = AppCatalog(DesktopFileSource([apps_dir]), cache_file=cache, aliases_file=None)
+        warm_s = time.perf_counter() - started
+
+        queries = [typo(rng.choice(names), rng) for _ in range(args.queries)]
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            catalog.match(query)
+            latencies.append(time.perf_counter() - started)
+
+        lowered = [name.lower() for name in names]
+        scan = []
+        for query in queries[:100]:
+            started = time.perf_counter()
+            difflib.get_close_matches(query, lowered, n=1, cutoff=0.0)
+            scan.append(time.perf_counter() - started)
+
+        print(f"{args.apps} apps: cold build {cold_s * 1e3:.1f}ms, warm start from cache {warm_s * 1e3:.1f}ms")
+        print(f"catalog match over {args.queries} queries: p50={percentile(latencies, 50) * 1e3:.3f}ms "
+              f"p95={percentile(latencies, 95) * 1e3:.3f}ms")
+        print(f"difflib scan (AppOpener-style) over 100 queries: p50={percentile(scan, 50) * 1e3:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Insert latency and memory over a long chat session: SessionLog appends and
+page reads, and (when a display is available) ChatView rendering into a
+real tk.Text, compared with the old unbounded insert-and-see approach.
+
+    python benchmarks/bench_chat_view.py --messages 10000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_log import SessionLog
+from metrics import percentile, process_memory_mb
+
+
+def make_message(rng):
+    return " ".join("lorem ipsum dolor sit amet consectetur adipiscing elit".split()[rng.randrange(8)]
+                    for _ in range(rng.randint(5, 120)))
+
+
+def report(label, latencies, chunk):
+    """p95 insert latency for each `chunk` of messages, to show whether it stays flat"""
+    p95s = [percentile(latencies[i:i + chunk], 95) * 1e3 for i in range(0, len(latencies), chunk)]
+    print(f"{label}: p50={percentile(latencies, 50) * 1e3:.3f}ms, p95 per {chunk} messages: "
+          + " ".join(f"{value:.2f}" for value in p95s))
+
+
+def bench_log(messages, tmp, rng):
+    log = SessionLog(os.path.join(tmp, "session.jsonl"))
+    latencies = []
+    for i in range(messages):
+        started = time.perf_counter()
+        log.append("user" if i % 2 else "assistant", make_message(rng))
+        latencies.append(time.perf_counter() - started)
+    report("SessionLog.append", latencies, messages // 5)
+
+    reads = []
+    for _ in range(500):
+        start = rng.randrange(len(log))
+        started = time.perf_counter()
+        log.read(start, start + 50)
+        reads.append(time.perf_counter() - started)
+    print(f"SessionLog.read 50-message page: p50={percentile(reads, 50) * 1e3:.3f}ms "
+          f"p95={percentile(reads, 95) * 1e3:.3f}ms")
+
+    started = time.perf_counter()
+    log.close()
+    reopened = SessionLog(log.path)
+    print(f"reopen {len(reopened)} messages: {(time.perf_counter() - started) * 1e3:.1f}ms")
+    reopened.close()
+
+
+def bench_tk(messages, tmp, rng):
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        print(f"Tk rendering skipped: {e}")
+        return
+    from chat_view import ChatView
+
+    root.withdraw()
+    text = tk.Text(root)
+    text.pack()
+    view = ChatView(text, SessionLog(os.path.join(tmp, "view.jsonl")))
+    latencies = []
+    for i in range(messages):
+        started = time.perf_counter()
+        view.add("user" if i % 2 else "assistant", make_message(rng))
+        root.update_idletasks()
+        latencies.append(time.perf_counter() - started)
+    report(f"ChatView.add (max {view.max_rendered} rendered)", latencies, messages // 5)
+    print(f"  memory after {messages} messages: {process_memory_mb()} MB")
+
+    unbounded = tk.Text(root)
+    unbounded.pack()
+    latencies = []
+    for i in range(messages):
+        started = time.perf_counter()
+        unbounded.insert(tk.END, "\nYou\n" + make_message(rng) + "\n\n")
+        unbounded.see(tk.END)
+        root.update_idletasks()
+        latencies.append(time.perf_counter() - started)
+    report("unbounded tk.Text insert", latencies, messages // 5)
+    print(f"  memory after {messages} messages: {process_memory_mb()} MB")
+    root.destroy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=10_000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_log(args.messages, tmp, rng)
+        bench_tk(args.messages, tmp, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Index size and embedding time with and without near-duplicate collapsing
+at ingest (MinHash + LSH, engines/dedup.py).
+
+Two corpora:
+
+  - the chunks already indexed in data/College_PDFs/index_data.json, scanned
+    for near-duplicates at several thresholds (no re-embedding)
+  - generated lecture files where every file repeats a syllabus header,
+    a page footer and a share of slides copied from other lectures, run
+    through the ingestion pipeline with and without dedup
+
+Embedding uses the hash embedder by default; pass --embedder all-MiniLM-L6-v2
+for real embedding times.
+
+    python benchmarks/bench_dedup.py --files 12 --slides 40 --repeat-share 0.3
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines.dedup import MinHasher, NearDuplicateIndex
+from engines.ingest_worker import IngestJob
+
+INDEX_META = os.path.join("data", "College_PDFs", "index_data.json")
+
+
+def scan_index(meta_file, thresholds):
+    with open(meta_file, "r", encoding="utf-8") as f:
+        chunks = json.load(f)["chunks"]
+    hasher = MinHasher()
+    started = time.perf_counter()
+    signatures = [hasher.signature(chunk) for chunk in chunks]
+    elapsed = time.perf_counter() - started
+    print(f"{meta_file}: {len(chunks)} chunks, signatures in {elapsed:.2f}s")
+    for threshold in thresholds:
+        index = NearDuplicateIndex(num_perm=hasher.num_perm, threshold=threshold)
+        duplicates = 0
+        for chunk_id, signature in enumerate(signatures):
+            if index.find(signature) is None:
+                index.add(chunk_id, signature)
+            else:
+                duplicates += 1
+        print(f"  threshold {threshold:.1f}: {duplicates} near-duplicates ({duplicates / max(len(chunks), 1):.1%})")
+
+
+def make_lectures(directory, files, slides, repeat_share, rng):
+    words = [f"term{i}" for i in range(3000)] + "the of and a to in is for on that".split() * 100
+
+    def paragraph(n=160):
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    header = "Course syllabus. Attendance policy. Grading: 40% exams, 30% projects. " + paragraph(120)
+    footer = "Department of Computer Science - for enrolled students only. " + paragraph(40)
+    shared = [paragraph() for _ in range(slides)]
+    paths = []
+    for i in range(files):
+        pages = [header]
+        for _ in range(slides):
+            # Lightly edited copies still count as near-duplicates
+            slide = rng.choice(shared) if rng.random() < repeat_share else paragraph()
+            pages.append(slide.replace("term1 ", "term2 ", 1) + "\n" + footer)
+        path = os.path.join(directory, f"lecture_{i}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n\n".join(pages))
+        paths.append(path)
+    return paths
+
+
+def run_ingest(paths, embedder, threshold):
+    started = time.perf_counter()
+    result = IngestJob(paths, embedder=embedder, dedup_threshold=threshold, in_process=True).start().wait()
+    elapsed = time.perf_counter() - started
+    info = result.info
+    result.cleanup()
+    return info, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", default=INDEX_META, help="index metadata to scan (skipped if missing)")
+    parser.add_argument("--files", type=int, default=12)
+    parser.add_argument("--slides", type=int, default=40, help="slides per generated lecture")
+    parser.add_argument("--repeat-share", type=float, default=0.3, help="share of slides copied from other lectures")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--embedder", default="hash:384")
+    args = parser.parse_args()
+
+    if os.path.exists(args.index):
+        scan_index(args.index, (0.8, 0.7, 0.5))
+    else:
+        print(f"{args.index}: not found, skipping")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_lectures(tmp, args.files, args.slides, args.repeat_share, random.Random(0))
+        base, base_elapsed = run_ingest(paths, args.embedder, None)
+        dedup, dedup_elapsed = run_ingest(paths, args.embedder, args.threshold)
+
+    print(f"generated corpus: {args.files} files")
+    print(f"  without dedup: {base['chunks']} chunks, embed {base['embed_seconds']:.2f}s, total {base_elapsed:.2f}s")
+    print(f"  with dedup:    {dedup['chunks']} chunks (+{dedup['duplicates']} collapsed), "
+          f"embed {dedup['embed_seconds']:.2f}s, minhash {dedup['dedup_seconds']:.2f}s, total {dedup_elapsed:.2f}s")
+    print(f"  index {1 - dedup['chunks'] / max(base['chunks'], 1):.1%} smaller, "
+          f"embedding time saved {base['embed_seconds'] - dedup['embed_seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Event-loop lag in the GUI process while documents are ingested, with the
+old in-process indexing thread versus the ingestion worker process.
+
+A probe thread stands in for the Tk mainloop: it asks to wake every 10 ms
+and records how late it actually runs. Documents are generated text files
+and embedding uses the dependency-free hash embedder, so the run needs
+neither PyMuPDF nor sentence-transformers; pass --embedder all-MiniLM-L6-v2
+to include the real model.
+
+    python benchmarks/bench_ingest.py --files 20 --kb 300
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines.ingest_worker import IngestJob, chunk_text, extract_text, load_embedder
+from metrics import percentile
+
+TICK = 0.01
+
+
+class LagProbe:
+    def __init__(self):
+        self.lags = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            time.sleep(TICK)
+            self.lags.append(max(0.0, time.perf_counter() - started - TICK))
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self):
+        return (f"lag p50={percentile(self.lags, 50) * 1e3:.1f}ms p95={percentile(self.lags, 95) * 1e3:.1f}ms "
+                f"max={max(self.lags) * 1e3:.1f}ms")
+
+
+def make_documents(directory, files, kb, rng):
+    words = [f"term{i}" for i in range(5000)] + "the of and a to in is for on that".split() * 200
+    paths = []
+    for i in range(files):
+        path = os.path.join(directory, f"lecture_{i}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            size = 0
+            while size < kb * 1024:
+                line = " ".join(rng.choice(words) for _ in range(20)) + "\n"
+                f.write(line)
+                size += len(line)
+        paths.append(path)
+    return paths
+
+
+def ingest_in_thread(paths, embedder_name):
+    """What start_background_pdf_indexing used to do: everything on a thread in this process"""
+    embedder = load_embedder(embedder_name)
+    chunks, sources, embeddings = [], [], []
+    for path in paths:
+        pieces = chunk_text(extract_text(path), 1000, 200)
+        for start in range(0, len(pieces), 32):
+            embeddings.extend(embedder.encode(pieces[start:start + 32]))
+        chunks.extend(pieces)
+        sources.extend([os.path.basename(path)] * len(pieces))
+    return len(chunks)
+
+
+def timed(label, fn):
+    result = {}
+    with LagProbe() as probe:
+        started = time.perf_counter()
+        worker = threading.Thread(target=lambda: result.setdefault("chunks", fn()))
+        worker.start()
+        worker.join()
+        elapsed = time.perf_counter() - started
+    print(f"{label}: {result.get('chunks')} chunks in {elapsed:.2f}s, {probe.summary()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--kb", type=int, default=300, help="size of each generated document")
+    parser.add_argument("--embedder", default="hash:384")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_documents(tmp, args.files, args.kb, random.Random(0))
+        with LagProbe() as idle:
+            time.sleep(1.0)
+        print(f"idle: {idle.summary()}")
+
+        timed("in-process thread", lambda: ingest_in_thread(paths, args.embedder))
+
+        def worker():
+            result = IngestJob(paths, embedder=args.embedder).start().wait()
+            count = result.count
+            result.cleanup()
+            return count
+        timed("worker process", worker)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Lookup latency of the note store with a large number of notes.
+
+    python benchmarks/bench_notes.py --notes 100000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines.note_store import NoteStore
+from metrics import percentile
+
+COMMON = ("meeting project deadline groceries call mom dentist invoice python exam lecture "
+          "minecraft house birthday gift flight hotel budget report review gym run book "
+          "movie recipe pasta garden paint car insurance tax email slides demo").split()
+
+
+def vocabulary(size, rng):
+    """Common words plus a long tail of rarer ones, roughly like real notes"""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return COMMON + ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+def zipf_choice(words, rng):
+    return words[min(len(words) - 1, int(rng.paretovariate(0.6)) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=1_000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    words = vocabulary(20_000, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NoteStore(db_path=os.path.join(tmp, "notes.db"), text_file=os.path.join(tmp, "notes.txt"),
+                          flush_every=1000, flush_interval=None)
+        started = time.perf_counter()
+        for i in range(args.notes):
+            store.add(f"note {i}: " + " ".join(zipf_choice(words, rng) for _ in range(8)))
+        store.flush()
+        insert_s = time.perf_counter() - started
+
+        queries = [" ".join(zipf_choice(words, rng) for _ in range(rng.choice((1, 2, 3))))
+                   for _ in range(args.queries)]
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            store.search(query)
+            latencies.append(time.perf_counter() - started)
+
+        print(f"fts5={store.fts}: {args.notes} notes inserted in {insert_s:.2f}s "
+              f"({insert_s / args.notes * 1e6:.1f} us/note, batched)")
+        print(f"search over {args.queries} queries: p50={percentile(latencies, 50) * 1e3:.3f}ms "
+              f"p95={percentile(latencies, 95) * 1e3:.3f}ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
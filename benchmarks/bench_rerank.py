@@ -0,0 +1,152 @@
+"""
+Retrieval quality against latency for two-stage document search: the
+first stage ranks chunks by embedding similarity, the second re-scores
+the nearest candidates with a cross-encoder under a per-query budget
+(engines/reranker.py).
+
+Queries are spans of 10 words taken from random chunks of the index with a
+few words dropped; a result counts as a hit if it contains the span. The
+sweep reports hit@k, MRR@k and re-rank latency for each budget and
+candidate count, plus a repeated pass served from the score cache.
+
+By default the first stage uses the hash embedder and the second stage a
+word-bigram overlap scorer that sleeps --pair-ms per pair to stand in for
+a cross-encoder's cost, so the run needs neither sentence-transformers nor
+numpy. Pass --embedder all-MiniLM-L6-v2 --model cross-encoder/ms-marco-MiniLM-L-6-v2
+for the real models.
+
+    python benchmarks/bench_rerank.py --queries 100 --budgets 0,25,50,100,250
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines.ingest_worker import load_embedder
+from engines.reranker import CrossEncoderReranker
+from metrics import percentile
+
+INDEX_META = os.path.join("data", "College_PDFs", "index_data.json")
+
+
+class OverlapScorer:
+    """Stand-in cross-encoder: share of the query's word bigrams found in the chunk"""
+
+    def __init__(self, pair_ms):
+        self.pair_ms = pair_ms
+
+    def predict(self, pairs):
+        time.sleep(self.pair_ms * len(pairs) / 1000)
+        scores = []
+        for query, text in pairs:
+            q, t = re.findall(r"\w+", query.lower()), re.findall(r"\w+", text.lower())
+            wanted = set(zip(q, q[1:]))
+            scores.append(len(wanted & set(zip(t, t[1:]))) / max(len(wanted), 1))
+        return scores
+
+
+def normalized(rows):
+    vectors = []
+    for row in rows:
+        row = [float(x) for x in row]
+        norm = math.sqrt(sum(x * x for x in row)) or 1.0
+        vectors.append([x / norm for x in row])
+    return vectors
+
+
+def make_queries(chunks, count, rng):
+    queries = []
+    while len(queries) < count:
+        words = chunks[rng.randrange(len(chunks))].split()
+        if len(words) < 30:
+            continue
+        start = rng.randrange(len(words) - 10)
+        span_words = words[start:start + 10]
+        kept = [w for w in span_words if rng.random() > 0.3] or span_words
+        queries.append((" ".join(kept), " ".join(span_words)))
+    return queries
+
+
+def first_stage(query_vector, vectors, width):
+    scores = [sum(a * b for a, b in zip(query_vector, vector)) for vector in vectors]
+    return sorted(range(len(vectors)), key=lambda i: -scores[i])[:width]
+
+
+def quality(order, relevant, k):
+    for rank, idx in enumerate(order[:k], 1):
+        if idx in relevant:
+            return 1.0, 1.0 / rank
+    return 0.0, 0.0
+
+
+def run(label, queries, shortlists, chunks, reranker, candidates, budget, k):
+    hits, mrr, latencies, complete = [], [], [], 0
+    for (query, relevant), shortlist in zip(queries, shortlists):
+        shortlist = shortlist[:candidates]
+        started = time.perf_counter()
+        if reranker is None:
+            order = shortlist
+        else:
+            scored_before = reranker.stats["complete"]
+            order, _ = reranker.rerank(query, [(idx, chunks[idx]) for idx in shortlist], budget)
+            complete += reranker.stats["complete"] - scored_before
+        latencies.append(time.perf_counter() - started)
+        hit, reciprocal = quality(order, relevant, k)
+        hits.append(hit)
+        mrr.append(reciprocal)
+    print(f"{label:<28} hit@{k}={sum(hits) / len(hits):.3f} MRR@{k}={sum(mrr) / len(mrr):.3f} "
+          f"p50={percentile(latencies, 50) * 1e3:6.1f}ms p95={percentile(latencies, 95) * 1e3:6.1f}ms "
+          f"complete={complete / len(queries):.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", default=INDEX_META)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--candidates", default="10,30,50")
+    parser.add_argument("--budgets", default="25,50,100,250", help="re-rank budgets in ms")
+    parser.add_argument("--embedder", default="hash:384")
+    parser.add_argument("--model", help="cross-encoder name (default: simulated scorer)")
+    parser.add_argument("--pair-ms", type=float, default=2.0, help="simulated cost per scored pair")
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    with open(args.index, "r", encoding="utf-8") as f:
+        chunks = json.load(f)["chunks"]
+    rng = random.Random(0)
+    queries = [(query, {i for i, chunk in enumerate(chunks) if " ".join(chunk.split()).find(span) >= 0})
+               for query, span in make_queries(chunks, args.queries, rng)]
+
+    embedder = load_embedder(args.embedder)
+    started = time.perf_counter()
+    vectors = normalized(embedder.encode(chunks, convert_to_numpy=True))
+    print(f"{len(chunks)} chunks embedded in {time.perf_counter() - started:.1f}s with {args.embedder}")
+    widths = [int(c) for c in args.candidates.split(",")]
+    started = time.perf_counter()
+    shortlists = [first_stage(normalized(embedder.encode([query], convert_to_numpy=True))[0], vectors, max(widths))
+                  for query, _ in queries]
+    print(f"first stage: {(time.perf_counter() - started) / len(queries) * 1e3:.1f}ms per query (unindexed scan)")
+
+    run(f"first stage only (k={args.k})", queries, shortlists, chunks, None, args.k, 0, args.k)
+    for width in widths:
+        for budget_ms in [float(b) for b in args.budgets.split(",")]:
+            model = args.model or OverlapScorer(args.pair_ms)
+            # Cache every pair of the sweep so the repeated pass measures cache hits, not LRU eviction
+            reranker = CrossEncoderReranker(model, batch_size=args.batch_size, cache_size=len(queries) * width)
+            if args.model:
+                reranker._load()
+            run(f"top-{width} re-rank, {budget_ms:g}ms", queries, shortlists, chunks, reranker, width,
+                budget_ms / 1000, args.k)
+        run(f"top-{width} re-rank, cached", queries, shortlists, chunks, reranker, width,
+            budget_ms / 1000, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Offline check of LLMRouter hedging and failover against local stub servers.
+
+A "flaky" backend is fast but has heavy-tailed latency and injected errors;
+a "steady" backend is slower but reliable. Prints per-backend latency,
+hedge/failover counts and end-to-end percentiles.
+
+    python benchmarks/bench_router.py --requests 200 --concurrency 8
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llama_index.core.llms import ChatMessage
+from llm_router import Backend, LLMRouter, openai_like_llm
+from metrics import percentile
+from benchmarks.stub_llm_server import StubLLMServer
+
+
+async def run(router, requests, concurrency, stream):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                messages = [ChatMessage(role="user", content=f"request {i}")]
+                if stream:
+                    gen = await router.astream_chat(messages)
+                    async for _ in gen:
+                        pass
+                else:
+                    await router.achat(messages)
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--hedge-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    flaky = StubLLMServer(delay=0.05, jitter=1.5, error_rate=0.1, seed=1)
+    steady = StubLLMServer(delay=0.3, jitter=0.05, seed=2)
+    router = LLMRouter([
+        Backend("flaky", openai_like_llm(flaky.start(), "stub", request_timeout=5.0), cooldown=2.0),
+        Backend("steady", openai_like_llm(steady.start(), "stub", request_timeout=5.0)),
+    ], hedge_after=args.hedge_after)
+
+    try:
+        latencies, errors, elapsed = asyncio.run(run(router, args.requests, args.concurrency, args.stream))
+    finally:
+        flaky.stop()
+        steady.stop()
+
+    print(json.dumps(router.get_stats(), indent=2))
+    print(f"\n{len(latencies)} ok, {errors} failed in {elapsed:.2f}s "
+          f"({args.requests / elapsed:.1f} req/s)")
+    print(f"end-to-end p50={percentile(latencies, 50):.3f}s p95={percentile(latencies, 95):.3f}s "
+          f"p99={percentile(latencies, 99):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
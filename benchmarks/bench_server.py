@@ -0,0 +1,80 @@
+"""
+Load test for server.py: N client threads hammer one endpoint and the script
+reports requests/s, latency percentiles and the server's memory before/after.
+
+    python server.py &
+    python benchmarks/bench_server.py --clients 8 --requests 50 --endpoint search
+    python benchmarks/bench_server.py --clients 4 --requests 5 --endpoint chat
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client import AssistantClient
+from metrics import percentile
+
+QUERIES = [
+    "What is predictive analytics?",
+    "Explain decision trees",
+    "What is sentiment analysis in social media?",
+    "How does logistic regression work?",
+    "What are web analytics metrics?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--endpoint", choices=["search", "chat", "health"], default="search")
+    args = parser.parse_args()
+
+    before = AssistantClient(args.url).stats()
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def client_loop(client_id):
+        client = AssistantClient(args.url, session=f"bench-{client_id}")
+        for i in range(args.requests):
+            query = QUERIES[(client_id + i) % len(QUERIES)]
+            started = time.perf_counter()
+            try:
+                if args.endpoint == "search":
+                    client.search(query)
+                elif args.endpoint == "chat":
+                    client.chat(query)
+                else:
+                    client.health()
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    after = AssistantClient(args.url).stats()
+
+    total = args.clients * args.requests
+    print(f"{args.endpoint}: {args.clients} clients x {args.requests} requests in {elapsed:.2f}s")
+    print(f"  throughput: {len(latencies) / elapsed:.1f} req/s, errors: {len(errors)}/{total}")
+    print(f"  latency p50={percentile(latencies, 50) * 1000:.1f}ms p95={percentile(latencies, 95) * 1000:.1f}ms "
+          f"p99={percentile(latencies, 99) * 1000:.1f}ms")
+    print(f"  server memory: {before['memory_mb']} MB before, {after['memory_mb']} MB after "
+          f"(one process shared by all {args.clients} clients)")
+    if errors:
+        print("  first error:", errors[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Startup cost of the entry points:
+
+  - import-time breakdown of `main` and `main_cli` from `python -X importtime`
+  - whether heavy modules (llama_index, torch, faiss, ...) were imported
+    eagerly; they should only load in the agent/indexing background work
+  - time-to-window (main.py) and time-to-agent-ready via ASSISTANT_STARTUP_PROBE
+    (needs a display)
+  - time-to-first-prompt for main_cli.py
+
+Exits non-zero if a heavy module is imported eagerly or an import exceeds
+--max-import-ms, so it can guard against regressions.
+
+    python benchmarks/bench_startup.py --repeat 3
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("llama_index", "torch", "sentence_transformers", "faiss", "fitz", "transformers", "AppOpener", "ollama")
+
+
+def run_python(args, env=None, **kwargs):
+    return subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True, text=True,
+                          env={**os.environ, **(env or {})}, **kwargs)
+
+
+def import_breakdown(module):
+    """Import time of the module and the slowest top-level imports (cumulative microseconds)"""
+    result = run_python(["-X", "importtime", "-c", f"import {module}"])
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    top_level = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not line.split("|")[2].startswith("  "):  # nested imports are indented
+            top_level.append((int(cumulative), name))
+    total = next(us for us, name in top_level if name == module)
+    return total, sorted(top_level, reverse=True)
+
+
+def eager_heavy_modules(module):
+    code = (f"import sys, json, {module}; "
+            f"print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}} & set({HEAVY!r}))))")
+    result = run_python(["-c", code])
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def probe_gui(stage, timeout):
+    """Seconds from launching main.py until it reports `stage`, or None"""
+    started = time.time()
+    result = run_python(["main.py"], env={"ASSISTANT_STARTUP_PROBE": stage}, timeout=timeout)
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) == 3 and parts[0] == "startup" and parts[1] in (stage, "agent_error"):
+            return float(parts[2]) - started, parts[1]
+    return None, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "no probe output"
+
+
+def time_to_first_prompt(timeout):
+    """Seconds from launching main_cli.py until it asks for a prompt"""
+    started = time.time()
+    proc = subprocess.Popen([sys.executable, "main_cli.py"], cwd=ROOT, stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            env={**os.environ, "PYTHONUNBUFFERED": "1"})
+    seen = b""
+    try:
+        while b"Enter a prompt" not in seen:
+            chunk = os.read(proc.stdout.fileno(), 4096)
+            if not chunk or time.time() - started > timeout:
+                return None
+            seen += chunk
+        return time.time() - started
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def median_ms(values):
+    values = [v for v in values if v is not None]
+    return f"{statistics.median(values) * 1e3:.0f}ms" if values else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="slowest top-level imports to show")
+    parser.add_argument("--max-import-ms", type=float, help="fail if importing an entry point takes longer")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+    failed = False
+
+    for module in ("main", "main_cli"):
+        try:
+            runs = [import_breakdown(module) for _ in range(args.repeat)]
+            heavy = eager_heavy_modules(module)
+        except RuntimeError as e:
+            print(f"import {module}: failed ({e})")
+            failed = True
+            continue
+        total = statistics.median(us for us, _ in runs)
+        print(f"import {module}: {total / 1e3:.0f}ms (median of {args.repeat})")
+        for us, name in runs[0][1][:args.top]:
+            print(f"  {us / 1e3:8.1f}ms  {name}")
+        if heavy:
+            print(f"  eagerly imported heavy modules: {', '.join(heavy)}")
+            failed = True
+        if args.max_import_ms and total / 1e3 > args.max_import_ms:
+            print(f"  exceeds --max-import-ms {args.max_import_ms:.0f}")
+            failed = True
+
+    if os.name == "nt" or os.getenv("DISPLAY"):
+        for stage in ("window", "agent_ready"):
+            runs = [probe_gui(stage, args.timeout) for _ in range(args.repeat)]
+            print(f"main.py time to {stage}: {median_ms([seconds for seconds, _ in runs])}"
+                  + ("" if runs[0][0] is not None and runs[0][1] == stage else f" ({runs[0][1]})"))
+    else:
+        print("main.py time to window: skipped (no display)")
+
+    print(f"main_cli.py time to first prompt: {median_ms([time_to_first_prompt(args.timeout) for _ in range(args.repeat)])}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Per-request overhead of GroqRequestTracker at 100k requests/day, compared
+with the previous design that rewrote the whole day's JSON list on every
+request (measured on a smaller sample and extrapolated, since it is O(n^2)).
+
+    python benchmarks/bench_tracker.py --requests 100000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tracker.tracker import GroqRequestTracker
+
+
+def bench_tracker(n, store_dir):
+    tracker = GroqRequestTracker(store_dir=store_dir, flush_interval=None)
+    start_ts = time.time() - 86400
+    step = 86400 / n
+
+    started = time.perf_counter()
+    for i in range(n):
+        tracker.record(start_ts + i * step)
+    tracker.flush()
+    record_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(10_000):
+        tracker.get_stats()
+    stats_s = (time.perf_counter() - started) / 10_000
+    return record_s / n, stats_s, tracker.get_stats()
+
+
+def bench_legacy(n, store_dir):
+    """The old send_request path: append to a list, then json.dump the whole list"""
+    path = os.path.join(store_dir, "legacy.json")
+    times = []
+    started = time.perf_counter()
+    for i in range(n):
+        times.append(time.time())
+        with open(path, "w") as f:
+            json.dump(times, f)
+    return (time.perf_counter() - started) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--legacy-sample", type=int, default=5_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        per_record, per_stats, stats = bench_tracker(args.requests, tmp)
+        print(f"tracker: {args.requests} requests, {per_record * 1e6:.2f} us/record (incl. batched log writes), "
+              f"{per_stats * 1e6:.2f} us/get_stats -> RPD={stats['RPD']}")
+
+        legacy = bench_legacy(args.legacy_sample, tmp)
+        # Each legacy write is O(n); average cost over a full day scales linearly with n
+        extrapolated = legacy * args.requests / args.legacy_sample
+        print(f"legacy:  {legacy * 1e6:.1f} us/request averaged over {args.legacy_sample} requests, "
+              f"~{extrapolated * 1e6:.0f} us/request averaged over {args.requests}")
+
+
+if __name__ == "__main__":
+    main()
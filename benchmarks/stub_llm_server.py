@@ -0,0 +1,112 @@
+"""
+Minimal OpenAI-compatible chat server for exercising the LLM router offline.
+
+    python benchmarks/stub_llm_server.py --port 9001 --delay 0.2 --jitter 0.5 --error-rate 0.1
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class StubLLMServer:
+    """Serves /v1/chat/completions with configurable latency, jitter, errors and hangs"""
+
+    def __init__(self, port=0, delay=0.0, jitter=0.0, error_rate=0.0, hang_rate=0.0,
+                 reply="Answer: This is a stub reply.", seed=None):
+        self.delay = delay
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.reply = reply
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                stub.requests += 1
+                roll = stub.random.random()
+                time.sleep(stub.delay + stub.random.random() * stub.jitter)
+
+                if roll < stub.hang_rate:
+                    time.sleep(3600)
+                    return
+                if roll < stub.hang_rate + stub.error_rate:
+                    self._send_json(500, {"error": {"message": "injected failure", "type": "server_error"}})
+                    return
+
+                model = body.get("model", "stub")
+                if body.get("stream"):
+                    self._stream(model)
+                else:
+                    self._send_json(200, {
+                        "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": stub.reply}}],
+                        "usage": {"prompt_tokens": 10, "completion_tokens": 8, "total_tokens": 18},
+                    })
+
+            def _send_json(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, model):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for word in stub.reply.split(" "):
+                    chunk = {"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubLLMServer(args.port, args.delay, args.jitter, args.error_rate, args.hang_rate)
+    print("Stub LLM listening on", stub.start())
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stub.stop()
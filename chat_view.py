@@ -0,0 +1,145 @@
+import tkinter as tk
+from datetime import datetime
+
+
+class ChatView:
+    """
+    Renders a SessionLog into a tk.Text while keeping at most `max_rendered`
+    messages in the widget. New messages trim the oldest ones off the top;
+    scrolling to the top loads the previous `page` messages from the log.
+    After paging back, the newest messages may be trimmed too, and the view
+    jumps back to the tail when the next message arrives.
+
+    Each rendered message starts at a mark named "msg<position>", so trimming
+    is a single delete between two marks.
+    """
+
+    def __init__(self, text, log, scrollbar=None, max_rendered=200, page=50):
+        self.text = text
+        self.log = log
+        self.scrollbar = scrollbar
+        self.max_rendered = max_rendered
+        self.page = page
+        self.first = self.last = len(log)  # rendered range [first, last)
+        self._loading = False
+        text.configure(yscrollcommand=self._on_scroll)
+        self.show_tail()
+
+    def _render(self, entry):
+        """Text and tags for one message, as arguments to Text.insert"""
+        timestamp = entry.get("timestamp", "")
+        try:
+            timestamp = datetime.fromisoformat(timestamp).strftime("%H:%M")
+        except ValueError:
+            pass
+        if entry["sender"] == "user":
+            header, header_tag, body_tag = f"You  •  {timestamp}\n", "user_header", "user_message"
+        else:
+            header, header_tag, body_tag = f"Assistant  •  {timestamp}\n", "assistant_header", "assistant_message"
+        return ("\n", (), header, header_tag, f"{entry['message']}\n", body_tag, "\n", ())
+
+    def _insert(self, index, position, entry):
+        # Marks keep right gravity, so text prepended at a mark pushes it along
+        start = self.text.index(index)
+        self.text.insert(start, *self._render(entry))
+        self.text.mark_set(f"msg{position}", start)
+
+    def _trim_top(self):
+        if self.last - self.first <= self.max_rendered:
+            return
+        cut = self.last - self.max_rendered
+        self.text.delete("1.0", f"msg{cut}")
+        for position in range(self.first, cut):
+            self.text.mark_unset(f"msg{position}")
+        self.first = cut
+
+    def _trim_bottom(self):
+        if self.last - self.first <= self.max_rendered:
+            return
+        cut = self.first + self.max_rendered
+        self.text.delete(f"msg{cut}", tk.END)
+        for position in range(cut, self.last):
+            self.text.mark_unset(f"msg{position}")
+        self.last = cut
+
+    def clear(self):
+        self.text.configure(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        for position in range(self.first, self.last):
+            self.text.mark_unset(f"msg{position}")
+        self.text.configure(state=tk.DISABLED)
+        self.first = self.last = len(self.log)
+
+    def switch(self, log):
+        """Show a different session, e.g. a fresh one after clearing the chat"""
+        self.clear()
+        self.log = log
+        self.show_tail()
+
+    def show_tail(self):
+        """Render the newest window of messages and scroll to the end"""
+        self.clear()
+        self.first = max(0, len(self.log) - min(self.page, self.max_rendered))
+        self.text.configure(state=tk.NORMAL)
+        for position, entry in enumerate(self.log.read(self.first, self.last), self.first):
+            self._insert("end-1c", position, entry)
+        self.text.configure(state=tk.DISABLED)
+        self.text.see(tk.END)
+
+    def add(self, sender, message):
+        """Append a message to the log and show it"""
+        entry = {"sender": sender, "message": message, "timestamp": datetime.now().isoformat(timespec="seconds")}
+        position = self.log.append(**entry)
+        if self.last != position:
+            # Paged back and the tail was trimmed; jump back to the newest messages
+            self.show_tail()
+            return
+        self.text.configure(state=tk.NORMAL)
+        self._insert("end-1c", position, entry)
+        self.last = position + 1
+        self._trim_top()
+        self.text.see(tk.END)
+        self.text.configure(state=tk.DISABLED)
+
+    def notice(self, sender, message):
+        """Show a message without saving it to the log (greetings and status notes)"""
+        if self.last != len(self.log):
+            self.show_tail()
+        entry = {"sender": sender, "message": message, "timestamp": datetime.now().isoformat(timespec="seconds")}
+        # No mark: trimming and show_tail drop it along with whatever surrounds it
+        self.text.configure(state=tk.NORMAL)
+        self.text.insert("end-1c", *self._render(entry))
+        self.text.see(tk.END)
+        self.text.configure(state=tk.DISABLED)
+
+    def load_older(self):
+        """Prepend the previous page of messages, keeping the current top message in place"""
+        if self.first == 0:
+            return
+        start = max(0, self.first - self.page)
+        anchor = f"msg{self.first}"
+        self.text.configure(state=tk.NORMAL)
+        for position, entry in reversed(list(enumerate(self.log.read(start, self.first), start))):
+            self._insert("1.0", position, entry)
+        self.first = start
+        self._trim_bottom()
+        self.text.configure(state=tk.DISABLED)
+        self.text.yview(anchor)
+
+    def _on_scroll(self, top, bottom):
+        if self.scrollbar is not None:
+            self.scrollbar.set(top, bottom)
+        if float(top) <= 0.0 and self.first > 0 and not self._loading:
+            self._loading = True
+            self.text.after_idle(self._load_older_idle)
+
+    def _load_older_idle(self):
+        try:
+            # The mouse wheel handler may have paged already
+            if float(self.text.yview()[0]) <= 0.0:
+                self.load_older()
+        finally:
+            self._loading = False
+
+    def rendered(self):
+        return self.last - self.first
@@ -0,0 +1,62 @@
+import json
+import uuid
+import urllib.request
+
+
+class AssistantClient:
+    """
+    Thin client for server.py; only needs the standard library. Each client
+    gets its own server-side conversation unless given a `session` id.
+    """
+
+    def __init__(self, base_url="http://127.0.0.1:8765", session=None, timeout=120.0):
+        self.base_url = base_url.rstrip("/")
+        self.session = session or uuid.uuid4().hex
+        self.timeout = timeout
+
+    def _request(self, method, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def _json(self, method, path, payload=None):
+        with self._request(method, path, payload) as response:
+            return json.loads(response.read())
+
+    def health(self):
+        return self._json("GET", "/health")
+
+    def stats(self):
+        return self._json("GET", "/stats")
+
+    def search(self, query, k=3, subject=None):
+        return self._json("POST", "/search", {"query": query, "k": k, "subject": subject})["results"]
+
+    def save_note(self, note):
+        return self._json("POST", "/notes", {"note": note})["result"]
+
+    def search_notes(self, query):
+        return self._json("POST", "/notes/search", {"query": query})["result"]
+
+    def reset(self, turns=()):
+        """Clear this session's history on the server, optionally seeding it with (user, assistant) turns"""
+        return self._json("POST", "/sessions/reset", {"session": self.session, "turns": [list(t) for t in turns]})
+
+    def chat_stream(self, prompt):
+        """Yield delta/tool/done/error events for a prompt as the server produces them"""
+        with self._request("POST", "/chat", {"prompt": prompt, "session": self.session}) as response:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+
+    def chat(self, prompt, on_event=None):
+        """Send a prompt and return the final response text"""
+        for event in self.chat_stream(prompt):
+            if on_event is not None:
+                on_event(event)
+            if event["type"] == "done":
+                return event["response"]
+            if event["type"] == "error":
+                raise RuntimeError(event["error"])
+        raise RuntimeError("Server closed the stream without a response")
@@ -0,0 +1,261 @@
+import os
+import re
+import json
+import glob
+import time
+import shlex
+import hashlib
+import threading
+import subprocess
+from collections import defaultdict
+
+
+def normalize(name):
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AppOpenerSource:
+    """Installed apps as known to AppOpener (Windows Start menu and Store apps)"""
+
+    name = "appopener"
+    # Store (UWP) package registrations; the key's last-write time changes when one is added or removed
+    PACKAGES_KEY = r"Software\Classes\Local Settings\Software\Microsoft\Windows\CurrentVersion\AppModel\Repository\Packages"
+
+    def __init__(self, start_menu_dirs=None):
+        self.start_menu_dirs = start_menu_dirs or [
+            os.path.join(base, "Microsoft", "Windows", "Start Menu", "Programs")
+            for base in (os.getenv("APPDATA"), os.getenv("PROGRAMDATA")) if base
+        ]
+
+    def list_apps(self):
+        from AppOpener import give_appnames
+        return [{"name": name, "target": name} for name in give_appnames()]
+
+    def signature(self):
+        # give_appnames() re-enumerates every installed app; folder and registry timestamps are enough
+        # to tell whether anything was installed or removed
+        stamps = []
+        for root in self.start_menu_dirs:
+            for dirpath, _, _ in os.walk(root):
+                stamps.append(f"{dirpath}:{os.path.getmtime(dirpath)}")
+        try:
+            import winreg
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.PACKAGES_KEY) as key:
+                stamps.append(f"packages:{winreg.QueryInfoKey(key)[2]}")
+        except (ImportError, OSError):
+            pass
+        return hashlib.sha1("\n".join(stamps).encode("utf-8")).hexdigest()
+
+    def launch(self, app):
+        from AppOpener import open as open_app
+        open_app(app["target"], match_closest=False)
+
+
+class DesktopFileSource:
+    """Apps from freedesktop .desktop entries (Linux)"""
+
+    name = "desktop"
+    FIELD_CODES = re.compile(r"%[fFuUdDnNickvm]")
+
+    def __init__(self, dirs=None):
+        data_dirs = os.getenv("XDG_DATA_DIRS", "/usr/local/share:/usr/share").split(":")
+        data_home = os.getenv("XDG_DATA_HOME", os.path.expanduser("~/.local/share"))
+        self.dirs = dirs or [os.path.join(d, "applications") for d in [data_home] + data_dirs]
+
+    def _files(self):
+        return sorted(path for d in self.dirs for path in glob.glob(os.path.join(d, "*.desktop")))
+
+    def list_apps(self):
+        apps = {}
+        for path in self._files():
+            entry = _read_desktop_entry(path)
+            if not entry.get("Name") or not entry.get("Exec") or entry.get("NoDisplay") == "true":
+                continue
+            apps.setdefault(entry["Name"], {"name": entry["Name"], "target": entry["Exec"]})
+        return list(apps.values())
+
+    def signature(self):
+        stamps = [f"{path}:{os.path.getmtime(path)}" for path in self._files()]
+        return hashlib.sha1("\n".join(stamps).encode("utf-8")).hexdigest()
+
+    def launch(self, app):
+        command = self.FIELD_CODES.sub("", app["target"])
+        subprocess.Popen(shlex.split(command), start_new_session=True,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _read_desktop_entry(path):
+    entry, in_main = {}, False
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("["):
+                    in_main = line == "[Desktop Entry]"
+                elif in_main and "=" in line:
+                    key, value = line.split("=", 1)
+                    entry.setdefault(key.strip(), value.strip())
+    except OSError:
+        pass
+    return entry
+
+
+def default_source():
+    try:
+        import AppOpener  # noqa: F401
+        return AppOpenerSource()
+    except ImportError:
+        return DesktopFileSource()
+
+
+class AppCatalog:
+    """
+    Installed applications with a trigram/prefix index for ranked fuzzy
+    matching. The app list is persisted to `cache_file` and only re-read from
+    the source when its signature changes. Aliases (alias -> app name) come
+    from `aliases_file`; apps opened recently get a small boost.
+
+    The source is re-checked in the background at most every
+    `refresh_interval` seconds while matching.
+    """
+
+    def __init__(self, source=None, cache_file=os.path.join("data", "app_catalog.json"),
+                 aliases_file=os.path.join("data", "app_aliases.json"), recent_boost=0.15, refresh_interval=60.0):
+        self.source = source or default_source()
+        self.cache_file = cache_file
+        self.recent_boost = recent_boost
+        self.refresh_interval = refresh_interval
+        self.checked = 0.0
+        self._refreshing = None
+        self.aliases = {}
+        self.recent = {}
+        self.signature = None
+        self._lock = threading.Lock()
+        self._build([])
+
+        if aliases_file and os.path.exists(aliases_file):
+            with open(aliases_file, "r", encoding="utf-8") as f:
+                self.aliases = {normalize(alias): name for alias, name in json.load(f).items()}
+        self._load_cache()
+        self.refresh()
+
+    def _load_cache(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.recent = cached.get("recent", {})
+        if cached.get("source") == self.source.name:
+            self.signature = cached.get("signature")
+            self._build(cached.get("apps", []))
+
+    def _save_cache(self):
+        if not self.cache_file:
+            return
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        tmp = self.cache_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"source": self.source.name, "signature": self.signature,
+                       "apps": self.apps, "recent": self.recent}, f)
+        os.replace(tmp, self.cache_file)
+
+    def refresh(self, force=False):
+        """Re-read the source if it changed since the cached catalog; returns True when rebuilt"""
+        self.checked = time.time()
+        try:
+            signature = self.source.signature()
+        except Exception:
+            return False
+        if not force and signature == self.signature and self.apps:
+            return False
+        apps = self.source.list_apps()
+        with self._lock:
+            self.signature = signature
+            self._build(apps)
+            self._save_cache()
+        return True
+
+    def refresh_async(self):
+        """Refresh on a background thread; returns an Event set once it finishes (shared with a refresh already running)"""
+        with self._lock:
+            if self._refreshing is None:
+                self._refreshing = threading.Event()
+                threading.Thread(target=self._refresh_in_background, args=(self._refreshing,), daemon=True).start()
+            return self._refreshing
+
+    def _refresh_in_background(self, done):
+        try:
+            self.refresh()
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._refreshing = None
+            done.set()
+
+    def _build(self, apps):
+        self.apps = apps
+        self.keys = [normalize(app["name"]) for app in apps]
+        self.exact = {key: i for i, key in enumerate(self.keys)}
+        self.gram_counts = []
+        self.grams = defaultdict(list)
+        self.prefixes = defaultdict(set)
+        for i, key in enumerate(self.keys):
+            key_grams = trigrams(key)
+            self.gram_counts.append(len(key_grams))
+            for gram in key_grams:
+                self.grams[gram].append(i)
+            for word in key.split():
+                for end in range(1, len(word) + 1):
+                    self.prefixes[word[:end]].add(i)
+
+    def match(self, query, limit=5):
+        """Best matching apps as (app, score), score in [0, 1]"""
+        key = normalize(query)
+        if not key:
+            return []
+        if self.refresh_interval and time.time() - self.checked > self.refresh_interval:
+            self.refresh_async()
+        with self._lock:
+            alias = self.aliases.get(key)
+            if alias is not None and normalize(alias) in self.exact:
+                return [(self.apps[self.exact[normalize(alias)]], 1.0)]
+            if key in self.exact:
+                return [(self.apps[self.exact[key]], 1.0)]
+
+            query_grams = trigrams(key)
+            shared = defaultdict(int)
+            for gram in query_grams:
+                for i in self.grams.get(gram, ()):
+                    shared[i] += 1
+            words = key.split()
+            prefix_hits = set.intersection(*(self.prefixes.get(word, set()) for word in words))
+
+            now = time.time()
+            scored = []
+            for i in set(shared) | prefix_hits:
+                score = 2 * shared.get(i, 0) / (len(query_grams) + self.gram_counts[i])
+                if i in prefix_hits:
+                    score = max(score, 0.6 + 0.4 * len(key) / len(self.keys[i]))
+                last_used = self.recent.get(self.apps[i]["name"])
+                if last_used:
+                    # Fades over about a week
+                    score += self.recent_boost / (1 + (now - last_used) / 86400)
+                scored.append((min(score, 0.99), i))
+
+        scored.sort(key=lambda item: -item[0])
+        return [(self.apps[i], round(score, 3)) for score, i in scored[:limit]]
+
+    def launch(self, app):
+        self.source.launch(app)
+        with self._lock:
+            self.recent[app["name"]] = time.time()
+            self._save_cache()
@@ -1,20 +1,46 @@
-from llama_index.core.tools import FunctionTool
-from AppOpener import open as open_app
+import os
+import threading
+from tracing import traced, span
+from engines.app_catalog import AppCatalog
 
+# Matches scoring below this are reported as suggestions instead of being opened
+MIN_SCORE = float(os.getenv("APP_MATCH_MIN_SCORE", "0.5"))
+# How long a miss waits for the background refresh before answering
+REFRESH_WAIT = float(os.getenv("APP_REFRESH_WAIT", "1.0"))
+
+# Built on first use so importing the tools doesn't enumerate installed apps
+app_catalog = None
+_app_catalog_lock = threading.Lock()
+
+def get_app_catalog():
+    global app_catalog
+    if app_catalog is None:
+        with _app_catalog_lock:
+            if app_catalog is None:
+                app_catalog = AppCatalog()
+    return app_catalog
+
+@traced("tool.app_opener")
 def open_application(app_name: str):
     """
     Opens the app specified in the command string.
     Example command: "open <app_name>"
     """
-    try:
-        open_app(app_name, match_closest=True)
-        return f"Opened {app_name} successfully"
-    except Exception:
-        return f"Could not find an installed app named '{app_name}'."
+    catalog = get_app_catalog()
+    with span("apps.match", apps=len(catalog.apps)):
+        matches = catalog.match(app_name)
+    if not matches or matches[0][1] < MIN_SCORE:
+        # Possibly installed since the catalog was built; give a background refresh a moment
+        apps = catalog.apps
+        if catalog.refresh_async().wait(REFRESH_WAIT) and catalog.apps is not apps:
+            matches = catalog.match(app_name)
+    if not matches or matches[0][1] < MIN_SCORE:
+        suggestions = ", ".join(f"{app['name']} ({score:.2f})" for app, score in matches[:3])
+        return f"Could not find an installed app named '{app_name}'." + (f" Closest: {suggestions}" if suggestions else "")
 
-# Wrap as a tool for the agent
-app_engine = FunctionTool.from_defaults(
-    fn=open_application,
-    name="app_opener",
-    description="Opens any application installed on your system when given a command like 'open <app_name>'"
-)
+    app, score = matches[0]
+    try:
+        catalog.launch(app)
+        return f"Opened {app['name']} (matched '{app_name}', score {score:.2f})"
+    except Exception as e:
+        return f"Found {app['name']} (score {score:.2f}) but could not open it: {e}"
@@ -0,0 +1,88 @@
+"""
+Near-duplicate detection for document chunks with MinHash + LSH banding.
+
+Each chunk becomes a set of word 3-shingles; its MinHash signature holds
+`num_perm` minimums of universal hashes over that set, and two signatures
+agree on a position with probability equal to the sets' Jaccard similarity.
+Signatures are split into bands; chunks sharing any band are candidates,
+confirmed when the estimated similarity reaches `threshold`.
+"""
+import re
+import zlib
+import random
+from array import array
+
+PRIME = 4294967311  # smallest prime above 2**32; shingle hashes are 32-bit
+
+
+def shingles(text, size=3):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    def __init__(self, num_perm=64, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.a = [rng.randrange(1, 2 ** 32 - 1) for _ in range(num_perm)]
+        self.b = [rng.randrange(0, 2 ** 32 - 1) for _ in range(num_perm)]
+        try:
+            import numpy as np
+            self._np = np
+            self._a = np.array(self.a, dtype=np.uint64)[:, None]
+            self._b = np.array(self.b, dtype=np.uint64)[:, None]
+        except ImportError:
+            self._np = None
+
+    def signature(self, text):
+        """array('I') of num_perm minimums (all 0xFFFFFFFF for text without words)"""
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles(text)]
+        if not hashes:
+            return array("I", [0xFFFFFFFF]) * self.num_perm
+        if self._np is not None:
+            np = self._np
+            # a, b and the hashes are < 2**32, so a * h + b fits in uint64 before the modulo
+            values = (self._a * np.array(hashes, dtype=np.uint64)[None, :] + self._b) % PRIME
+            return array("I", values.min(axis=1).astype(np.uint32).tobytes())
+        return array("I", [min((a * h + b) % PRIME for h in hashes) & 0xFFFFFFFF
+                           for a, b in zip(self.a, self.b)])
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+
+class NearDuplicateIndex:
+    """LSH over MinHash signatures: `find` returns the id of an indexed near-duplicate, or None"""
+
+    def __init__(self, num_perm=64, bands=16, threshold=0.8):
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.threshold = threshold
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = {}
+
+    def _keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def find(self, signature):
+        seen = set()
+        for band, key in self._keys(signature):
+            for candidate in self.buckets[band].get(key, ()):
+                if candidate not in seen:
+                    seen.add(candidate)
+                    if similarity(signature, self.signatures[candidate]) >= self.threshold:
+                        return candidate
+        return None
+
+    def add(self, item_id, signature):
+        self.signatures[item_id] = signature
+        for band, key in self._keys(signature):
+            self.buckets[band].setdefault(key, []).append(item_id)
+
+    def __len__(self):
+        return len(self.signatures)
@@ -0,0 +1,141 @@
+import re
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "in", "on", "to", "for",
+    "and", "or", "what", "why", "how", "me", "about", "tell", "explain", "define",
+    "describe", "do", "does", "can", "you", "my", "i", "it", "this", "that", "with",
+    "please", "give", "from", "by", "as", "at", "search", "find",
+}
+QUESTION_WORDS = {
+    "what", "why", "how", "explain", "define", "describe", "tell", "difference",
+    "list", "summarize", "search", "which", "who", "when", "compare",
+}
+ACTION_WORDS = {"note", "notes", "noted", "save", "saved", "remember", "remind"}
+
+
+def keywords(text):
+    """Lower-cased content words of a query, used to compare prompts with tool inputs"""
+    return {w for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOPWORDS}
+
+
+def looks_like_document_question(prompt, subjects=()):
+    """
+    Cheap guess at whether the agent will call document_engine for this prompt.
+    Mirrors the triggers in prompts.react_header: "open ..." goes to the app
+    opener and anything mentioning notes goes to the note tools.
+    """
+    text = prompt.lower().strip()
+    if not text or text.startswith("open "):
+        return False
+    words = set(re.findall(r"[a-z0-9]+", text))
+    if words & ACTION_WORDS:
+        return False
+    if "subject:" in text or any(subject in text for subject in subjects):
+        return True
+    return bool(words & QUESTION_WORDS) and len(keywords(text)) >= 1
+
+
+# Conversation the running agent call belongs to; the server sets it per chat so
+# concurrent sessions each get their own pending prefetch
+current_session = contextvars.ContextVar("prefetch_session", default=None)
+
+
+class DocumentPrefetcher:
+    """
+    Runs a document search speculatively while the LLM is still deciding
+    which tool to call. The tool call later claims the result with `take`
+    if its input is close enough to the prefetched query. Each session
+    (see `current_session`) has its own pending slot.
+    """
+
+    def __init__(self, min_similarity=0.5, max_age=120.0):
+        self.min_similarity = min_similarity
+        self.max_age = max_age
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="doc-prefetch")
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.stats = {"prefetched": 0, "hits": 0, "misses": 0, "wasted": 0, "saved_seconds": 0.0}
+
+    def submit(self, query, subject, search_fn, session=None):
+        """Start search_fn() in the background for (query, subject), replacing the session's pending prefetch"""
+        def run():
+            started = time.perf_counter()
+            results = search_fn()
+            return results, time.perf_counter() - started
+
+        with self._lock:
+            self._expire()
+            if self._pending.pop(session, None) is not None:
+                self.stats["wasted"] += 1
+            self._pending[session] = {
+                "keywords": keywords(query),
+                "subject": (subject or "").lower(),
+                "future": self._executor.submit(run),
+                "created": time.monotonic(),
+            }
+            self.stats["prefetched"] += 1
+
+    def discard(self, session=None):
+        """Drop an unclaimed prefetch, e.g. when the next prompt is not a document question"""
+        with self._lock:
+            if self._pending.pop(session, None) is not None:
+                self.stats["wasted"] += 1
+
+    def _expire(self):
+        now = time.monotonic()
+        for session in [s for s, p in self._pending.items() if now - p["created"] > self.max_age]:
+            del self._pending[session]
+            self.stats["wasted"] += 1
+
+    def take(self, query, subject, session=None):
+        """
+        Return the prefetched results if they match this tool call, else None.
+        Only the session's own prefetch is considered; a call that cannot
+        tell its session (session None with several pending) takes a matching
+        one from any session, since results depend only on query and subject.
+        """
+        with self._lock:
+            pending = self._pending.pop(session, None)
+            if pending is None and session is None:
+                for other, candidate in self._pending.items():
+                    if self._matches(candidate, query, subject):
+                        pending = self._pending.pop(other)
+                        break
+
+        if pending is None or not self._matches(pending, query, subject):
+            if pending is not None:
+                self.stats["wasted"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        waited = time.perf_counter()
+        try:
+            results, duration = pending["future"].result()
+        except Exception:
+            self.stats["misses"] += 1
+            return None
+        waited = time.perf_counter() - waited
+
+        self.stats["hits"] += 1
+        self.stats["saved_seconds"] += max(0.0, duration - waited)
+        return results
+
+    def _matches(self, pending, query, subject):
+        if time.monotonic() - pending["created"] > self.max_age:
+            return False
+        if (subject or "").lower() != pending["subject"]:
+            return False
+        wanted = keywords(query)
+        if not wanted:
+            return False
+        overlap = len(wanted & pending["keywords"]) / len(wanted | pending["keywords"])
+        return overlap >= self.min_similarity
+
+    def get_stats(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        hit_rate = self.stats["hits"] / lookups if lookups else 0.0
+        return {**self.stats, "hit_rate": round(hit_rate, 3), "saved_seconds": round(self.stats["saved_seconds"], 3)}
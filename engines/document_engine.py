@@ -1,24 +1,45 @@
 # document_engine.py
+import os
 import json
+import math
+import time
+import shutil
+import threading
 from pathlib import Path
-import faiss
-import numpy as np
-from sentence_transformers import SentenceTransformer
-from llama_index.core.tools import FunctionTool
-import fitz  
+from engines.doc_prefetch import DocumentPrefetcher, current_session, looks_like_document_question
+from tracing import span, traced, record
 
 class DocumentEngine:
-    def __init__(self, pdf_dir="data\\College_PDFs\\", chunk_size=1000, overlap=200, store_file="data\\College_PDFs\\index_data.faiss"):
-        self.embedder = SentenceTransformer("all-MiniLM-L6-v2")
+    """
+    FAISS index over chunks of the PDFs in `pdf_dir`. Near-duplicate chunks
+    (repeated slides, syllabus boilerplate) are collapsed at ingest into one
+    vector whose `sources` entry lists every PDF it appeared in.
+    """
+
+    def __init__(self, pdf_dir="data\\College_PDFs\\", chunk_size=1000, overlap=200, store_file="data\\College_PDFs\\index_data.faiss",
+                 use_worker=None, on_progress=None, dedup_threshold=None):
+        self.model_name = "all-MiniLM-L6-v2"
+        self._embedder = None
+        self._embedder_lock = threading.Lock()
+        self._reranker = None
+        # New PDFs are extracted and embedded in a worker process unless DOC_INGEST_WORKER=0
+        self.use_worker = os.getenv("DOC_INGEST_WORKER", "1") != "0" if use_worker is None else use_worker
+        self.on_progress = on_progress
+        # Estimated Jaccard similarity at which chunks count as duplicates; 0 disables dedup
+        self.dedup_threshold = float(os.getenv("DOC_DEDUP_THRESHOLD", "0.8")) if dedup_threshold is None else dedup_threshold
         self.chunk_size = chunk_size
         self.overlap = overlap
         self.chunks = []
-        self.sources = []
+        self.sources = []  # list of PDF names per chunk
+        self.processed_pdfs = set()
         self.embeddings = None
         self.index = None
+        self.last_ingest = None
+        self.ingest_cancelled = False
         self.store_file = Path(store_file)
         self.pdf_dir = Path(pdf_dir)
         self.meta_file = self.store_file.with_suffix(".json")
+        self.signatures_file = self.store_file.with_suffix(".minhash")
 
         if self.store_file.exists() and self.meta_file.exists():
             self._load_index()
@@ -27,76 +48,94 @@ class DocumentEngine:
             self._load_pdfs(list(self.pdf_dir.glob("*.pdf")))
             self._save_index()
 
-    def _chunk_text(self, text):
-        chunks, start = [], 0
-        while start < len(text):
-            end = start + self.chunk_size
-            chunks.append(text[start:end])
-            start += self.chunk_size - self.overlap
-        return chunks
-
-    def _extract_text(self, pdf_path):
-        doc = fitz.open(pdf_path)
-        return "\n".join(page.get_text() for page in doc)
+    @property
+    def embedder(self):
+        """Query embedder, loaded on first use (ingestion in the worker doesn't need it here)"""
+        if self._embedder is None:
+            # Searches from the tool, prefetch and server threads may arrive together
+            with self._embedder_lock:
+                if self._embedder is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._embedder = SentenceTransformer(self.model_name)
+        return self._embedder
 
     def _load_pdfs(self, pdf_files):
-        new_chunks, new_sources, new_embeddings = [], [], []
-
-        for pdf_file in pdf_files:
-            print("Reading PDF:", pdf_file.name)
-            text = self._extract_text(pdf_file)
-            chunks = self._chunk_text(text)
-
-            if not chunks:
-                print(f"No text found in {pdf_file.name}. Skipping.")
-                continue
-
-            embeddings = self.embedder.encode(chunks, convert_to_numpy=True, batch_size=32, show_progress_bar=True)
-
-            new_chunks.extend(chunks)
-            new_sources.extend([pdf_file.name] * len(chunks))
-            new_embeddings.extend(embeddings)
-
-        if not new_chunks:
+        """Extract, chunk, dedup and embed new PDFs (in a worker process unless use_worker is off) and index them"""
+        from engines.ingest_worker import IngestJob
+        import numpy as np
+        if not pdf_files:
             return
+        existing = {"meta_file": str(self.meta_file) if self.index is not None else None,
+                    "signatures_file": str(self.signatures_file)}
+        job = IngestJob(pdf_files, embedder=self.model_name if self.use_worker else self.embedder,
+                        chunk_size=self.chunk_size, overlap=self.overlap, on_progress=self.on_progress,
+                        dedup_threshold=self.dedup_threshold or None, existing=existing,
+                        in_process=not self.use_worker)
+        with span("doc.ingest", pdfs=len(pdf_files), worker=self.use_worker):
+            result = job.start().wait()
+            if result is not None:
+                record_ingest_spans(result.info)
+        if result is None:
+            self.ingest_cancelled = True
+            print("Indexing cancelled.")
+            return
+        try:
+            # Copy out of the memory map so the scratch files can be removed
+            self._add_to_index(result.chunks(), [[name] for name in result.sources()],
+                               np.array(result.embeddings(), dtype="float32"), result.duplicates())
+            if result.signatures_path():
+                shutil.copyfile(result.signatures_path(), self.signatures_file)
+        finally:
+            result.cleanup()
+        self.processed_pdfs.update(pdf.name for pdf in pdf_files)
+        self.last_ingest = dict(result.info, saved_chunks=len(result.duplicates()))
+        print(ingest_report(self.last_ingest))
 
-        if self.index is None:
-            dim = new_embeddings[0].shape[0]
-            self.index = faiss.IndexFlatL2(dim)
-            self.chunks = new_chunks
-            self.sources = new_sources
-            self.embeddings = np.array(new_embeddings, dtype="float32")
-        else:
+    def _add_to_index(self, new_chunks, new_sources, new_embeddings, duplicates=()):
+        import faiss
+        import numpy as np
+        if new_chunks:
+            if self.index is None:
+                self.index = faiss.IndexFlatL2(new_embeddings.shape[1])
+                self.embeddings = new_embeddings
+            else:
+                self.embeddings = np.vstack([self.embeddings, new_embeddings])
             self.chunks.extend(new_chunks)
             self.sources.extend(new_sources)
-            self.embeddings = np.vstack([self.embeddings, np.array(new_embeddings, dtype="float32")])
+            self.index.add(new_embeddings)
 
-        self.index.add(np.array(new_embeddings, dtype="float32"))
+        # Duplicates point at chunk ids counted across old and new chunks
+        for chunk_id, name in duplicates:
+            if chunk_id < len(self.sources) and name not in self.sources[chunk_id]:
+                self.sources[chunk_id].append(name)
 
     def _save_index(self):
+        import faiss
+        if self.index is None:
+            return
         faiss.write_index(self.index, str(self.store_file))
         meta = {
             "chunks": self.chunks,
             "sources": self.sources,
-            "processed_pdfs": list(set(self.sources))  # which PDFs we’ve indexed
+            "processed_pdfs": sorted(self.processed_pdfs)  # which PDFs we’ve indexed
         }
         with open(self.meta_file, "w", encoding="utf-8") as f:
             json.dump(meta, f)
 
     def _load_index(self):
+        import faiss
         self.index = faiss.read_index(str(self.store_file))
         with open(self.meta_file, "r", encoding="utf-8") as f:
             meta = json.load(f)
         self.chunks = meta["chunks"]
-        self.sources = meta["sources"]
+        # Older indexes stored a single PDF name per chunk
+        self.sources = [[src] if isinstance(src, str) else src for src in meta["sources"]]
+        self.processed_pdfs = set(meta.get("processed_pdfs", [])) | {name for refs in self.sources for name in refs}
+        # Flat indexes keep the vectors; subject search and MMR need them as a matrix
+        self.embeddings = self.index.reconstruct_n(0, self.index.ntotal)
 
     def _process_new_pdfs(self):
-        all_pdfs = {pdf.name: pdf for pdf in self.pdf_dir.glob("*.pdf")}
-        with open(self.meta_file, "r", encoding="utf-8") as f:
-            meta = json.load(f)
-        processed_pdfs = set(meta.get("processed_pdfs", []))
-
-        new_pdfs = [path for name, path in all_pdfs.items() if name not in processed_pdfs]
+        new_pdfs = [pdf for pdf in self.pdf_dir.glob("*.pdf") if pdf.name not in self.processed_pdfs]
 
         if new_pdfs:
             print("Found new PDFs:", [p.name for p in new_pdfs])
@@ -105,46 +144,217 @@ class DocumentEngine:
         else:
             print("No new PDFs to process.")
 
-    def search(self, query, k=3, subject=None):
-        q_emb = self.embedder.encode([query], convert_to_numpy=True)
+    def subjects(self):
+        """Lower-cased PDF names without extension"""
+        return {Path(name).stem.lower() for name in self.processed_pdfs}
+
+    @property
+    def reranker(self):
+        """Cross-encoder for the second retrieval stage, created on first use"""
+        if self._reranker is None:
+            from engines.reranker import CrossEncoderReranker, DEFAULT_MODEL
+            self._reranker = CrossEncoderReranker(os.getenv("DOC_RERANK_MODEL", DEFAULT_MODEL))
+        return self._reranker
+
+    @traced("doc.search")
+    def search(self, query, k=3, subject=None, mmr=False, fetch_k=20, mmr_lambda=0.5,
+               rerank=False, candidates=30, budget_ms=250):
+        """
+        Top-k (chunk, sources) pairs by L2 distance. With mmr, the k are picked
+        from the fetch_k nearest by maximal marginal relevance, trading
+        relevance for diversity by mmr_lambda (1.0 = relevance only).
+
+        With rerank, the nearest `candidates` chunks are re-scored by a
+        cross-encoder within budget_ms for the whole search; whatever the
+        budget leaves unscored keeps its L2 order. With both, MMR picks among
+        the re-scored chunks using their cross-encoder scores as relevance.
+        """
+        import numpy as np
+        started = time.perf_counter()
+        with span("doc.embed_query"):
+            q_emb = np.array(self.embedder.encode([query], convert_to_numpy=True), dtype="float32")
 
+        wanted = max(k, fetch_k if mmr else k, candidates if rerank else k)
         if subject:  
-            mask = [i for i, src in enumerate(self.sources) if subject.lower() in src.lower()]
+            mask = [i for i, refs in enumerate(self.sources) if any(subject.lower() in src.lower() for src in refs)]
             if not mask:
                 return [(f"No results found for subject '{subject}'", subject)]
-            subject_embs = self.embeddings[mask]
-            D, I = faiss.IndexFlatL2(subject_embs.shape[1]).search(np.array(q_emb, dtype="float32"), k)
-            results = []
-            for idx in I[0]:
-                if idx < len(mask):
-                    real_idx = mask[idx]
-                    results.append((self.chunks[real_idx], self.sources[real_idx]))
-            return results
+            with span("doc.faiss_search", subject=subject, size=len(mask)):
+                distances = ((self.embeddings[mask] - q_emb) ** 2).sum(axis=1)
+                ranked = [mask[i] for i in np.argsort(distances)[:wanted]]
         else:
-            D, I = self.index.search(np.array(q_emb, dtype="float32"), k)
-            return [(self.chunks[idx], self.sources[idx]) for idx in I[0]]
+            with span("doc.faiss_search", size=self.index.ntotal):
+                D, I = self.index.search(q_emb, wanted)
+            ranked = [int(idx) for idx in I[0] if idx >= 0]
+
+        scores = {}
+        if rerank:
+            remaining = budget_ms / 1000 - (time.perf_counter() - started)
+            ranked, scores = self.reranker.rerank(query, [(idx, self.chunks[idx]) for idx in ranked],
+                                                  max(0.0, remaining))
+        if mmr:
+            with span("doc.mmr", candidates=len(ranked), reranked=len(scores)):
+                if scores:
+                    # Unscored chunks only fill in after the re-scored ones, as without MMR
+                    pool = [idx for idx in ranked if idx in scores][:max(k, fetch_k)]
+                    low, high = min(scores[idx] for idx in pool), max(scores[idx] for idx in pool)
+                    relevance = [(scores[idx] - low) / (high - low) if high > low else 1.0 for idx in pool]
+                    ranked = self._mmr(q_emb[0], pool, k, mmr_lambda, relevance) + \
+                        [idx for idx in ranked if idx not in scores]
+                else:
+                    ranked = self._mmr(q_emb[0], ranked[:max(k, fetch_k)], k, mmr_lambda)
+        return [(self.chunks[idx], ", ".join(self.sources[idx])) for idx in ranked[:k]]
+
+    def _mmr(self, q_emb, candidates, k, mmr_lambda, relevance=None):
+        """MMR selection; relevance defaults to cosine similarity with the query"""
+        import numpy as np
+        if len(candidates) <= 1:
+            return candidates
+        vectors = self.embeddings[candidates]
+        vectors = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-9)
+        if relevance is None:
+            relevance = vectors @ (q_emb / (np.linalg.norm(q_emb) + 1e-9))
+        else:
+            relevance = np.asarray(relevance, dtype="float32")
+        similarity = vectors @ vectors.T
+        chosen = [int(np.argmax(relevance))]
+        while len(chosen) < min(k, len(candidates)):
+            redundancy = similarity[:, chosen].max(axis=1)
+            scores = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+            scores[chosen] = -np.inf
+            chosen.append(int(np.argmax(scores)))
+        return [candidates[i] for i in chosen]
+
+
+def record_ingest_spans(info):
+    """Record the worker's per-PDF stage times as spans under the current (doc.ingest) span"""
+    for timing in info.get("timings", []):
+        record("doc.extract_pdf", timing["extract_seconds"], pdf=timing["file"])
+        record("doc.chunk", timing["chunk_seconds"], pdf=timing["file"])
+        if timing["dedup_seconds"] is not None:
+            record("doc.dedup", timing["dedup_seconds"], pdf=timing["file"], chunks=timing["chunks"])
+        record("doc.embed_chunks", timing["embed_seconds"], pdf=timing["file"], chunks=timing["embedded"])
+
+
+def ingest_report(info):
+    """One-line summary of an ingest run: index growth, duplicates collapsed and embedding time saved"""
+    embedded, skipped = info["chunks"], info.get("duplicates", 0)
+    total = embedded + skipped
+    line = f"Indexed {embedded} chunks from {info['files']} PDFs"
+    if skipped and total:
+        per_chunk = info["embed_seconds"] / embedded if embedded else 0.0
+        line += (f"; {skipped} near-duplicates collapsed ({skipped / total:.1%} smaller index, "
+                 f"~{skipped * per_chunk:.1f}s embedding saved, dedup took {info.get('dedup_seconds', 0):.1f}s)")
+    return line
 
 
 # Lazy-loaded singleton for faster startup
 doc_engine = None
+_doc_engine_lock = threading.Lock()
+prefetcher = DocumentPrefetcher()
+# DOC_SEARCH_MMR=1 diversifies tool results so near-identical chunks don't fill the top-k
+SEARCH_MMR = os.getenv("DOC_SEARCH_MMR", "0") == "1"
+# DOC_RERANK=1 re-scores the nearest DOC_RERANK_CANDIDATES chunks with a cross-encoder,
+# giving up on it after DOC_RERANK_BUDGET_MS per query
+SEARCH_RERANK = os.getenv("DOC_RERANK", "0") == "1"
+RERANK_CANDIDATES = int(os.getenv("DOC_RERANK_CANDIDATES", "30"))
+RERANK_BUDGET_MS = float(os.getenv("DOC_RERANK_BUDGET_MS", "250"))
+# Bounds for per-call overrides, so one tool call can't ask for an unbounded re-rank
+MAX_RERANK_CANDIDATES = 100
+MAX_RERANK_BUDGET_MS = 2000.0
 
-def get_doc_engine():
-    """Lazy initialization of document engine"""
+def get_doc_engine(on_progress=None):
+    """Lazy initialization of document engine; on_progress(kind, info) receives ingestion events"""
     global doc_engine
     if doc_engine is None:
-        doc_engine = DocumentEngine(pdf_dir="data\\College_PDFs\\")
+        # Background indexing, tool calls and server requests may all ask at once
+        with _doc_engine_lock:
+            if doc_engine is None:
+                engine = DocumentEngine(pdf_dir="data\\College_PDFs\\", on_progress=on_progress)
+                if SEARCH_RERANK:
+                    # Load the cross-encoder now rather than inside the first query's budget
+                    engine.reranker.load_async()
+                doc_engine = engine
     return doc_engine
 
-def query_documents(query: str) -> str:
+def cancel_indexing():
+    """Stop any PDF ingestion running in a worker process"""
+    from engines.ingest_worker import cancel_active_jobs
+    cancel_active_jobs()
+
+def rerank_stats():
+    """Re-ranker counters, or None until the engine has used one"""
+    engine = doc_engine
+    if engine is None or engine._reranker is None:
+        return None
+    return engine._reranker.get_stats()
+
+def _search_options(rerank=None, candidates=None, budget_ms=None):
+    """Search arguments: the env defaults, overridden by whichever tool arguments parse"""
+    return {
+        "mmr": SEARCH_MMR,
+        "rerank": _parse_flag(rerank, SEARCH_RERANK),
+        "candidates": int(_clamp(candidates, RERANK_CANDIDATES, 1, MAX_RERANK_CANDIDATES)),
+        "budget_ms": _clamp(budget_ms, RERANK_BUDGET_MS, 0.0, MAX_RERANK_BUDGET_MS),
+    }
+
+def _parse_flag(value, default):
+    # The LLM may pass "false" as a string, and bool("false") is True
+    if isinstance(value, str):
+        return {"1": True, "true": True, "yes": True, "on": True,
+                "0": False, "false": False, "no": False, "off": False}.get(value.strip().lower(), default)
+    return default if value is None else bool(value)
+
+def _clamp(value, default, low, high):
+    try:
+        value = float(default if value is None else value)
+    except (TypeError, ValueError):
+        value = float(default)
+    if math.isnan(value):
+        value = float(default)
+    return min(max(value, low), high)
+
+def _parse_query(query):
+    subject = None
+    if "subject:" in query.lower():
+        parts = query.split("subject:")
+        query, subject = parts[0].strip(), parts[1].strip()
+    return query, subject
+
+def prefetch_documents(prompt: str) -> bool:
+    """
+    Speculatively search the documents for a user prompt while the LLM works
+    out its tool call. Only runs once the engine is loaded so the prompt path
+    never pays for index initialization.
+    """
+    engine = doc_engine
+    if engine is None:
+        return False
+    if not looks_like_document_question(prompt, engine.subjects()):
+        prefetcher.discard(current_session.get())
+        return False
+    query, subject = _parse_query(prompt)
+    prefetcher.submit(query, subject, lambda: engine.search(query, subject=subject, **_search_options()),
+                     session=current_session.get())
+    return True
+
+@traced("tool.document_engine")
+def query_documents(query: str, rerank: bool = None, candidates: int = None, budget_ms: float = None) -> str:
+    """
+    Search the PDFs. rerank, candidates and budget_ms override DOC_RERANK,
+    DOC_RERANK_CANDIDATES and DOC_RERANK_BUDGET_MS for this call; candidates
+    is clamped to 1-100 and budget_ms to 0-2000.
+    """
     try:
-        subject = None
-        if "subject:" in query.lower():
-            parts = query.split("subject:")
-            query, subject = parts[0].strip(), parts[1].strip()
-
-        # Initialize document engine only when needed
-        engine = get_doc_engine()
-        results = engine.search(query, subject=subject)
+        query, subject = _parse_query(query)
+        options = _search_options(rerank, candidates, budget_ms)
+
+        # A prefetch ran with the default options; only reuse it if this call asks for the same
+        results = prefetcher.take(query, subject, current_session.get()) if options == _search_options() else None
+        if results is None:
+            # Initialize document engine only when needed
+            engine = get_doc_engine()
+            results = engine.search(query, subject=subject, **options)
         
         if not results:
             return "No relevant documents found for your query."
@@ -152,9 +362,3 @@ def query_documents(query: str) -> str:
         return "\n\n".join([f"[{src}] {text}" for text, src in results])
     except Exception as e:
         return f"Document search is initializing. Please try again in a moment."
-
-document_tool = FunctionTool.from_defaults(
-    fn=query_documents,
-    name="document_engine",
-    description="Look up information in my notes/syllabus PDFs and return useful text with the PDF name. You can also specify a subject with `subject:SUBJECT_NAME`."
-)
@@ -0,0 +1,24 @@
+import functools
+
+
+def dry_run_fn(name, fn):
+    """
+    Stand-in for a tool function with the same signature that only reports
+    the call it would have made.
+    """
+    @functools.wraps(fn)
+    def report(*args, **kwargs):
+        shown = ", ".join([repr(a) for a in args] + [f"{k}={v!r}" for k, v in kwargs.items()])
+        return f"[dry-run] {name}({shown}) was not executed."
+    return report
+
+
+def dry_run_tool(tool):
+    """
+    Copy of a FunctionTool with the same name, description and schema whose
+    function only reports what it would have done. Used by batch runs so
+    replayed prompts don't open apps or write notes.
+    """
+    from llama_index.core.tools import FunctionTool
+    name = tool.metadata.name
+    return FunctionTool.from_defaults(fn=dry_run_fn(name, tool.fn), name=name, description=tool.metadata.description)
@@ -0,0 +1,321 @@
+"""
+Out-of-process PDF ingestion. Text extraction, chunking and batch embedding
+run in a separate process so they never hold the GUI process's GIL. Results
+come back through files in a scratch directory instead of being pickled:
+
+    embeddings.f32   float32 rows, one per chunk, appended per batch (np.memmap-able)
+    texts.bin        UTF-8 chunk texts back to back
+    offsets.u64      start offset of every chunk in texts.bin, plus the end offset
+    sources.json     [[pdf_name, chunk_count], ...] in chunk order
+    duplicates.json  [[chunk_id, pdf_name], ...] for chunks skipped as near-duplicates
+    signatures.u32   MinHash signature of every indexed chunk, old and new (with dedup)
+
+Only small progress events cross the multiprocessing queue.
+"""
+import os
+import json
+import time
+import queue
+import shutil
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from array import array
+
+BATCH_SIZE = 32
+
+# Jobs currently running, so the GUI can cancel them on exit
+active_jobs = set()
+
+
+def chunk_text(text, chunk_size, overlap):
+    chunks, start = [], 0
+    while start < len(text):
+        chunks.append(text[start:start + chunk_size])
+        start += chunk_size - overlap
+    return chunks
+
+
+def extract_text(path):
+    if path.lower().endswith(".pdf"):
+        import fitz
+        with fitz.open(path) as doc:
+            return "\n".join(page.get_text() for page in doc)
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+class HashEmbedder:
+    """Dependency-free stand-in for the sentence embedder (benchmarks): hashed bag of words"""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def encode(self, texts, **kwargs):
+        rows = []
+        for text in texts:
+            row = array("f", [0.0]) * self.dim
+            for word in text.lower().split():
+                row[int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16) % self.dim] += 1.0
+            rows.append(row)
+        return rows
+
+
+def load_embedder(name):
+    if name.startswith("hash:"):
+        return HashEmbedder(int(name.split(":", 1)[1]))
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
+
+
+def _write_rows(f, rows):
+    if hasattr(rows, "astype"):
+        rows.astype("float32").tofile(f)
+    else:
+        for row in rows:
+            row.tofile(f)
+
+
+def _known_signatures(hasher, existing):
+    """Signatures of the chunks already in the index, read from its .minhash file or computed from its chunks"""
+    signatures_file, meta_file = existing.get("signatures_file"), existing.get("meta_file")
+    if not meta_file or not os.path.exists(meta_file):
+        return []
+    with open(meta_file, "r", encoding="utf-8") as f:
+        chunks = json.load(f)["chunks"]
+    if signatures_file and os.path.exists(signatures_file) \
+            and os.path.getsize(signatures_file) == len(chunks) * hasher.num_perm * 4:
+        flat = array("I")
+        with open(signatures_file, "rb") as f:
+            flat.fromfile(f, len(chunks) * hasher.num_perm)
+        return [flat[i * hasher.num_perm:(i + 1) * hasher.num_perm] for i in range(len(chunks))]
+    return [hasher.signature(chunk) for chunk in chunks]
+
+
+def ingest(paths, out_dir, embedder, chunk_size, overlap, events, cancel, dedup_threshold=None, existing=None):
+    """
+    Worker entry point. With `dedup_threshold`, chunks that are near-duplicates
+    of an indexed or earlier chunk are not embedded; they are reported in
+    duplicates.json as [chunk_id, pdf_name] so the existing chunk gains a source.
+    """
+    try:
+        embedder = load_embedder(embedder) if isinstance(embedder, str) else embedder
+        hasher = index = None
+        signatures = []
+        if dedup_threshold:
+            from engines.dedup import MinHasher, NearDuplicateIndex
+            hasher = MinHasher()
+            index = NearDuplicateIndex(num_perm=hasher.num_perm, threshold=dedup_threshold)
+            signatures = _known_signatures(hasher, existing or {})
+            for chunk_id, signature in enumerate(signatures):
+                index.add(chunk_id, signature)
+        first_new_id = len(signatures)
+
+        sources, duplicates, offsets, position, dim = [], [], array("Q"), 0, None
+        embed_seconds = dedup_seconds = 0.0
+        # Per-file stage times; the parent records them as its tracing spans
+        timings = []
+        with open(os.path.join(out_dir, "embeddings.f32"), "wb") as emb_file, \
+                open(os.path.join(out_dir, "texts.bin"), "wb") as text_file:
+            for done, path in enumerate(paths):
+                name = os.path.basename(path)
+                events.put(("progress", {"file": name, "files_done": done, "files": len(paths),
+                                         "chunks": len(offsets), "duplicates": len(duplicates)}))
+                started = time.perf_counter()
+                text = extract_text(path)
+                extracted = time.perf_counter()
+                chunks = chunk_text(text, chunk_size, overlap)
+                timing = {"file": name, "extract_seconds": extracted - started,
+                          "chunk_seconds": time.perf_counter() - extracted, "chunks": len(chunks), "embedded": len(chunks),
+                          "dedup_seconds": None, "embed_seconds": 0.0}
+                timings.append(timing)
+                if not chunks:
+                    events.put(("skipped", {"file": name}))
+                    continue
+
+                if index is not None:
+                    started = time.perf_counter()
+                    unique = []
+                    for chunk in chunks:
+                        signature = hasher.signature(chunk)
+                        match = index.find(signature)
+                        if match is None:
+                            index.add(first_new_id + len(offsets) + len(unique), signature)
+                            signatures.append(signature)
+                            unique.append(chunk)
+                        else:
+                            duplicates.append([match, name])
+                    chunks = unique
+                    timing["embedded"] = len(chunks)
+                    timing["dedup_seconds"] = time.perf_counter() - started
+                    dedup_seconds += timing["dedup_seconds"]
+
+                for start in range(0, len(chunks), BATCH_SIZE):
+                    if cancel.is_set():
+                        events.put(("cancelled", {"files_done": done}))
+                        return
+                    batch = chunks[start:start + BATCH_SIZE]
+                    started = time.perf_counter()
+                    rows = embedder.encode(batch, convert_to_numpy=True, batch_size=BATCH_SIZE)
+                    elapsed = time.perf_counter() - started
+                    timing["embed_seconds"] += elapsed
+                    embed_seconds += elapsed
+                    dim = dim or len(rows[0])
+                    _write_rows(emb_file, rows)
+                    for text in batch:
+                        data = text.encode("utf-8")
+                        offsets.append(position)
+                        text_file.write(data)
+                        position += len(data)
+                if chunks:
+                    sources.append([name, len(chunks)])
+        offsets.append(position)
+        with open(os.path.join(out_dir, "offsets.u64"), "wb") as f:
+            offsets.tofile(f)
+        with open(os.path.join(out_dir, "sources.json"), "w", encoding="utf-8") as f:
+            json.dump(sources, f)
+        with open(os.path.join(out_dir, "duplicates.json"), "w", encoding="utf-8") as f:
+            json.dump(duplicates, f)
+        if hasher is not None:
+            with open(os.path.join(out_dir, "signatures.u32"), "wb") as f:
+                for signature in signatures:
+                    signature.tofile(f)
+        events.put(("done", {"files": len(paths), "chunks": len(offsets) - 1, "dim": dim,
+                             "duplicates": len(duplicates), "embed_seconds": round(embed_seconds, 3),
+                             "dedup_seconds": round(dedup_seconds, 3), "timings": timings}))
+    except Exception as e:
+        events.put(("error", {"error": f"{type(e).__name__}: {e}"}))
+
+
+class IngestResult:
+    """Chunks, their source PDF names and the embedding matrix read back from the worker's files"""
+
+    def __init__(self, out_dir, info):
+        self.out_dir = out_dir
+        self.info = info
+        self.count = info["chunks"]
+        self.dim = info["dim"]
+
+    def chunks(self):
+        offsets = array("Q")
+        with open(os.path.join(self.out_dir, "offsets.u64"), "rb") as f:
+            offsets.fromfile(f, self.count + 1)
+        with open(os.path.join(self.out_dir, "texts.bin"), "rb") as f:
+            data = f.read()
+        return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(self.count)]
+
+    def sources(self):
+        with open(os.path.join(self.out_dir, "sources.json"), "r", encoding="utf-8") as f:
+            return [name for name, count in json.load(f) for _ in range(count)]
+
+    def duplicates(self):
+        """[chunk_id, pdf_name] for every chunk collapsed into an existing one"""
+        with open(os.path.join(self.out_dir, "duplicates.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def signatures_path(self):
+        """MinHash signatures of every indexed chunk (old and new), or None without dedup"""
+        path = os.path.join(self.out_dir, "signatures.u32")
+        return path if os.path.exists(path) else None
+
+    def embeddings(self):
+        """float32 matrix (count x dim), memory-mapped from the worker's file"""
+        import numpy as np
+        if not self.count:
+            return np.zeros((0, self.dim or 0), dtype="float32")
+        return np.memmap(os.path.join(self.out_dir, "embeddings.f32"), dtype="float32", mode="r",
+                         shape=(self.count, self.dim))
+
+    def cleanup(self):
+        shutil.rmtree(self.out_dir, ignore_errors=True)
+
+
+class IngestJob:
+    """
+    One ingestion run in a worker process. Call `wait()` to block until it
+    finishes (forwarding events to `on_progress`), or `cancel()` from any
+    thread to stop it between embedding batches.
+
+    With in_process=True the same pipeline runs on a thread instead, and
+    `embedder` may be an already loaded model rather than a name.
+    """
+
+    def __init__(self, paths, embedder="all-MiniLM-L6-v2", chunk_size=1000, overlap=200,
+                 on_progress=None, dedup_threshold=None, existing=None, in_process=False):
+        self.paths = [str(path) for path in paths]
+        self.on_progress = on_progress
+        self.out_dir = tempfile.mkdtemp(prefix="ingest_")
+        if in_process:
+            self.events = queue.Queue()
+            self._cancel = threading.Event()
+            make = threading.Thread
+        else:
+            ctx = multiprocessing.get_context("spawn")
+            self.events = ctx.Queue()
+            self._cancel = ctx.Event()
+            make = ctx.Process
+        self.process = make(target=ingest, daemon=True,
+                            args=(self.paths, self.out_dir, embedder, chunk_size, overlap,
+                                  self.events, self._cancel, dedup_threshold, existing))
+        self.started = None
+        self.cancelled_at = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.process.start()
+        active_jobs.add(self)
+        return self
+
+    def cancel(self):
+        self.cancelled_at = self.cancelled_at or time.perf_counter()
+        self._cancel.set()
+
+    def _terminate(self):
+        # Threads can't be killed; an in-process run stops at its next batch
+        if self.process.is_alive() and hasattr(self.process, "terminate"):
+            self.process.terminate()
+
+    def _emit(self, kind, info):
+        if self.on_progress is not None:
+            try:
+                self.on_progress(kind, info)
+            except Exception:
+                pass
+
+    def wait(self, grace=5.0):
+        """IngestResult when done; None if cancelled. Raises RuntimeError if the worker failed"""
+        try:
+            while True:
+                try:
+                    kind, info = self.events.get(timeout=0.2)
+                except queue.Empty:
+                    if self.cancelled_at is not None and time.perf_counter() - self.cancelled_at > grace:
+                        # Still loading the model or extracting a large PDF; don't wait for a batch boundary
+                        self._terminate()
+                        kind, info = "cancelled", {"files_done": None}
+                    elif not self.process.is_alive():
+                        raise RuntimeError(f"ingest worker exited with code {getattr(self.process, 'exitcode', None)}")
+                    else:
+                        continue
+                self._emit(kind, info)
+                if kind == "done":
+                    self.process.join(grace)
+                    return IngestResult(self.out_dir, info)
+                if kind == "cancelled":
+                    self.process.join(grace)
+                    shutil.rmtree(self.out_dir, ignore_errors=True)
+                    return None
+                if kind == "error":
+                    raise RuntimeError(info["error"])
+        except BaseException:
+            self._terminate()
+            shutil.rmtree(self.out_dir, ignore_errors=True)
+            raise
+        finally:
+            active_jobs.discard(self)
+
+
+def cancel_active_jobs():
+    for job in list(active_jobs):
+        job.cancel()
@@ -1,16 +1,40 @@
-from llama_index.core.tools import FunctionTool
 import os
+import threading
+from tracing import traced
+from engines.note_store import NoteStore, format_notes
 
 note_file = os.path.join("data", "notes.txt")
+note_db = os.path.join("data", "notes.db")
 
+# Created on first use so importing the tools stays cheap
+note_store = None
+_note_store_lock = threading.Lock()
+
+def _note_embedder(texts):
+    from engines.document_engine import get_doc_engine
+    return get_doc_engine().embedder.encode(texts, convert_to_numpy=True)
+
+def get_note_store():
+    global note_store
+    if note_store is None:
+        with _note_store_lock:
+            if note_store is None:
+                embed_fn = _note_embedder if os.getenv("NOTES_EMBEDDINGS", "0") == "1" else None
+                note_store = NoteStore(db_path=note_db, text_file=note_file, embed_fn=embed_fn)
+    return note_store
+
+@traced("tool.note_saver")
 def save_note(note: str) -> str:
-    os.makedirs(os.path.dirname(note_file), exist_ok=True)
-    with open(note_file, "a", encoding="utf-8") as f:
-        f.write(note + "\n")
+    get_note_store().add(note)
     return f"Note saved: {note}"
 
-note_engine = FunctionTool.from_defaults(
-    fn=save_note,
-    name="note_saver",
-    description="Use this tool when the user wants to save a note of something. Append a plain text note to notes.txt. Takes a single string (the note)."
-)
\ No newline at end of file
+@traced("tool.note_search")
+def search_notes(query: str) -> str:
+    """
+    Finds saved notes matching the query, e.g. "meeting" or "minecraft house".
+    """
+    store = get_note_store()
+    rows = store.search(query, semantic=store.embed_fn is not None)
+    if not rows:
+        return f"No notes found about '{query}'."
+    return format_notes(rows)
@@ -0,0 +1,210 @@
+import os
+import re
+import time
+import atexit
+import sqlite3
+import threading
+from datetime import datetime
+
+
+class NoteStore:
+    """
+    Notes in SQLite with an FTS5 full-text index (plain LIKE scans where the
+    sqlite build has no FTS5). Writes are buffered and committed in batches,
+    and each batch is also appended to the plain-text notes file so it stays
+    readable. The existing notes file is imported once on first use.
+
+    Full-text matches are ranked by how well they cover the query among the
+    newest `candidates` hits, which keeps lookups fast even for words found
+    in most notes.
+
+    If `embed_fn` (list of texts -> 2D float array) is given, each batch is
+    embedded after it is committed and `search(..., semantic=True)` ranks by
+    cosine similarity. Notes without an embedding (the text file import, or
+    a batch whose embedding failed) are backfilled on a background thread.
+    """
+
+    def __init__(self, db_path=os.path.join("data", "notes.db"), text_file=os.path.join("data", "notes.txt"),
+                 flush_every=20, flush_interval=2.0, embed_fn=None, candidates=50):
+        self.db_path = db_path
+        self.candidates = candidates
+        self.text_file = text_file
+        self.flush_every = flush_every
+        self.embed_fn = embed_fn
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._pending = []
+        self._stop = threading.Event()
+
+        self.fts = self._create_schema()
+        self._import_text_file()
+        if embed_fn is not None:
+            threading.Thread(target=self._embed_missing, daemon=True).start()
+
+        if flush_interval:
+            threading.Thread(target=self._flush_loop, args=(flush_interval,), daemon=True).start()
+        atexit.register(self.close)
+
+    def _create_schema(self):
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY, created REAL, text TEXT, embedding BLOB)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            try:
+                self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(text, content='notes', content_rowid='id')")
+                return True
+            except sqlite3.OperationalError:
+                return False
+
+    def _import_text_file(self):
+        """One-time import of the notes.txt written before the store existed"""
+        with self._lock:
+            done = self._db.execute("SELECT value FROM meta WHERE key = 'imported_text_file'").fetchone()
+            if done:
+                return
+            notes = []
+            if os.path.exists(self.text_file):
+                created = os.path.getmtime(self.text_file)
+                with open(self.text_file, "r", encoding="utf-8") as f:
+                    notes = [(created, line.strip()) for line in f if line.strip()]
+            # Notes and the "imported" mark commit together, so a crash can't import twice
+            with self._db:
+                self._insert(notes)
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('imported_text_file', ?)", (str(time.time()),))
+
+    def add(self, note):
+        """Queue a note; it is written with the next batch"""
+        with self._lock:
+            self._pending.append((time.time(), note))
+            should_flush = len(self._pending) >= self.flush_every
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            with self._db:
+                ids = self._insert(pending)
+            os.makedirs(os.path.dirname(self.text_file) or ".", exist_ok=True)
+            with open(self.text_file, "a", encoding="utf-8") as f:
+                f.writelines(note + "\n" for _, note in pending)
+        self._embed(ids, [note for _, note in pending])
+
+    def _insert(self, notes):
+        """Insert notes (inside the caller's transaction) and return their ids"""
+        ids = []
+        for created, text in notes:
+            cursor = self._db.execute("INSERT INTO notes (created, text) VALUES (?, ?)", (created, text))
+            ids.append(cursor.lastrowid)
+            if self.fts:
+                self._db.execute("INSERT INTO notes_fts (rowid, text) VALUES (?, ?)", (cursor.lastrowid, text))
+        return ids
+
+    def _embed(self, ids, texts):
+        """
+        Store embeddings for notes already inserted. Runs outside the lock:
+        the first call may load the embedding model, and text search must
+        not wait for that. Notes are keyword-searchable in the meantime.
+        """
+        if self.embed_fn is None or not ids:
+            return
+        try:
+            vectors = self.embed_fn(texts)
+        except Exception:
+            return
+        with self._lock, self._db:
+            self._db.executemany("UPDATE notes SET embedding = ? WHERE id = ?",
+                                 [(vector.astype("float32").tobytes(), note_id) for vector, note_id in zip(vectors, ids)])
+
+    def _embed_missing(self, batch_size=64):
+        while not self._stop.is_set():
+            with self._lock:
+                rows = self._db.execute("SELECT id, text FROM notes WHERE embedding IS NULL ORDER BY id LIMIT ?",
+                                        (batch_size,)).fetchall()
+            if not rows:
+                return
+            self._embed([row[0] for row in rows], [row[1] for row in rows])
+            with self._lock:
+                still_missing = self._db.execute("SELECT 1 FROM notes WHERE id = ? AND embedding IS NULL",
+                                                 (rows[0][0],)).fetchone()
+            if still_missing:
+                return  # the embedder is failing; retry on the next start
+
+    def search(self, query, limit=5, semantic=False):
+        """Best matching notes as (created, text), newest first among equal matches"""
+        self.flush()
+        if semantic and self.embed_fn is not None:
+            return self._semantic_search(query, limit)
+
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            return []
+        with self._lock:
+            if self.fts:
+                terms = [f'"{word}"' for word in words]
+                # Exact words first; prefix queries merge whole doclists, so the last word is
+                # only treated as a prefix ("meet" -> "meeting") when that finds nothing
+                for match in (" AND ".join(terms), " AND ".join(terms[:-1] + [terms[-1] + "*"]), " OR ".join(terms)):
+                    # Newest candidates straight off the index; bm25 would scan every matching doclist
+                    rows = self._db.execute(
+                        "SELECT n.created, n.text FROM notes_fts JOIN notes n ON n.id = notes_fts.rowid "
+                        "WHERE notes_fts MATCH ? ORDER BY notes_fts.rowid DESC LIMIT ?",
+                        (match, self.candidates)).fetchall()
+                    if rows:
+                        return _rank(rows, words)[:limit]
+                return []
+            clauses = " AND ".join("LOWER(text) LIKE ?" for _ in words)
+            return self._db.execute(f"SELECT created, text FROM notes WHERE {clauses} ORDER BY created DESC LIMIT ?",
+                                    [f"%{word}%" for word in words] + [limit]).fetchall()
+
+    def _semantic_search(self, query, limit):
+        import numpy as np
+        with self._lock:
+            rows = self._db.execute("SELECT created, text, embedding FROM notes WHERE embedding IS NOT NULL").fetchall()
+        if not rows:
+            return []
+        matrix = np.vstack([np.frombuffer(row[2], dtype="float32") for row in rows])
+        q = np.asarray(self.embed_fn([query])[0], dtype="float32")
+        scores = matrix @ q / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(q) + 1e-9)
+        return [(rows[i][0], rows[i][1]) for i in np.argsort(-scores)[:limit]]
+
+    def recent(self, limit=5):
+        self.flush()
+        with self._lock:
+            return self._db.execute("SELECT created, text FROM notes ORDER BY created DESC, id DESC LIMIT ?",
+                                    (limit,)).fetchall()
+
+    def count(self):
+        self.flush()
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def _flush_loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except (OSError, sqlite3.Error):
+                pass
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+
+def _rank(rows, words):
+    """Notes covering more of the query words first, then denser matches, then newest"""
+    wanted = set(words)
+
+    def score(row):
+        tokens = re.findall(r"\w+", row[1].lower())
+        hits = [token for token in tokens if token in wanted or token.startswith(words[-1])]
+        return (-len(set(hits)), -len(hits) / (len(tokens) or 1), -row[0])
+
+    return sorted(rows, key=score)
+
+
+def format_notes(rows):
+    return "\n".join(f"[{datetime.fromtimestamp(created):%Y-%m-%d %H:%M}] {text}" for created, text in rows)
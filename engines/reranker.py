@@ -0,0 +1,138 @@
+"""
+Second-stage re-ranking of document search candidates with a cross-encoder,
+under a hard per-query latency budget.
+
+Candidates arrive in first-stage (vector distance) order and are scored in
+batches. A batch only starts if the recent per-batch time says it will
+finish inside the budget, so a query never waits on the model past its
+deadline; candidates left unscored keep their first-stage order after the
+scored ones. Scores are cached per (query, chunk), so a repeated or
+prefetched query re-ranks from the cache.
+"""
+import time
+import threading
+from collections import OrderedDict
+from metrics import LatencyStats
+from tracing import span
+
+DEFAULT_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class CrossEncoderReranker:
+    """
+    `model` is a model name loaded with sentence-transformers' CrossEncoder
+    on first use, or any object with predict(pairs) -> scores. A named
+    model loads on a background thread; queries arriving before it is ready
+    keep their first-stage order instead of waiting for it.
+
+    `clock` (default time.perf_counter) measures batches and the budget.
+    """
+
+    def __init__(self, model=DEFAULT_MODEL, batch_size=8, cache_size=4096, clock=None):
+        self.model_name = model if isinstance(model, str) else None
+        self._model = None if isinstance(model, str) else model
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.clock = clock or time.perf_counter
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = None
+        self.batch_latency = LatencyStats(alpha=0.3)
+        self.stats = {"queries": 0, "complete": 0, "partial": 0, "fallback": 0,
+                      "scored": 0, "cache_hits": 0, "over_budget": 0}
+
+    def load_async(self):
+        """Start loading the model in the background (no-op once loaded or loading)"""
+        with self._lock:
+            if self._model is not None or self._loading is not None:
+                return
+            self._loading = threading.Thread(target=self._load, daemon=True)
+            self._loading.start()
+
+    def _load(self):
+        try:
+            from sentence_transformers import CrossEncoder
+            model = CrossEncoder(self.model_name)
+            # The first predict pays for lazy initialisation; keep it out of query budgets,
+            # and time a second one so the first real query already has a batch estimate
+            model.predict([("warm up", "warm up")])
+            started = time.perf_counter()
+            model.predict([("warm up", "warm up")] * self.batch_size)
+            self.batch_latency.observe(time.perf_counter() - started)
+            self._model = model
+        except Exception as e:
+            print(f"Re-ranker unavailable, using first-stage order: {e}")
+
+    @property
+    def ready(self):
+        return self._model is not None
+
+    def _cached(self, key):
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _store(self, keys, scores):
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._cache[key] = float(score)
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def rerank(self, query, candidates, budget):
+        """
+        Reorder candidates, a list of (chunk_id, text) in first-stage order,
+        spending at most `budget` seconds on the model. Returns the chunk ids
+        in their new order and {chunk_id: score} for the ones that were scored.
+        """
+        deadline = self.clock() + budget
+        query_key = " ".join(query.lower().split())
+        if self._model is None:
+            self.load_async()
+
+        scores, pending = {}, []
+        for chunk_id, text in candidates:
+            score = self._cached((query_key, chunk_id))
+            if score is None:
+                pending.append((chunk_id, text))
+            else:
+                scores[chunk_id] = score
+        cache_hits, scored, over_budget = len(scores), 0, False
+
+        if self._model is not None:
+            with span("doc.rerank", candidates=len(candidates), cached=len(scores)):
+                for start in range(0, len(pending), self.batch_size):
+                    # Without a measurement yet, assume a batch fits; afterwards trust the recent p95
+                    expected = self.batch_latency.percentile(95) if self.batch_latency.count else 0.0
+                    if self.clock() + expected >= deadline:
+                        break
+                    batch = pending[start:start + self.batch_size]
+                    started = self.clock()
+                    batch_scores = self._model.predict([(query, text) for _, text in batch])
+                    finished = self.clock()
+                    self.batch_latency.observe(finished - started)
+                    self._store([(query_key, chunk_id) for chunk_id, _ in batch], batch_scores)
+                    scores.update((chunk_id, float(score)) for (chunk_id, _), score in zip(batch, batch_scores))
+                    scored += len(batch)
+                    over_budget = over_budget or finished > deadline
+
+        order = [chunk_id for chunk_id, _ in candidates]
+        outcome = "fallback" if not scores else "complete" if len(scores) == len(order) else "partial"
+        with self._lock:
+            self.stats["queries"] += 1
+            self.stats["cache_hits"] += cache_hits
+            self.stats["scored"] += scored
+            self.stats["over_budget"] += int(over_budget)
+            self.stats[outcome] += 1
+        if not scores:
+            return order, scores
+        ranked = sorted((chunk_id for chunk_id in order if chunk_id in scores), key=lambda c: -scores[c])
+        return ranked + [chunk_id for chunk_id in order if chunk_id not in scores], scores
+
+    def get_stats(self):
+        with self._lock:
+            stats = {**self.stats, "cached": len(self._cache)}
+        return {**stats, "ready": self.ready, "batch_latency": self.batch_latency.summary()}
@@ -0,0 +1,77 @@
+"""
+Agent tool registry. Each tool is described by name, description and the
+import path of its function, so listing or choosing tools imports neither
+llama_index nor the engine backends (faiss, sentence-transformers, AppOpener);
+modules are only loaded when `build_tools` creates the FunctionTools.
+"""
+import asyncio
+import functools
+import importlib
+from collections import namedtuple
+
+ToolSpec = namedtuple("ToolSpec", "name target description side_effects")
+
+TOOL_SPECS = [
+    ToolSpec(
+        name="note_saver",
+        target="engines.note_engine:save_note",
+        description="Use this tool when the user wants to save a note of something. Saves a plain text note to the user's searchable notes (found later with note_search). Takes a single string (the note).",
+        side_effects=True,
+    ),
+    ToolSpec(
+        name="note_search",
+        target="engines.note_engine:search_notes",
+        description="Search the user's saved notes. Use when the user asks what they noted or saved about something. Takes the words to look for and returns matching notes with their dates.",
+        side_effects=False,
+    ),
+    ToolSpec(
+        name="app_opener",
+        target="engines.app_engine:open_application",
+        description="Opens any application installed on your system when given a command like 'open <app_name>'. Reports which app was opened and how closely it matched.",
+        side_effects=True,
+    ),
+    ToolSpec(
+        name="document_engine",
+        target="engines.document_engine:query_documents",
+        description="Look up information in my notes/syllabus PDFs and return useful text with the PDF name. You can also specify a subject with `subject:SUBJECT_NAME`. "
+                    "Optional: rerank (true/false) re-scores the closest matches with a slower, more accurate model; "
+                    "candidates (1-100) is how many matches it re-scores and budget_ms (0-2000) how long it may take. "
+                    "Leave them out to use the defaults.",
+        side_effects=False,
+    ),
+]
+
+
+def resolve(spec):
+    module, fn = spec.target.split(":")
+    return getattr(importlib.import_module(module), fn)
+
+
+def threaded(fn):
+    """
+    Async twin of a sync tool function. llama_index runs sync tools with
+    loop.run_in_executor, which drops contextvars; asyncio.to_thread copies
+    them, so tool spans nest under prompt_agent and current_session is set.
+    """
+    @functools.wraps(fn)
+    async def run(*args, **kwargs):
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return run
+
+
+def build_tools(names=None, dry_run=False):
+    """
+    FunctionTools for the named tools (all by default). With dry_run, tools
+    with side effects only report what they would have done.
+    """
+    from llama_index.core.tools import FunctionTool
+    from engines.dry_run import dry_run_tool
+
+    tools = []
+    for spec in TOOL_SPECS:
+        if names is not None and spec.name not in names:
+            continue
+        fn = resolve(spec)
+        tool = FunctionTool.from_defaults(fn=fn, async_fn=threaded(fn), name=spec.name, description=spec.description)
+        tools.append(dry_run_tool(tool) if dry_run and spec.side_effects else tool)
+    return tools
@@ -0,0 +1,133 @@
+import os
+from typing import Any, Sequence
+from pydantic import PrivateAttr
+from llama_index.core.llms import LLM, ChatMessage, ChatResponse, CompletionResponse, LLMMetadata
+from llama_index.llms.ollama import Ollama
+from routing import Backend, BackendRouter
+
+
+class LLMRouter(LLM):
+    """
+    Routes chat/completion calls across several LLM backends.
+
+    Backends are ranked by EWMA latency, pushed back when their provider
+    quota (from GroqRequestTracker) runs low, and skipped while cooling down
+    after repeated errors. Async calls are hedged: if the chosen backend has
+    not answered (or, when streaming, produced its first token) within its
+    own p95, the next backend is started too and the first answer wins.
+    Errors fail over to the next backend immediately. The selection logic
+    lives in routing.BackendRouter.
+    """
+
+    hedge_after: float = 8.0
+    low_quota: float = 0.2
+
+    _router: BackendRouter = PrivateAttr()
+
+    def __init__(self, backends, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._router = BackendRouter(backends, hedge_after=self.hedge_after, low_quota=self.low_quota)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LLMRouter"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return self._router.backends[0].llm.metadata
+
+    @property
+    def backends(self):
+        return self._router.backends
+
+    def ranked_backends(self):
+        return self._router.ranked_backends()
+
+    def get_stats(self):
+        return self._router.get_stats()
+
+    # Async paths: hedged and with failover
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return await self._router.route(lambda b: b.llm.achat(messages, **kwargs))
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return await self._router.route(lambda b: b.llm.acomplete(prompt, formatted=formatted, **kwargs))
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any):
+        return await self._router.first_chunk(lambda b: b.llm.astream_chat(messages, **kwargs))
+
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        return await self._router.first_chunk(lambda b: b.llm.astream_complete(prompt, formatted=formatted, **kwargs))
+
+    # Sync paths: failover only
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return self._router.route_sync(lambda b: b.llm.chat(messages, **kwargs))
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return self._router.route_sync(lambda b: b.llm.complete(prompt, formatted=formatted, **kwargs))
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any):
+        return self._router.route_sync(lambda b: b.llm.stream_chat(messages, **kwargs), streaming=True)
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        return self._router.route_sync(lambda b: b.llm.stream_complete(prompt, formatted=formatted, **kwargs),
+                                       streaming=True)
+
+
+def build_router(request_timeout=15.0, context_window=4000):
+    """
+    Build the router from the environment. Ollama is always the first backend;
+    Groq is added when GROQ_API_KEY is set and any OpenAI-compatible server
+    when OPENAI_LIKE_API_BASE is set.
+    """
+    backends = [Backend("ollama", Ollama(
+        model=os.getenv("OLLAMA_MODEL", "qwen3:4b"),
+        request_timeout=request_timeout,
+        context_window=context_window,
+    ))]
+
+    if os.getenv("GROQ_API_KEY"):
+        from llama_index.llms.groq import Groq
+        from tracker.tracker import GroqRequestTracker
+        backends.append(Backend(
+            "groq",
+            Groq(model=os.getenv("GROQ_MODEL", "groq/compound"), api_key=os.getenv("GROQ_API_KEY")),
+            tracker=GroqRequestTracker(store_dir="tracker/tracker_data/groq", limits=groq_limits()),
+        ))
+
+    if os.getenv("OPENAI_LIKE_API_BASE"):
+        backends.append(Backend("openai_like", openai_like_llm(
+            api_base=os.getenv("OPENAI_LIKE_API_BASE"),
+            model=os.getenv("OPENAI_LIKE_MODEL", "qwen3:4b"),
+            api_key=os.getenv("OPENAI_LIKE_API_KEY", "none"),
+            request_timeout=request_timeout,
+            context_window=context_window,
+        )))
+
+    return LLMRouter(backends, hedge_after=float(os.getenv("LLM_HEDGE_AFTER", str(request_timeout / 2))))
+
+
+def groq_limits():
+    """Provider limits for Groq's admission controller, overridable from the environment"""
+    return {
+        "rpm": int(os.getenv("GROQ_RPM_LIMIT", "30")),
+        "rpd": int(os.getenv("GROQ_RPD_LIMIT", "1000")),
+        "tpm": int(os.getenv("GROQ_TPM_LIMIT", "6000")),
+        "tpd": int(os.getenv("GROQ_TPD_LIMIT", "0")) or None,
+    }
+
+
+def openai_like_llm(api_base, model, api_key="none", request_timeout=15.0, context_window=4000):
+    """LLM for any OpenAI-compatible /v1/chat/completions endpoint"""
+    from llama_index.llms.openai_like import OpenAILike
+    return OpenAILike(
+        model=model,
+        api_base=api_base,
+        api_key=api_key,
+        timeout=request_timeout,
+        max_retries=0,
+        context_window=context_window,
+        is_chat_model=True,
+    )
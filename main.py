@@ -4,17 +4,17 @@ import asyncio
 import threading
 import os
 import time
-from datetime import datetime
-from dotenv import load_dotenv
-from llama_index.core.agent.workflow import ReActAgent, AgentStream, ToolCallResult
-from llama_index.llms.ollama import Ollama
-from engines.note_engine import note_engine
-from engines.app_engine import app_engine
-from engines.document_engine import document_tool
-from prompts import react_header
+# Only light modules here so the window shows quickly; llama_index, the LLM
+# clients and the document backends are imported by setup_agent's thread.
+# Ingest workers are spawned processes that re-import this module as
+# __mp_main__, so nothing else runs at import time.
+from engines.document_engine import prefetch_documents, prefetcher, cancel_indexing
 from tracker.tracker import GroqRequestTracker
-
-load_dotenv()
+from tracker.analytics import UsageArchive, format_summary
+from client import AssistantClient
+from session_log import SessionLog, new_session_path, latest_session_path
+from chat_view import ChatView
+import tracing
 
 class ModernWindowsAssistant:
     def __init__(self):
@@ -23,12 +23,22 @@ class ModernWindowsAssistant:
         self.setup_styles()
         self.create_widgets()
         
+        # Resume the last session unless asked for a fresh one; the view only renders its tail
+        resume = os.getenv("ASSISTANT_NEW_SESSION", "0") != "1"
+        self.session = SessionLog((resume and latest_session_path()) or new_session_path())
+        self.chat_view = ChatView(self.chat_display, self.session, scrollbar=self.chat_scrollbar,
+                                  max_rendered=int(os.getenv("CHAT_MAX_RENDERED", "200")))
+        
         self.tracker = GroqRequestTracker()
-        self.chat_history = []
+        self.memory = None
+        self.llm = None
         self.agent = None
+        self.client = None
+        self.last_prompt_tokens = 0
         
-        self.add_message("assistant", "Welcome to Windows Assistant! I'm initializing in the background. You can start typing, and I'll be ready shortly.")
+        self.add_notice("Welcome to Windows Assistant! I'm initializing in the background. You can start typing, and I'll be ready shortly.")
         
+        self.root.after_idle(self.report_startup, "window")
         self.root.after(100, self.initialize_heavy_components)
         
     def setup_window(self):
@@ -200,7 +210,7 @@ class ModernWindowsAssistant:
 Open any installed application
 
 Note Taking  
-Save notes to your notes file
+Save and search your notes
 
 Document Search
 Search through PDF documents
@@ -315,11 +325,14 @@ Search cloud computing"""
         )
         # Don't grid the scrollbar - keep it hidden but functional
         # scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
-        self.chat_display.configure(yscrollcommand=scrollbar.set)
+        # ChatView hooks yscrollcommand and forwards it to the scrollbar
+        self.chat_scrollbar = scrollbar
         
         # Enable mouse wheel scrolling instead
         def on_mousewheel(event):
             self.chat_display.yview_scroll(int(-1*(event.delta/120)), "units")
+            if event.delta > 0 and self.chat_display.yview()[0] <= 0.0:
+                self.chat_view.load_older()
         
         self.chat_display.bind("<MouseWheel>", on_mousewheel)
         
@@ -391,10 +404,31 @@ Search cloud computing"""
         
     def initialize_heavy_components(self):
         """Initialize heavy components after UI is shown"""
+        server_url = os.getenv("ASSISTANT_SERVER")
+        if server_url:
+            self.connect_to_server(server_url)
+            return
+        
         self.setup_agent()
         
         self.root.after(2000, self.start_background_pdf_indexing)
         
+    def connect_to_server(self, server_url):
+        """Run as a thin client of server.py, which already holds the agent and document index"""
+        def connect():
+            try:
+                # A fresh server-side session per window, seeded with the resumed transcript
+                client = AssistantClient(server_url)
+                client.health()
+                client.reset(self.session.recent_turns())
+                self.client = client
+                self.agent = client
+                self.root.after(0, self.on_agent_ready)
+            except Exception as e:
+                self.root.after(0, lambda: self.on_agent_error(f"Could not reach assistant server at {server_url}: {e}"))
+        
+        threading.Thread(target=connect, daemon=True).start()
+        
     def start_background_pdf_indexing(self):
         """Start PDF indexing in background after everything else is ready"""
         def index_pdfs():
@@ -403,7 +437,11 @@ Search cloud computing"""
                     text="Indexing documents in background...", fg=self.colors['text_muted']))
                 
                 from engines.document_engine import get_doc_engine
-                get_doc_engine()
+                # Extraction and embedding run in a worker process; we only relay its progress
+                engine = get_doc_engine(on_progress=self.on_index_progress)
+                if engine.ingest_cancelled:
+                    # Leave "Indexing cancelled" up; the window may already be closing
+                    return
                 
                 self.root.after(0, lambda: self.status_bar.configure(
                     text="Ready - All systems online", fg=self.colors['success']))
@@ -414,6 +452,23 @@ Search cloud computing"""
         
         threading.Thread(target=index_pdfs, daemon=True).start()
         
+    def on_index_progress(self, kind, info):
+        """Show ingestion worker events in the status bar (called from the indexing thread)"""
+        if kind == "progress":
+            text = f"Indexing documents: {info['files_done']}/{info['files']} PDFs, {info['chunks']} chunks ({info['file']})"
+        elif kind == "done":
+            text = f"Indexed {info['chunks']} chunks from {info['files']} PDFs"
+        elif kind == "cancelled":
+            text = "Indexing cancelled"
+        else:
+            return
+        self.root.after(0, lambda: self.status_bar.configure(text=text, fg=self.colors['text_muted']))
+        
+    def on_close(self):
+        """Stop background ingestion before closing the window"""
+        cancel_indexing()
+        self.root.destroy()
+        
     def setup_agent(self):
         """Initialize the agent in a separate thread - optimized for speed"""
         def init_agent():
@@ -421,23 +476,33 @@ Search cloud computing"""
                 self.root.after(0, lambda: self.status_bar.configure(
                     text="Initializing agent...", fg=self.colors['warning']))
                 
+                from llama_index.core.agent.workflow import ReActAgent
+                from engines.tools import build_tools
+                from prompts import react_header
+                from memory import ConversationMemory, llm_summarizer
+                from llm_router import build_router
                 
-                # from llama_index.llms.groq import Groq
-                # llm = Groq(model="groq/compound", api_key=os.getenv("GROQ_API_KEY"))
-
-                llm = Ollama(
-                    model="qwen3:4b",
+                # Ollama first; Groq / OpenAI-compatible backends join when their env vars are set
+                llm = build_router(
                     request_timeout=15.0,  
                     context_window=4000,  
                 )
+                self.llm = llm
+                for backend in llm.backends:
+                    if backend.tracker is not None:
+                        backend.tracker.on_pressure = self.on_rate_limit_pressure
                 
                 agent = ReActAgent(
-                    tools=[note_engine, app_engine, document_tool],
+                    tools=build_tools(),
                     llm=llm,
                     max_iterations=1
                 )
                 
                 agent.update_prompts({"react_header": react_header})
+                self.memory = ConversationMemory(token_budget=1500, summary_budget=300,
+                                                 summarizer=llm_summarizer(llm))
+                # A resumed session picks up where it left off
+                self.memory.restore(self.session.recent_turns())
                 self.agent = agent
                 
                 self.root.after(0, self.on_agent_ready)
@@ -447,8 +512,29 @@ Search cloud computing"""
         
         threading.Thread(target=init_agent, daemon=True).start()
         
+    def on_rate_limit_pressure(self, pressure):
+        """Called from the request thread whenever a provider rate limiter queues or releases requests"""
+        def show():
+            if pressure["blocked_on"]:
+                self.status_bar.configure(
+                    text=f"Rate limit ({pressure['blocked_on'].upper()}) reached - waiting {pressure['wait_seconds']:.0f}s, "
+                         f"{pressure['waiting']} request(s) queued", fg=self.colors['warning'])
+            elif pressure["waiting"]:
+                self.status_bar.configure(text="Thinking...", fg=self.colors['warning'])
+        self.root.after(0, show)
+        
+    def report_startup(self, stage):
+        """Print a startup milestone for benchmarks/bench_startup.py when ASSISTANT_STARTUP_PROBE is set"""
+        probe = os.getenv("ASSISTANT_STARTUP_PROBE")
+        if not probe:
+            return
+        print(f"startup {stage} {time.time():.6f}", flush=True)
+        if stage == probe or stage == "agent_error":
+            self.root.after(0, self.root.destroy)
+        
     def on_agent_ready(self):
         """Called when agent is successfully initialized"""
+        self.report_startup("agent_ready")
         self.status_indicator.delete("all")
         self.status_indicator.create_oval(2, 2, 12, 12, fill=self.colors['success'], 
                                         outline=self.colors['border'], width=1)
@@ -460,10 +546,11 @@ Search cloud computing"""
         self.send_button.configure(state=tk.NORMAL)
         self.input_entry.focus()
         
-        self.add_message("assistant", "I'm now fully initialized and ready to help! I can open applications, take notes, search documents, and answer questions. What would you like to do?")
+        self.add_notice("I'm now fully initialized and ready to help! I can open applications, take notes, search documents, and answer questions. What would you like to do?")
         
     def on_agent_error(self, error):
         """Called when agent initialization fails"""
+        self.report_startup("agent_error")
         self.status_label.configure(text="Offline")
         self.status_bar.configure(text=f"Error: {error}", fg=self.colors['danger'])
         messagebox.showerror("Initialization Error", 
@@ -484,7 +571,7 @@ Search cloud computing"""
             return
             
         if not hasattr(self, 'agent') or self.agent is None:
-            self.add_message("assistant", "Please wait, I'm still initializing. Try again in a moment.")
+            self.add_notice("Please wait, I'm still initializing. Try again in a moment.")
             return
             
         self.input_entry.delete("1.0", tk.END)
@@ -517,13 +604,9 @@ Search cloud computing"""
     async def get_agent_response(self, prompt):
         """Get response from the agent - optimized"""
         try:
+            started = time.perf_counter()
             response = await self.prompt_agent(prompt)
-            
-            try:
-                self.tracker.request_times.append(time.time())
-                self.tracker._save_today_file()
-            except:
-                pass 
+            self.tracker.record(latency=time.perf_counter() - started)
             
             return str(response)
         except Exception as e:
@@ -531,11 +614,35 @@ Search cloud computing"""
             
     async def prompt_agent(self, prompt):
         """Prompt the agent and return response - optimized for speed"""
-        handler = self.agent.run(prompt)
-        
-        
-        response = await handler
-        return response
+        if self.client is not None:
+            def on_event(event):
+                if event["type"] == "done":
+                    self.last_prompt_tokens = event["prompt_tokens"]
+            return await asyncio.to_thread(self.client.chat, prompt, on_event)
+        
+        with tracing.span("prompt_agent", chars=len(prompt)) as trace:
+            chat_history, prompt_tokens = self.memory.build_history(prompt)
+            trace.set(prompt_tokens=prompt_tokens)
+            self.last_prompt_tokens = prompt_tokens
+            prefetch_documents(prompt)
+            started = time.perf_counter()
+            handler = self.agent.run(prompt, chat_history=chat_history)
+            
+            if tracing.tracer.enabled:
+                from llama_index.core.agent.workflow import AgentStream
+                # Time to first streamed token approximates prefill, the rest is generation
+                first_token = last_token = None
+                async for ev in handler.stream_events():
+                    if isinstance(ev, AgentStream):
+                        last_token = time.perf_counter()
+                        first_token = first_token or last_token
+                if first_token is not None:
+                    tracing.record("llm.prefill", first_token - started)
+                    tracing.record("llm.generate", last_token - first_token)
+            
+            response = await handler
+            self.memory.add_turn(prompt, str(response))
+            return response
         
     def on_response_received(self, response):
         """Called when agent response is received"""
@@ -544,7 +651,7 @@ Search cloud computing"""
          
         self.input_entry.configure(state=tk.NORMAL)
         self.send_button.configure(state=tk.NORMAL)
-        self.status_bar.configure(text="Ready", fg=self.colors['success'])
+        self.status_bar.configure(text=f"Ready - last prompt used {self.last_prompt_tokens} tokens", fg=self.colors['success'])
         self.input_entry.focus()
         
     def on_response_error(self, error):
@@ -558,62 +665,121 @@ Search cloud computing"""
         self.input_entry.focus()
         
     def add_message(self, sender, message):
-        """Add a message to the chat display with modern styling"""
-        self.chat_display.configure(state=tk.NORMAL)
-        
-         
-        timestamp = datetime.now().strftime("%H:%M")
-        
-         
-        self.chat_display.insert(tk.END, "\n")
-        
-        if sender == "user":
-             
-            self.chat_display.insert(tk.END, f"You  •  {timestamp}\n", "user_header")
-            self.chat_display.insert(tk.END, f"{message}\n", "user_message")
-        else:
-             
-            self.chat_display.insert(tk.END, f"Assistant  •  {timestamp}\n", "assistant_header")
-            self.chat_display.insert(tk.END, f"{message}\n", "assistant_message")
-        
-         
-        self.chat_display.insert(tk.END, "\n")
-        
-         
-        self.chat_display.see(tk.END)
-        self.chat_display.configure(state=tk.DISABLED)
-        
-         
-        self.chat_history.append({"sender": sender, "message": message, "timestamp": timestamp})
+        """Add a message to the session log and the chat display"""
+        self.chat_view.add(sender, message)
+
+    def add_notice(self, message):
+        """Show an assistant greeting or status note without saving it to the session log"""
+        self.chat_view.notice("assistant", message)
         
     def show_stats(self):
-        """Show request statistics"""
+        """Show request statistics; the usage history is read from disk off the Tk thread"""
+        def gather():
+            history = self.history_stats_text()
+            self.root.after(0, lambda: self.show_stats_dialog(history))
+
+        threading.Thread(target=gather, daemon=True).start()
+
+    def show_stats_dialog(self, history_text):
         stats = self.tracker.get_stats()
         stats_text = f"""Request Statistics:
 
 Requests per minute: {stats['RPM']}
 Requests per day: {stats['RPD']}
+Tokens per minute / day: {stats['TPM']} / {stats['TPD']}
 Data file: {stats['File']}
 
-Total messages in this session: {len(self.chat_history)}"""
+{history_text}
+{self.memory_stats_text()}
+{self.prefetch_stats_text()}
+{self.router_stats_text()}
+{self.trace_stats_text()}
+
+Total messages in this session: {len(self.session)} ({self.chat_view.rendered()} rendered)
+Session log: {self.session.path}"""
         
         messagebox.showinfo("Statistics", stats_text)
         
+    def history_stats_text(self):
+        """Last 7 days of usage from the compacted tracker archive"""
+        try:
+            return format_summary(UsageArchive(self.tracker.store_dir).last_days(7))
+        except Exception as e:
+            return f"Usage history unavailable: {e}"
+        
+    def memory_stats_text(self):
+        """Describe the conversation memory for the stats dialog"""
+        if self.memory is None or not self.memory.last_stats:
+            return ""
+        stats = self.memory.last_stats
+        return (f"\nLast prompt tokens: {stats['total_tokens']} "
+                f"(summary {stats['summary_tokens']}, history {stats['history_tokens']}, "
+                f"message {stats['prompt_tokens']})\nTurns in memory window: {stats['turns']}\n")
+        
+    def prefetch_stats_text(self):
+        """Describe speculative document prefetching for the stats dialog"""
+        stats = prefetcher.get_stats()
+        if not stats["prefetched"]:
+            return ""
+        return (f"Document prefetch: {stats['hits']} hits / {stats['hits'] + stats['misses']} lookups "
+                f"({stats['hit_rate']:.0%}), {stats['saved_seconds']:.2f}s saved\n")
+        
+    def router_stats_text(self):
+        """Describe per-backend LLM latency and routing for the stats dialog"""
+        if self.llm is None:
+            return ""
+        stats = self.llm.get_stats()
+        lines = [f"LLM routing: {stats['hedges']} hedged, {stats['failovers']} failovers, {stats['failures']} failed"]
+        for name, backend in stats["backends"].items():
+            latency = backend["latency"] if backend["latency"]["count"] else backend["ttft"]
+            lines.append(f"  {name}: {backend['wins']}/{backend['calls']} won, {backend['errors']} errors, "
+                         f"p50 {latency['p50']:.2f}s, p95 {latency['p95']:.2f}s")
+        return "\n".join(lines) + "\n"
+        
+    def trace_stats_text(self):
+        """Per-stage p50/p95 latency from the tracer for the stats dialog"""
+        stages = tracing.summary()
+        if not stages:
+            return ""
+        lines = ["Stage latency (p50 / p95):"]
+        for name, stage in stages.items():
+            lines.append(f"  {name}: {stage['p50_ms']:.0f} / {stage['p95_ms']:.0f} ms ({stage['count']})")
+        return "\n".join(lines) + "\n"
+        
     def clear_chat(self):
         """Clear chat history"""
         if messagebox.askyesno("Clear Chat", "Are you sure you want to clear the chat history?"):
-            self.chat_display.configure(state=tk.NORMAL)
-            self.chat_display.delete("1.0", tk.END)
-            self.chat_display.configure(state=tk.DISABLED)
-            self.chat_history.clear()
-            self.add_message("assistant", "Chat cleared. How can I help you?")
+            # The old session stays on disk; continue in a new one
+            self.session.close()
+            self.session = SessionLog(new_session_path())
+            self.chat_view.switch(self.session)
+            if self.memory is not None:
+                self.memory.clear()
+            if self.client is not None:
+                # Continue in a new server session right away; the old one is dropped in the background
+                old_client = self.client
+                self.client = self.agent = AssistantClient(old_client.base_url, timeout=old_client.timeout)
+                threading.Thread(target=self.reset_server_session, args=(old_client,), daemon=True).start()
+            self.add_notice("Chat cleared. How can I help you?")
+
+    def reset_server_session(self, client):
+        """Drop a conversation the server holds for this window (thin-client mode)"""
+        try:
+            client.reset()
+        except Exception as e:
+            self.root.after(0, lambda: self.status_bar.configure(
+                text=f"Could not clear the server's history: {e}", fg=self.colors['warning']))
             
     def run(self):
         """Start the application"""
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.root.mainloop()
 
 def main():
     """Main entry point"""
+    from dotenv import load_dotenv
+    load_dotenv()
+    tracing.configure()
     app = ModernWindowsAssistant()
     app.run()
 
@@ -1,38 +1,92 @@
 import asyncio
 import os 
-from dotenv import load_dotenv
-from llama_index.core.agent.workflow import ReActAgent, AgentStream, ToolCallResult
-from llama_index.core.workflow import Context
-from llama_index.llms.ollama import Ollama
-from engines.note_engine import note_engine
-from engines.app_engine import app_engine
-from engines.document_engine import document_tool  
-from prompts import react_header
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import Counter
+from engines.document_engine import prefetch_documents, prefetcher
+from engines.tools import build_tools
 from tracker.tracker import GroqRequestTracker
+from tracker.analytics import UsageArchive, format_summary
+from metrics import percentile
+from client import AssistantClient
+import tracing
 
-load_dotenv()
+llm = None
+agent = None
+memory = None
 
-# from llama_index.llms.groq import Groq
-# llm = Groq(model="groq/compound", api_key=os.getenv("GROQ_API_KEY"))
+def setup_agent():
+    """Build the local LLM router, agent and memory (skipped when running as a thin client)"""
+    global llm, agent, memory
+    from memory import ConversationMemory, llm_summarizer
+    from llm_router import build_router
+    # Ollama first; Groq / OpenAI-compatible backends join when their env vars are set
+    llm = build_router(
+        request_timeout=30.0,
+        context_window=8000,
+    )
+    agent = build_agent(build_tools())
+    for backend in llm.backends:
+        if backend.tracker is not None:
+            backend.tracker.on_pressure = show_pressure
+    memory = ConversationMemory(token_budget=3000, summary_budget=500, summarizer=llm_summarizer(llm))
 
-llm = Ollama(
-    model="qwen3:4b",
-    request_timeout=30.0,
-    context_window=8000,
-)
 
+def show_pressure(pressure):
+    if pressure["blocked_on"]:
+        print(f"\n[rate limit] {pressure['blocked_on'].upper()} reached, waiting {pressure['wait_seconds']:.0f}s "
+              f"({pressure['waiting']} queued)", flush=True)
 
-agent = ReActAgent(
-    tools=[note_engine, app_engine, document_tool],
-    llm=llm,
-    max_iterations=1
-)
 
-agent.update_prompts({"react_header": react_header})
+def start_setup():
+    """
+    Run setup_agent on a background thread so the prompt shows while
+    llama_index and the LLM clients import; join it before the first request.
+    """
+    errors = []
+
+    def run():
+        try:
+            setup_agent()
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+    def wait():
+        thread.join()
+        if errors:
+            raise errors[0]
+    return wait
+
+
+def build_agent(tools):
+    from llama_index.core.agent.workflow import ReActAgent
+    from prompts import react_header
+    agent = ReActAgent(
+        tools=tools,
+        llm=llm,
+        max_iterations=1
+    )
+    agent.update_prompts({"react_header": react_header})
+    return agent
 
 async def prompt_agent(prompt):
+    from llama_index.core.agent.workflow import AgentStream, ToolCallResult
 
-        handler = agent.run(prompt)
+    with tracing.span("prompt_agent", chars=len(prompt)) as trace:
+        chat_history, prompt_tokens = memory.build_history(prompt)
+        trace.set(prompt_tokens=prompt_tokens)
+        print(f"[tokens] prompt={prompt_tokens} (history turns={memory.last_stats['turns']})")
+
+        prefetch_documents(prompt)
+        started = time.perf_counter()
+        first_token = last_token = None
+        handler = agent.run(prompt, chat_history=chat_history)
         
         # ENABLE FOR DEBUGGING / READING AGENT THOUGHTS
 
@@ -40,28 +94,204 @@ async def prompt_agent(prompt):
             if isinstance(ev, ToolCallResult):
                 print(f"\n[DEBUG] Call {ev.tool_name} with {ev.tool_kwargs}\nReturned: {ev.tool_output}")
             if isinstance(ev, AgentStream):
+                last_token = time.perf_counter()
+                first_token = first_token or last_token
                 print(f"{ev.delta}", end="", flush=True)
 
         response = await handler
+        if first_token is not None:
+            tracing.record("llm.prefill", first_token - started)
+            tracing.record("llm.generate", last_token - first_token)
+        memory.add_turn(prompt, str(response))
 
         return response
 
 
-async def main():
+def load_batch(path):
+    """
+    Read prompts from a JSONL file; each line is {"id": ..., "prompt": ...} or
+    a bare JSON string. Raises ValueError naming the first malformed line, so a
+    bad file fails before any prompt runs.
+    """
+    prompts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_no}: invalid JSON ({e.msg})") from None
+            if isinstance(item, str):
+                item = {"prompt": item}
+            if not isinstance(item, dict):
+                raise ValueError(f"{path}:{line_no}: expected an object or a string, got {type(item).__name__}")
+            if not isinstance(item.get("prompt"), str) or not item["prompt"].strip():
+                raise ValueError(f'{path}:{line_no}: missing or empty "prompt"')
+            item.setdefault("id", line_no)
+            prompts.append(item)
+    return prompts
+
+
+async def run_batch_prompt(batch_agent, item, timeout):
+    """Run one prompt without conversation memory and time it"""
+    result = {"id": item["id"], "prompt": item["prompt"], "response": None, "error": None,
+              "tool_calls": [], "ttft_s": None}
+    started = time.perf_counter()
+
+    from llama_index.core.agent.workflow import AgentStream, ToolCallResult
+
+    async def run():
+        handler = batch_agent.run(item["prompt"])
+        async for ev in handler.stream_events():
+            if isinstance(ev, ToolCallResult):
+                result["tool_calls"].append(ev.tool_name)
+            if isinstance(ev, AgentStream) and result["ttft_s"] is None:
+                result["ttft_s"] = round(time.perf_counter() - started, 4)
+        return await handler
+
+    try:
+        result["response"] = str(await asyncio.wait_for(run(), timeout))
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["latency_s"] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def summarize_batch(results, elapsed):
+    latencies = [r["latency_s"] for r in results if r["error"] is None]
+    errors = sum(1 for r in results if r["error"] is not None)
+    tools = Counter(name for r in results for name in r["tool_calls"])
+    tools["(none)"] = sum(1 for r in results if not r["tool_calls"])
+    return {
+        "requests": len(results),
+        "errors": errors,
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 3) if elapsed else 0.0,
+        "latency_s": {f"p{q}": round(percentile(latencies, q), 4) for q in (50, 90, 95, 99)},
+        "ttft_p50_s": round(percentile([r["ttft_s"] for r in results if r["ttft_s"] is not None], 50), 4),
+        "tool_calls": dict(tools.most_common()),
+    }
+
+
+async def run_batch(path, out_path, concurrency=4, live_tools=False, timeout=120.0):
+    """
+    Replay prompts from a JSONL file through the agent with bounded concurrency.
+    Side-effecting tools (app opener, note saver) are dry-run unless live_tools.
+    """
+    prompts = load_batch(path)
+    batch_agent = build_agent(build_tools(dry_run=not live_tools))
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    with open(out_path, "w", encoding="utf-8") as out:
+        async def worker(item):
+            async with semaphore:
+                result = await run_batch_prompt(batch_agent, item, timeout)
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            results.append(result)
+            status = "ERR" if result["error"] else "ok "
+            print(f"[{len(results)}/{len(prompts)}] {status} {result['latency_s']:.2f}s {item['prompt'][:60]!r}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(item) for item in prompts))
+        elapsed = time.perf_counter() - started
+
+    summary = summarize_batch(results, elapsed)
+    summary.update({"input": path, "concurrency": concurrency, "dry_run": not live_tools,
+                    "llm": llm.get_stats()})
+    with open(os.path.splitext(out_path)[0] + ".summary.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps({k: v for k, v in summary.items() if k != "llm"}, indent=2))
+    return summary
+
+
+def run_thin_client(server_url):
+    """Interactive loop against a running server.py instead of a local agent"""
+    client = AssistantClient(server_url)
+    print("Connected to", server_url, client.health())
+
+    def show(event):
+        if event["type"] == "delta":
+            print(event["text"], end="", flush=True)
+        elif event["type"] == "tool":
+            print(f"\n[DEBUG] Call {event['name']} with {event['input']}\nReturned: {event['output']}")
+        elif event["type"] == "done":
+            print(f"\n[tokens] prompt={event['prompt_tokens']}")
+
+    while (prompt := input("\nEnter a prompt (q to quit): ")) != "q":
+        try:
+            print(client.chat(prompt, on_event=show))
+        except Exception as e:
+            print(e)
+
+    print(client.stats())
+    try:
+        client.reset()  # free this session's memory on the server
+    except Exception:
+        pass
+
+
+async def main(wait_for_agent):
     
     tracker = GroqRequestTracker()
 
     while (prompt := input("\nEnter a prompt (q to quit): ")) != "q":
 
         try:
+            wait_for_agent()
             response = await tracker.send_request(prompt_agent, prompt)
             print(str(response))
         except Exception as e:
             print(e)
 
     print(tracker.get_stats())
+    print("Document prefetch:", prefetcher.get_stats())
+    if llm is not None:
+        print("LLM routing:", llm.get_stats())
+    if tracing.tracer.enabled:
+        print("Stage latency:", tracing.summary())
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Windows Assistant command line interface")
+    parser.add_argument("--batch", metavar="PROMPTS.jsonl", help="run prompts from a JSONL file instead of the interactive loop")
+    parser.add_argument("--out", default="batch_results.jsonl", help="where to write per-prompt results in batch mode")
+    parser.add_argument("--concurrency", type=int, default=4, help="prompts in flight at once in batch mode")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-prompt timeout in seconds in batch mode")
+    parser.add_argument("--live-tools", action="store_true", help="let batch prompts really open apps and save notes")
+    parser.add_argument("--usage", type=int, metavar="DAYS", help="print request history for the last DAYS days and exit")
+    parser.add_argument("--server", metavar="URL", help="use a running server.py (e.g. http://127.0.0.1:8765) instead of a local agent")
+    args = parser.parse_args(argv)
+    if args.usage is not None and args.usage < 1:
+        parser.error("--usage needs at least 1 day")
+    return args
+
+# Ingest workers are spawned processes that re-import this module as __mp_main__,
+# so environment and tracing setup only happen here
 if __name__ == "__main__":
-    asyncio.run(main()) 
+    from dotenv import load_dotenv
+    load_dotenv()
+    tracing.configure()
+    args = parse_args()
+    if args.usage is not None:
+        archive = UsageArchive()
+        archive.compact()  # no tracker has run yet to roll up finished days
+        print(format_summary(archive.last_days(args.usage)))
+        sys.exit(0)
+    if args.server:
+        run_thin_client(args.server)
+        sys.exit(0)
+    if args.batch:
+        try:
+            load_batch(args.batch)  # reject a malformed file before loading the agent
+        except (OSError, ValueError) as e:
+            sys.exit(f"Cannot run batch: {e}")
+        setup_agent()
+        summary = asyncio.run(run_batch(args.batch, args.out, args.concurrency, args.live_tools, args.timeout))
+        sys.exit(1 if summary["errors"] == summary["requests"] and summary["requests"] else 0)
+    asyncio.run(main(start_setup())) 
 
 
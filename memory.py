@@ -0,0 +1,148 @@
+import threading
+
+
+def default_token_counter():
+    """Return a callable that counts tokens in a string"""
+    try:
+        from llama_index.core.utils import get_tokenizer
+        tokenizer = get_tokenizer()
+        return lambda text: len(tokenizer(text))
+    except Exception:
+        # Rough estimate when no tokenizer is available (~4 chars per token)
+        return lambda text: max(1, len(text) // 4)
+
+
+def llm_summarizer(llm):
+    """Build a summarizer that folds turns into the running summary with the given LLM"""
+    from prompts import summary_prompt_str
+
+    def summarize(summary, turns):
+        transcript = "\n".join(f"User: {user}\nAssistant: {assistant}" for user, assistant in turns)
+        prompt = summary_prompt_str.format(summary=summary or "(none)", transcript=transcript)
+        return str(llm.complete(prompt)).strip()
+    return summarize
+
+
+class ConversationMemory:
+    """
+    Token-budgeted conversation memory for the agent.
+
+    Recent turns are kept verbatim while they fit in `token_budget`. When the
+    window overflows, the oldest turns are folded into a running summary on a
+    background thread so the next prompt never waits on summarization. Folding
+    drains the window down to `low_water` of the budget in one go, so the
+    history prefix (summary + oldest kept turns) only changes every few turns
+    and the backend can keep reusing its prefix cache in between.
+    """
+
+    def __init__(self, token_budget=1500, summary_budget=300, low_water=0.5,
+                 summarizer=None, count_tokens=None):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.low_water = low_water
+        self.summarizer = summarizer
+        self.count_tokens = count_tokens or default_token_counter()
+
+        self.summary = ""
+        self.turns = []           # [(user, assistant, tokens)]
+        self.window_tokens = 0
+        self.last_stats = {}
+
+        self._lock = threading.Lock()
+        self._folding = None
+        self._generation = 0
+
+    def build_history(self, prompt):
+        """Return (chat_history, prompt_tokens) for the next agent run; prompt_tokens covers summary, history and prompt"""
+        from llama_index.core.llms import ChatMessage
+        with self._lock:
+            history = []
+            summary_tokens = 0
+            if self.summary:
+                history.append(ChatMessage(role="system", content=f"Summary of the earlier conversation:\n{self.summary}"))
+                summary_tokens = self.count_tokens(self.summary)
+            for user, assistant, _ in self.turns:
+                history.append(ChatMessage(role="user", content=user))
+                history.append(ChatMessage(role="assistant", content=assistant))
+
+            prompt_tokens = self.count_tokens(prompt)
+            self.last_stats = {
+                "summary_tokens": summary_tokens,
+                "history_tokens": self.window_tokens,
+                "prompt_tokens": prompt_tokens,
+                "total_tokens": summary_tokens + self.window_tokens + prompt_tokens,
+                "turns": len(self.turns),
+            }
+            return history, self.last_stats["total_tokens"]
+
+    def add_turn(self, user, assistant):
+        """Record a finished turn and fold old turns if the window overflowed"""
+        tokens = self.count_tokens(user) + self.count_tokens(assistant)
+        with self._lock:
+            self.turns.append((user, assistant, tokens))
+            self.window_tokens += tokens
+            if self.window_tokens <= self.token_budget or self._folding is not None:
+                return
+
+            # Folded turns stay in the window until their summary is swapped in,
+            # so no prompt is built while they are in neither
+            target = int(self.token_budget * self.low_water)
+            folded, remaining = [], self.window_tokens
+            for old_user, old_assistant, old_tokens in self.turns:
+                if remaining <= target:
+                    break
+                remaining -= old_tokens
+                folded.append((old_user, old_assistant))
+
+            self._folding = threading.Thread(target=self._fold, args=(self._generation, self.summary, folded), daemon=True)
+            self._folding.start()
+
+    def restore(self, turns):
+        """
+        Load earlier (user, assistant) turns, e.g. from a resumed session.
+        Only the newest turns that fit in the budget are kept; older ones are
+        dropped rather than summarized, so startup never waits on the LLM.
+        """
+        restored, tokens = [], 0
+        for user, assistant in reversed(turns):
+            turn_tokens = self.count_tokens(user) + self.count_tokens(assistant)
+            if tokens + turn_tokens > self.token_budget:
+                break
+            restored.append((user, assistant, turn_tokens))
+            tokens += turn_tokens
+        with self._lock:
+            self.turns[:0] = reversed(restored)
+            self.window_tokens += tokens
+
+    def _fold(self, generation, summary, folded):
+        try:
+            if self.summarizer is not None:
+                new_summary = self.summarizer(summary, folded)
+            else:
+                new_summary = "\n".join([summary] + [f"User asked: {user}" for user, _ in folded]).strip()
+            new_summary = self._trim(new_summary)
+        except Exception:
+            new_summary = None
+        with self._lock:
+            # A failed fold keeps the turns verbatim; the next overflowing turn retries
+            if generation == self._generation and new_summary is not None:
+                self.summary = new_summary
+                for _ in folded:
+                    _, _, old_tokens = self.turns.pop(0)
+                    self.window_tokens -= old_tokens
+            self._folding = None
+
+    def _trim(self, text):
+        """Keep the summary inside summary_budget, dropping the oldest lines first"""
+        lines = text.splitlines()
+        while len(lines) > 1 and self.count_tokens("\n".join(lines)) > self.summary_budget:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.summary = ""
+            self.turns.clear()
+            self.window_tokens = 0
+            self.last_stats = {}
@@ -0,0 +1,62 @@
+import math
+import threading
+from collections import deque
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile (q in 0-100) of an iterable of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * q / 100.0
+    low, high = math.floor(rank), math.ceil(rank)
+    if low == high:
+        return ordered[int(rank)]
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class LatencyStats:
+    """EWMA plus windowed percentiles over recent latency samples (seconds)"""
+
+    def __init__(self, alpha=0.2, window=200):
+        self.alpha = alpha
+        self.samples = deque(maxlen=window)
+        self.ewma = None
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+            self.count += 1
+            self.ewma = seconds if self.ewma is None else self.alpha * seconds + (1 - self.alpha) * self.ewma
+
+    def percentile(self, q):
+        with self._lock:
+            return percentile(self.samples, q)
+
+    def summary(self):
+        with self._lock:
+            return {
+                "count": self.count,
+                "ewma": round(self.ewma or 0.0, 4),
+                "p50": round(percentile(self.samples, 50), 4),
+                "p95": round(percentile(self.samples, 95), 4),
+            }
+
+
+def process_memory_mb():
+    """Resident memory of this process in MB (peak RSS where current RSS is unavailable)"""
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / 1_048_576, 1)
+    except ImportError:
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes on Linux
+        return round(peak / (1_048_576 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        return None
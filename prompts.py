@@ -70,12 +70,19 @@ Do not generate extra thoughts or reasoning steps when a direct answer or tool c
     4. Only one call per user request.
 
 ### Note Saver
-- Trigger: user input contains "note" or "save".
+- Trigger: user asks to save, make or write down a note.
 - Behavior:
     1. Use the 'note_saver' tool to append the note to notes.txt.
     2. Respond with the message returned by the tool as-is; do not rephrase.
     3. Only one call per user request.
 
+### Note Search
+- Trigger: user asks what they noted, saved or wrote down about something.
+- Behavior:
+    1. Call the 'note_search' tool with Action Input set to the topic words only.
+    2. Answer from the returned notes; if none were found, say so.
+    3. Only one call per user request.
+
 ### Document Tool
 - Trigger: user input relates to any topics in the user's notes or syllabus PDFs.
 - Behavior:
@@ -110,3 +117,14 @@ Answer: [your answer in natural language]
 react_header = PromptTemplate(react_header_str)
 
 
+summary_prompt_str = """\
+Update the running summary of a conversation between a user and their Windows assistant.
+Keep names, facts, preferences and open tasks. Drop greetings and tool chatter.
+Answer with the new summary only, as short bullet lines.
+
+Current summary:
+{summary}
+
+New turns:
+{transcript}
+"""
@@ -0,0 +1,304 @@
+"""
+Backend selection for the LLM router: health, latency and quota bookkeeping
+per backend, plus the hedged/failover call loops. Nothing here depends on
+llama_index; `llm_router.LLMRouter` wraps a `BackendRouter` in the LLM
+interface, and tests drive it with fake backends.
+"""
+import time
+import asyncio
+from metrics import LatencyStats
+from tracing import span
+from tracker.rate_limiter import extract_token_usage
+
+# A backend needs this many samples before its own p95 is trusted for hedging
+MIN_SAMPLES_FOR_HEDGE = 5
+
+
+class Backend:
+    """One LLM endpoint plus the health, latency and quota state the router keeps for it"""
+
+    def __init__(self, name, llm, tracker=None, max_failures=3, cooldown=30.0):
+        self.name = name
+        self.llm = llm
+        self.tracker = tracker
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+
+        self.latency = LatencyStats()
+        self.ttft = LatencyStats()
+        self.calls = 0
+        self.errors = 0
+        self.wins = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.last_error = None
+
+    def quota_headroom(self):
+        """Fraction of the tightest tracked quota still unused (1.0 if untracked)"""
+        if self.tracker is None:
+            return 1.0
+        stats = self.tracker.get_stats()
+        headroom = 1.0
+        if "Pressure" in stats:
+            utilization = stats["Pressure"]["utilization"].values()
+            headroom = 1 - max(utilization, default=0.0)
+        # The admission buckets start full on restart; the tracker's counts include history from disk
+        limits = getattr(self.tracker, "limits", None) or {}
+        if limits.get("rpm"):
+            headroom = min(headroom, 1 - stats["RPM"] / limits["rpm"])
+        if limits.get("rpd"):
+            headroom = min(headroom, 1 - stats["RPD"] / limits["rpd"])
+        return max(0.0, headroom)
+
+    def available(self):
+        return time.monotonic() >= self.cooldown_until and self.quota_headroom() > 0
+
+    def expected_latency(self):
+        for stats in (self.latency, self.ttft):
+            if stats.ewma is not None:
+                return stats.ewma
+        return 0.0
+
+    def hedge_delay(self, streaming, default):
+        stats = self.ttft if streaming else self.latency
+        if stats.count < MIN_SAMPLES_FOR_HEDGE:
+            return default
+        return stats.percentile(95)
+
+    def record_success(self, seconds, streaming):
+        (self.ttft if streaming else self.latency).observe(seconds)
+        self.consecutive_failures = 0
+
+    def record_failure(self, error):
+        self.errors += 1
+        self.consecutive_failures += 1
+        self.last_error = str(error)
+        if self.consecutive_failures >= self.max_failures:
+            self.cooldown_until = time.monotonic() + self.cooldown
+
+    def summary(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "wins": self.wins,
+            "latency": self.latency.summary(),
+            "ttft": self.ttft.summary(),
+            "quota_headroom": round(self.quota_headroom(), 3),
+            "cooling_down": time.monotonic() < self.cooldown_until,
+            "last_error": self.last_error,
+        }
+
+
+class BackendRouter:
+    """
+    Ranks backends by EWMA latency, pushes back those whose provider quota
+    runs low and skips those cooling down after repeated errors. `route`
+    hedges: if the running backend has not answered (or produced its first
+    chunk) within its own p95, the next one is started too and the first
+    answer wins. Errors fail over to the next backend immediately.
+    """
+
+    def __init__(self, backends, hedge_after=8.0, low_quota=0.2):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = list(backends)
+        self.hedge_after = hedge_after
+        self.low_quota = low_quota
+        self.stats = {"requests": 0, "hedges": 0, "hedge_wins": 0, "failovers": 0, "failures": 0}
+
+    def ranked_backends(self):
+        """Healthy backends, fastest first, with low-quota backends moved to the back"""
+        healthy = [b for b in self.backends if b.available()]
+        if not healthy:
+            # Everything is cooling down or out of quota; try them all rather than fail outright
+            healthy = [b for b in self.backends if b.quota_headroom() > 0] or list(self.backends)
+        order = {id(b): i for i, b in enumerate(self.backends)}
+        return sorted(healthy, key=lambda b: (
+            b.quota_headroom() < self.low_quota,
+            b.expected_latency(),
+            order[id(b)],
+        ))
+
+    def get_stats(self):
+        return {**self.stats, "backends": {b.name: b.summary() for b in self.backends}}
+
+    # Async: hedged and with failover
+
+    async def _call_backend(self, backend, call, streaming):
+        backend.calls += 1
+        started = time.perf_counter()
+        with span("llm.backend", backend=backend.name, streaming=streaming):
+            if backend.tracker is None:
+                result = await call(backend)
+            elif streaming:
+                result = await self._metered_stream(backend.tracker, call, backend)
+            else:
+                result = await backend.tracker.send_request(call, backend)
+        backend.record_success(time.perf_counter() - started, streaming)
+        return result
+
+    async def _metered_stream(self, tracker, call, backend):
+        """
+        Streaming counterpart of tracker.send_request for calls returning
+        (stream, first_chunk): the usage only arrives with the last chunk, so
+        the request is settled and recorded when the stream ends or is closed.
+        """
+        estimate = await tracker.admit()
+        started = time.perf_counter()
+        gen, first = await call(backend)
+
+        def on_end(last):
+            tracker.complete(estimate, extract_token_usage(last), time.perf_counter() - started)
+
+        return _MeteredStream(gen, first, on_end), first
+
+    async def route(self, call, streaming=False, discard=None):
+        self.stats["requests"] += 1
+        queue = self.ranked_backends()
+        tasks = {}
+        errors = []
+        hedged = False
+
+        def start(backend):
+            """Run `call` on backend; returns when it should be hedged"""
+            tasks[asyncio.ensure_future(self._call_backend(backend, call, streaming))] = backend
+            return time.monotonic() + backend.hedge_delay(streaming, self.hedge_after)
+
+        primary = queue.pop(0)
+        deadline = start(primary)
+
+        try:
+            while tasks:
+                timeout = None
+                if not hedged and queue:
+                    timeout = max(0.0, deadline - time.monotonic())
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedged = True
+                    self.stats["hedges"] += 1
+                    start(queue.pop(0))
+                    continue
+
+                winner = None
+                for task in done:
+                    backend = tasks.pop(task)
+                    if task.exception() is not None:
+                        backend.record_failure(task.exception())
+                        errors.append(f"{backend.name}: {task.exception()}")
+                        if queue:
+                            self.stats["failovers"] += 1
+                            replacement_deadline = start(queue.pop(0))
+                            if not hedged:
+                                # The failover backend gets its own hedge delay, counted from its start
+                                deadline = replacement_deadline
+                    elif winner is None:
+                        winner = (backend, task.result())
+                    elif discard is not None:
+                        await discard(task.result())
+
+                if winner is not None:
+                    backend, result = winner
+                    backend.wins += 1
+                    if hedged and backend is not primary:
+                        self.stats["hedge_wins"] += 1
+                    return result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        self.stats["failures"] += 1
+        raise RuntimeError("All LLM backends failed: " + "; ".join(errors))
+
+    async def first_chunk(self, open_stream):
+        """Route a streaming call, counting it as answered once the first chunk arrives"""
+        async def call(backend):
+            gen = await open_stream(backend)
+            return gen, await gen.__anext__()
+
+        async def discard(result):
+            await result[0].aclose()
+
+        gen, first = await self.route(call, streaming=True, discard=discard)
+
+        async def stream():
+            try:
+                yield first
+                async for chunk in gen:
+                    yield chunk
+            finally:
+                # Closing early still releases the connection and settles the backend's usage
+                await gen.aclose()
+
+        return stream()
+
+    # Sync: failover only
+
+    def route_sync(self, call, streaming=False):
+        self.stats["requests"] += 1
+        errors = []
+        for i, backend in enumerate(self.ranked_backends()):
+            if i:
+                self.stats["failovers"] += 1
+            backend.calls += 1
+            started = time.perf_counter()
+            try:
+                result = call(backend)
+                if streaming:
+                    result = _started_stream(result)
+            except Exception as e:
+                backend.record_failure(e)
+                errors.append(f"{backend.name}: {e}")
+                continue
+            backend.record_success(time.perf_counter() - started, streaming)
+            backend.wins += 1
+            return result
+        self.stats["failures"] += 1
+        raise RuntimeError("All LLM backends failed: " + "; ".join(errors))
+
+
+class _MeteredStream:
+    """Async iterator over the rest of a stream that calls on_end(last_chunk) once, when it ends"""
+
+    def __init__(self, gen, first, on_end):
+        self.gen = gen
+        self.last = first
+        self.on_end = on_end
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            self.last = await self.gen.__anext__()
+        except BaseException:
+            self._end()
+            raise
+        return self.last
+
+    async def aclose(self):
+        # Also reached by hedge losers, which are closed before anyone iterates them
+        self._end()
+        await self.gen.aclose()
+
+    def _end(self):
+        on_end, self.on_end = self.on_end, None
+        if on_end is not None:
+            on_end(self.last)
+
+
+def _started_stream(gen):
+    """
+    Pull the first chunk of a lazy stream now, so connection errors surface
+    inside route_sync (where they fail over) instead of in the caller's loop.
+    """
+    try:
+        first = next(gen)
+    except StopIteration:
+        return iter(())
+
+    def stream():
+        yield first
+        yield from gen
+
+    return stream()
@@ -0,0 +1,247 @@
+"""
+Local assistant server: loads the agent, LLM router and document index once
+and serves them to any number of thin clients (main.py / main_cli.py with
+--server) over HTTP/JSON on localhost.
+
+    python server.py --port 8765
+
+Endpoints
+    GET  /health   readiness of the agent and document index
+    GET  /stats    tracker, routing, prefetch, re-rank, stage latency and memory stats
+    POST /chat     {"prompt", "session"} -> NDJSON stream of delta/tool/done events
+    POST /sessions/reset {"session", "turns"} -> forget a session's history, optionally
+                   seeding it with earlier [user, assistant] turns (a resumed transcript)
+    POST /search   {"query", "k", "subject"} -> {"results": [{"source", "text"}]}
+    POST /notes    {"note"} -> {"result"}
+    POST /notes/search {"query"} -> {"result"}
+"""
+import os
+import json
+import time
+import queue
+import asyncio
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+# Only light modules at import: ingest workers are spawned processes that re-import
+# this module as __mp_main__. llama_index and the LLM clients load in AssistantService.
+from engines.note_engine import save_note, search_notes
+from engines.document_engine import get_doc_engine, prefetch_documents, prefetcher, rerank_stats
+from engines.doc_prefetch import current_session
+from engines.tools import build_tools
+from tracker.tracker import GroqRequestTracker
+from metrics import process_memory_mb
+import tracing
+
+
+class AssistantService:
+    """
+    The shared agent plus one conversation memory per client session. The
+    agent, its LLM and the request tracker are built here unless passed in.
+    """
+
+    def __init__(self, warm_documents=True, agent=None, llm=None, tracker=None):
+        if agent is None:
+            from llama_index.core.agent.workflow import ReActAgent
+            from prompts import react_header
+            from llm_router import build_router
+
+            llm = build_router(request_timeout=30.0, context_window=8000)
+            agent = ReActAgent(
+                tools=build_tools(),
+                llm=llm,
+                max_iterations=1
+            )
+            agent.update_prompts({"react_header": react_header})
+        self.llm = llm
+        self.agent = agent
+        self.tracker = tracker or GroqRequestTracker()
+        self.sessions = {}
+        self._sessions_lock = threading.Lock()
+        self.documents_ready = False
+        self.started = time.time()
+
+        # All agent work runs on one event loop; HTTP handler threads submit to it
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+        if warm_documents:
+            threading.Thread(target=self._warm_documents, daemon=True).start()
+
+    def _warm_documents(self):
+        get_doc_engine()
+        self.documents_ready = True
+
+    def _new_memory(self):
+        from memory import ConversationMemory, llm_summarizer
+        return ConversationMemory(token_budget=3000, summary_budget=500,
+                                  summarizer=llm_summarizer(self.llm) if self.llm is not None else None)
+
+    def memory_for(self, session):
+        with self._sessions_lock:
+            if session not in self.sessions:
+                self.sessions[session] = self._new_memory()
+            return self.sessions[session]
+
+    def reset(self, session, turns=()):
+        """Forget a session's conversation; `turns` ([user, assistant] pairs) seed the new one"""
+        with self._sessions_lock:
+            self.sessions.pop(session, None)
+        prefetcher.discard(session)
+        if turns:
+            self.memory_for(session).restore([(user, assistant) for user, assistant in turns])
+
+    def chat(self, prompt, session, emit):
+        """Run a prompt on the shared loop, calling emit(event) from the loop thread"""
+        return asyncio.run_coroutine_threadsafe(self._chat(prompt, session, emit), self.loop)
+
+    async def _stream(self, prompt, chat_history, emit):
+        """Run the agent, emitting its text deltas and tool results; returns the final response"""
+        from llama_index.core.agent.workflow import AgentStream, ToolCallResult
+        handler = self.agent.run(prompt, chat_history=chat_history)
+        async for ev in handler.stream_events():
+            if isinstance(ev, AgentStream) and ev.delta:
+                emit({"type": "delta", "text": ev.delta})
+            elif isinstance(ev, ToolCallResult):
+                emit({"type": "tool", "name": ev.tool_name, "input": ev.tool_kwargs,
+                      "output": str(ev.tool_output)})
+        return await handler
+
+    async def _chat(self, prompt, session, emit):
+        memory = self.memory_for(session)
+        # Each chat runs as its own task, so this only scopes prefetches to this session
+        current_session.set(session)
+        try:
+            with tracing.span("prompt_agent", chars=len(prompt), session=session):
+                chat_history, prompt_tokens = memory.build_history(prompt)
+                prefetch_documents(prompt)
+                response = str(await self.tracker.send_request(self._stream, prompt, chat_history, emit))
+                memory.add_turn(prompt, response)
+            emit({"type": "done", "response": response, "prompt_tokens": prompt_tokens})
+        except Exception as e:
+            emit({"type": "error", "error": str(e)})
+
+    def search(self, query, k=3, subject=None):
+        results = get_doc_engine().search(query, k=k, subject=subject)
+        return [{"source": src, "text": text} for text, src in results]
+
+    def stats(self):
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "sessions": len(self.sessions),
+            "documents_ready": self.documents_ready,
+            "memory_mb": process_memory_mb(),
+            "tracker": self.tracker.get_stats(),
+            "llm": self.llm.get_stats() if self.llm is not None else None,
+            "prefetch": prefetcher.get_stats(),
+            "rerank": rerank_stats(),
+            "stages": tracing.summary(),
+        }
+
+
+def make_handler(service):
+    # Longest gap between streamed chat events before the run is abandoned
+    event_timeout = float(os.getenv("SERVER_EVENT_TIMEOUT", "120"))
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok", "documents_ready": service.documents_ready})
+            elif self.path == "/stats":
+                self._send_json(200, service.stats())
+            else:
+                self._send_json(404, {"error": f"unknown endpoint {self.path}"})
+
+        def do_POST(self):
+            try:
+                body = self._read_json()
+                if self.path == "/chat":
+                    self._chat(body)
+                elif self.path == "/search":
+                    self._send_json(200, {"results": service.search(body["query"], int(body.get("k", 3)),
+                                                                    body.get("subject"))})
+                elif self.path == "/notes":
+                    self._send_json(200, {"result": save_note(body["note"])})
+                elif self.path == "/notes/search":
+                    self._send_json(200, {"result": search_notes(body["query"])})
+                elif self.path == "/sessions/reset":
+                    service.reset(body["session"], body.get("turns") or ())
+                    self._send_json(200, {"status": "ok"})
+                else:
+                    self._send_json(404, {"error": f"unknown endpoint {self.path}"})
+            except KeyError as e:
+                self._send_json(400, {"error": f"missing field {e}"})
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+
+        def _chat(self, body):
+            events = queue.Queue()
+            future = service.chat(body["prompt"], body.get("session", "default"), events.put)
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            # Headers are out: from here on failures end the stream, never start a new response
+            try:
+                while True:
+                    try:
+                        event = events.get(timeout=event_timeout)
+                    except queue.Empty:
+                        future.cancel()
+                        event = {"type": "error", "error": f"no response from the agent for {event_timeout:.0f}s"}
+                    self._write_chunk((json.dumps(event, default=str) + "\n").encode())
+                    if event["type"] in ("done", "error"):
+                        break
+                self._write_chunk(b"")
+            except OSError:
+                # Client disconnected mid-stream; stop the agent run instead of finishing it for nobody
+                future.cancel()
+                self.close_connection = True
+
+        def _write_chunk(self, data):
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=8765):
+    service = AssistantService()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    print(f"Assistant server listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    tracing.configure()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    serve(args.host, args.port)
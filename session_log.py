@@ -0,0 +1,122 @@
+import os
+import json
+import threading
+from array import array
+from datetime import datetime
+
+
+class SessionLog:
+    """
+    Append-only chat transcript on disk: one JSON line per message in
+    `<name>.jsonl`, plus `<name>.idx` holding the byte offset of every line
+    (little-endian uint64) so any page of messages is read with one seek.
+    An index left behind by a crash is caught up from the log on open, and
+    a torn last line is dropped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = os.path.splitext(path)[0] + ".idx"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self.offsets = array("Q")
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                self.offsets.frombytes(f.read(os.path.getsize(self.index_path) // 8 * 8))
+        self._recover()
+        self._log = open(path, "ab")
+        self._index = open(self.index_path, "ab")
+
+    def _recover(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        keep = len(self.offsets)
+        while keep and self.offsets[keep - 1] >= size:
+            keep -= 1
+        # Re-check the last indexed line too, it may be the torn one
+        keep = max(keep - 1, 0)
+        start = self.offsets[keep] if keep < len(self.offsets) else 0
+        stale = self.offsets[keep:]
+        del self.offsets[keep:]
+        added = array("Q")
+        position = start
+        if size > start:
+            with open(self.path, "rb") as f:
+                f.seek(start)
+                for line in iter(f.readline, b""):
+                    if not line.endswith(b"\n"):
+                        break
+                    added.append(position)
+                    position += len(line)
+            if position < size:
+                with open(self.path, "r+b") as f:
+                    f.truncate(position)
+        self.offsets.extend(added)
+
+        # Only touch the index where it disagrees with the log: drop stale entries, append missing ones
+        valid = 0
+        while valid < min(len(stale), len(added)) and stale[valid] == added[valid]:
+            valid += 1
+        valid += keep
+        on_disk = os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0
+        if on_disk != valid * 8 or len(self.offsets) > valid:
+            with open(self.index_path, "ab") as f:
+                f.truncate(valid * 8)
+                self.offsets[valid:].tofile(f)
+
+    def append(self, sender, message, timestamp=None):
+        """Write one message; returns its position in the session"""
+        entry = {"sender": sender, "message": message,
+                 "timestamp": timestamp or datetime.now().isoformat(timespec="seconds")}
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            offset = self._log.tell()
+            self._log.write(line)
+            self._log.flush()
+            self._index.write(array("Q", [offset]).tobytes())
+            self._index.flush()
+            self.offsets.append(offset)
+            return len(self.offsets) - 1
+
+    def read(self, start, stop):
+        """Messages [start, stop) as dicts"""
+        with self._lock:
+            start, stop = max(0, start), min(stop, len(self.offsets))
+            if start >= stop:
+                return []
+            with open(self.path, "rb") as f:
+                f.seek(self.offsets[start])
+                return [json.loads(f.readline()) for _ in range(stop - start)]
+
+    def recent_turns(self, count=100):
+        """The last `count` messages as (user, assistant) pairs, skipping messages without a partner"""
+        turns, user = [], None
+        for entry in self.tail(count):
+            if entry["sender"] == "user":
+                user = entry["message"]
+            elif user is not None:
+                turns.append((user, entry["message"]))
+                user = None
+        return turns
+
+    def tail(self, count):
+        return self.read(len(self) - count, len(self))
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def close(self):
+        with self._lock:
+            self._log.close()
+            self._index.close()
+
+
+def new_session_path(directory=os.path.join("data", "sessions")):
+    return os.path.join(directory, f"session_{datetime.now():%Y%m%d_%H%M%S_%f}.jsonl")
+
+
+def latest_session_path(directory=os.path.join("data", "sessions")):
+    """Most recent session log in the directory, or None"""
+    if not os.path.isdir(directory):
+        return None
+    logs = sorted(name for name in os.listdir(directory) if name.startswith("session_") and name.endswith(".jsonl"))
+    return os.path.join(directory, logs[-1]) if logs else None
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tracing  # noqa: E402
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    """Tracing enabled into a temporary JSONL file for the duration of a test"""
+    path = tmp_path / "trace.jsonl"
+    tracing.configure(enabled=True, path=str(path))
+    yield path
+    tracing.configure(enabled=False)
+    for handler in list(tracing.tracer._logger.handlers):
+        tracing.tracer._logger.removeHandler(handler)
+        handler.close()
+    tracing.tracer._logger = None
+    tracing.tracer.samples.clear()
+
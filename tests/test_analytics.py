@@ -0,0 +1,89 @@
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from main_cli import parse_args
+from tracker.analytics import STALE_LOCK_SECONDS, UsageArchive
+from tracker.tracker import GroqRequestTracker
+
+DAY = date(2025, 9, 30)
+
+
+def write_day(store_dir, day=DAY):
+    midnight = datetime.combine(day, datetime.min.time()).timestamp()
+    (store_dir / f"tracker_{day.isoformat()}.log").write_text(
+        f"{midnight + 60:.6f}\t120\t250\n{midnight + 61:.6f}\t80\t900\n{midnight + 3600:.6f}\n", encoding="utf-8")
+    (store_dir / f"tracker_{day.isoformat()}.json").write_text(json.dumps([midnight + 7200]), encoding="utf-8")
+
+
+def test_compact_keeps_raw_files_by_default(tmp_path):
+    write_day(tmp_path)
+    archive = UsageArchive(tmp_path)
+    assert archive.compact(before=date(2025, 10, 1)) == [DAY]
+    assert (tmp_path / "tracker_2025-09-30.log").exists()
+    assert (tmp_path / "tracker_2025-09-30.json").exists()
+
+
+def test_compact_deletes_raw_files_only_when_asked(tmp_path):
+    write_day(tmp_path)
+    UsageArchive(tmp_path).compact(before=date(2025, 10, 1), delete_raw=True)
+    assert not list(tmp_path.glob("tracker_*"))
+
+
+def test_archive_answers_like_the_raw_files(tmp_path):
+    write_day(tmp_path)
+    raw = UsageArchive(tmp_path).query(DAY, DAY)
+    archive = UsageArchive(tmp_path)
+    archive.compact(before=date(2025, 10, 1), delete_raw=True)
+
+    reopened = UsageArchive(tmp_path)
+    assert reopened.query(DAY, DAY) == raw
+    assert raw["requests"] == 4
+    assert raw["tokens"] == 200
+    assert raw["peak_rpm"] == 2
+
+
+def test_compacting_twice_adds_nothing(tmp_path):
+    write_day(tmp_path)
+    archive = UsageArchive(tmp_path)
+    archive.compact(before=date(2025, 10, 1))
+    assert archive.compact(before=date(2025, 10, 1)) == []
+    assert UsageArchive(tmp_path).days == ["2025-09-30"]
+
+
+def test_tracker_compacts_finished_days_on_start(tmp_path):
+    today = date.today()
+    write_day(tmp_path, today - timedelta(days=1))
+    write_day(tmp_path, today)
+    tracker = GroqRequestTracker(store_dir=str(tmp_path), flush_interval=0)
+    tracker._compactor.join(5)
+    tracker.close()
+    assert UsageArchive(tmp_path).days == [(today - timedelta(days=1)).isoformat()]
+    # Today is still queried from its raw files
+    assert UsageArchive(tmp_path).last_days(2)["requests"] == 8
+
+
+def test_compact_skips_while_another_process_holds_the_lock(tmp_path):
+    write_day(tmp_path)
+    archive = UsageArchive(tmp_path)
+    archive.dir.mkdir()
+    lock = archive.dir / "compact.lock"
+    lock.touch()
+    assert archive.compact(before=date(2025, 10, 1)) == []
+
+    # A lock left behind by a crash is taken over
+    stale = time.time() - STALE_LOCK_SECONDS - 1
+    os.utime(lock, (stale, stale))
+    assert archive.compact(before=date(2025, 10, 1)) == [DAY]
+    assert not lock.exists()
+
+
+def test_usage_days_must_be_positive(capsys):
+    assert parse_args(["--usage", "1"]).usage == 1
+    assert parse_args([]).usage is None
+    with pytest.raises(SystemExit):
+        parse_args(["--usage", "0"])
+    assert "--usage needs at least 1 day" in capsys.readouterr().err
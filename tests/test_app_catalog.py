@@ -0,0 +1,86 @@
+import os
+import threading
+
+from engines import app_engine
+from engines.app_catalog import AppCatalog, AppOpenerSource
+
+
+class FakeSource:
+    name = "fake"
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.listed = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def list_apps(self):
+        self.release.wait(5)
+        self.listed += 1
+        return [{"name": name, "target": name} for name in self.names]
+
+    def signature(self):
+        return ",".join(self.names)
+
+    def launch(self, app):
+        self.launched = app["name"]
+
+
+def make_catalog(tmp_path, source, **kwargs):
+    return AppCatalog(source, cache_file=str(tmp_path / "apps.json"), aliases_file=None, refresh_interval=0, **kwargs)
+
+
+def test_ranked_fuzzy_matching(tmp_path):
+    catalog = make_catalog(tmp_path, FakeSource(["Visual Studio Code", "Visual Studio 2022", "Spotify"]))
+    assert catalog.match("spotify")[0] == ({"name": "Spotify", "target": "Spotify"}, 1.0)
+    assert catalog.match("vs code")[0][0]["name"] == "Visual Studio Code"
+    assert catalog.match("spotfy")[0][0]["name"] == "Spotify"
+
+
+def test_unchanged_signature_does_not_relist(tmp_path):
+    source = FakeSource(["Spotify"])
+    make_catalog(tmp_path, source)
+    assert source.listed == 1
+
+    reopened = make_catalog(tmp_path, source)
+    assert source.listed == 1
+    assert reopened.apps == [{"name": "Spotify", "target": "Spotify"}]
+
+
+def test_start_menu_signature_changes_without_enumerating_apps(tmp_path):
+    programs = tmp_path / "Programs"
+    (programs / "Tools").mkdir(parents=True)
+    source = AppOpenerSource(start_menu_dirs=[str(programs)])
+    before = source.signature()
+    assert source.signature() == before
+
+    shortcut = programs / "Tools" / "New App.lnk"
+    shortcut.write_text("")
+    stamp = os.path.getmtime(programs / "Tools") + 5
+    os.utime(programs / "Tools", (stamp, stamp))
+    assert source.signature() != before
+
+
+def test_miss_waits_briefly_for_a_background_refresh(tmp_path, monkeypatch):
+    source = FakeSource(["Spotify"])
+    catalog = make_catalog(tmp_path, source)
+    monkeypatch.setattr(app_engine, "app_catalog", catalog)
+
+    source.names.append("Obsidian")
+    assert app_engine.open_application("obsidian").startswith("Opened Obsidian")
+    assert source.launched == "Obsidian"
+
+
+def test_slow_refresh_does_not_hold_up_the_tool(tmp_path, monkeypatch):
+    source = FakeSource(["Spotify"])
+    catalog = make_catalog(tmp_path, source)
+    monkeypatch.setattr(app_engine, "app_catalog", catalog)
+    monkeypatch.setattr(app_engine, "REFRESH_WAIT", 0.05)
+
+    source.names.append("Obsidian")
+    source.release.clear()
+    assert app_engine.open_application("obsidian").startswith("Could not find")
+
+    source.release.set()
+    catalog.refresh_async().wait(5)
+    assert app_engine.open_application("obsidian").startswith("Opened Obsidian")
@@ -0,0 +1,84 @@
+import inspect
+
+import pytest
+
+from engines.dry_run import dry_run_fn
+from main_cli import load_batch, summarize_batch
+
+
+def write_lines(tmp_path, *lines):
+    path = tmp_path / "prompts.jsonl"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_load_batch_accepts_objects_and_strings(tmp_path):
+    path = write_lines(tmp_path, '{"id": "a", "prompt": "open notepad"}', "", '"what is in my notes"',
+                       '{"prompt": "search cloud computing", "tag": "docs"}')
+    assert load_batch(path) == [
+        {"id": "a", "prompt": "open notepad"},
+        {"id": 3, "prompt": "what is in my notes"},
+        {"id": 4, "prompt": "search cloud computing", "tag": "docs"},
+    ]
+
+
+@pytest.mark.parametrize("line, message", [
+    ('{"id": 1}', 'missing or empty "prompt"'),
+    ('{"prompt": "  "}', 'missing or empty "prompt"'),
+    ('{"prompt": 42}', 'missing or empty "prompt"'),
+    ('[1, 2]', "expected an object or a string, got list"),
+    ('{"prompt": ', "invalid JSON"),
+])
+def test_load_batch_names_the_bad_line(tmp_path, line, message):
+    path = write_lines(tmp_path, '"fine"', line)
+    with pytest.raises(ValueError) as error:
+        load_batch(path)
+    assert f"{path}:2: {message}" in str(error.value)
+
+
+def result(latency, error=None, tools=(), ttft=None):
+    return {"latency_s": latency, "error": error, "tool_calls": list(tools), "ttft_s": ttft}
+
+
+def test_summarize_batch():
+    summary = summarize_batch([result(1.0, tools=["note_saver"], ttft=0.2), result(3.0, ttft=0.4),
+                               result(9.0, error="TimeoutError: ")], elapsed=2.0)
+    assert summary["requests"] == 3
+    assert summary["errors"] == 1
+    assert summary["error_rate"] == round(1 / 3, 4)
+    assert summary["throughput_rps"] == 1.5
+    # Failed prompts don't count towards latency
+    assert summary["latency_s"]["p50"] == 2.0
+    assert summary["ttft_p50_s"] == 0.3
+    assert summary["tool_calls"] == {"note_saver": 1, "(none)": 2}
+
+
+def test_summarize_empty_batch():
+    summary = summarize_batch([], elapsed=0.0)
+    assert (summary["requests"], summary["errors"], summary["error_rate"], summary["throughput_rps"]) == (0, 0, 0.0, 0.0)
+    assert summary["latency_s"]["p99"] == 0.0
+    assert summary["tool_calls"] == {"(none)": 0}
+
+
+def test_summarize_all_errors():
+    summary = summarize_batch([result(1.0, error="RuntimeError: down")] * 2, elapsed=1.0)
+    assert (summary["errors"], summary["error_rate"]) == (2, 1.0)
+    assert summary["latency_s"] == {"p50": 0.0, "p90": 0.0, "p95": 0.0, "p99": 0.0}
+    assert summary["ttft_p50_s"] == 0.0
+
+
+def test_dry_run_reports_without_calling():
+    calls = []
+
+    def save_note(note: str) -> str:
+        """Save a note"""
+        calls.append(note)
+        return "saved"
+
+    fake = dry_run_fn("note_saver", save_note)
+    assert fake("buy milk") == "[dry-run] note_saver('buy milk') was not executed."
+    assert fake(note="x") == "[dry-run] note_saver(note='x') was not executed."
+    assert calls == []
+    # The tool schema is built from the signature and docstring, so they must match the real tool
+    assert inspect.signature(fake) == inspect.signature(save_note)
+    assert fake.__doc__ == "Save a note"
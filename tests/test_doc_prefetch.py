@@ -0,0 +1,42 @@
+from engines.doc_prefetch import DocumentPrefetcher
+
+
+def test_sessions_keep_their_own_prefetch():
+    prefetcher = DocumentPrefetcher()
+    prefetcher.submit("what is gradient descent", None, lambda: ["gd"], session="alice")
+    prefetcher.submit("explain tcp handshake", None, lambda: ["tcp"], session="bob")
+
+    assert prefetcher.take("gradient descent", None, session="alice") == ["gd"]
+    assert prefetcher.take("tcp handshake", None, session="bob") == ["tcp"]
+    assert prefetcher.stats["wasted"] == 0
+
+
+def test_a_session_cannot_take_another_sessions_prefetch():
+    prefetcher = DocumentPrefetcher()
+    prefetcher.submit("what is gradient descent", None, lambda: ["gd"], session="alice")
+
+    assert prefetcher.take("gradient descent", None, session="bob") is None
+    assert prefetcher.take("gradient descent", None, session="alice") == ["gd"]
+
+
+def test_discard_only_affects_its_session():
+    prefetcher = DocumentPrefetcher()
+    prefetcher.submit("what is gradient descent", None, lambda: ["gd"], session="alice")
+    prefetcher.discard(session="bob")
+    assert prefetcher.take("gradient descent", None, session="alice") == ["gd"]
+
+
+def test_unknown_session_takes_a_matching_prefetch():
+    prefetcher = DocumentPrefetcher()
+    prefetcher.submit("explain tcp handshake", None, lambda: ["tcp"], session="bob")
+    prefetcher.submit("what is gradient descent", None, lambda: ["gd"], session="alice")
+    assert prefetcher.take("gradient descent", None) == ["gd"]
+    assert prefetcher.take("tcp handshake", None, session="bob") == ["tcp"]
+
+
+def test_stale_prefetches_expire_on_submit():
+    prefetcher = DocumentPrefetcher(max_age=-1.0)
+    prefetcher.submit("what is gradient descent", None, lambda: ["gd"], session="alice")
+    prefetcher.submit("explain tcp handshake", None, lambda: ["tcp"], session="bob")
+    assert prefetcher.stats["wasted"] == 1
+    assert prefetcher.take("gradient descent", None, session="alice") is None
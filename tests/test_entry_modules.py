@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_entry_modules_import_light():
+    # Spawned ingest workers re-import the entry module as __mp_main__
+    check = ("import sys, server, main_cli; "
+             "heavy = [m for m in ('llama_index', 'dotenv', 'faiss', 'sentence_transformers') if m in sys.modules]; "
+             "assert not heavy, heavy")
+    result = subprocess.run([sys.executable, "-c", check], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,106 @@
+import json
+import os
+
+import tracing
+from engines.document_engine import record_ingest_spans
+from engines.dedup import MinHasher, NearDuplicateIndex
+from engines.ingest_worker import IngestJob
+
+CHUNK = 100
+
+
+def para(tag):
+    """One chunk's worth of text (exactly CHUNK characters) whose words are unique to `tag`"""
+    return " ".join(f"{tag}{i}" for i in range(40))[:CHUNK - 1] + " "
+
+
+def run_ingest(tmp_path, files, chunk_size=40, **kwargs):
+    paths = []
+    for name, text in files.items():
+        path = tmp_path / name
+        path.write_text(text, encoding="utf-8")
+        paths.append(path)
+    return IngestJob(paths, embedder="hash:32", chunk_size=chunk_size, overlap=0, in_process=True, **kwargs)
+
+
+def test_worker_stage_times_become_child_spans(tmp_path, trace_file):
+    result = run_ingest(tmp_path, {"a.txt": "alpha " * 20, "b.txt": "beta " * 20}).start().wait()
+    try:
+        assert [timing["file"] for timing in result.info["timings"]] == ["a.txt", "b.txt"]
+        with tracing.span("doc.ingest"):
+            record_ingest_spans(result.info)
+    finally:
+        result.cleanup()
+
+    spans = [json.loads(line) for line in trace_file.read_text(encoding="utf-8").splitlines()]
+    ingest = next(s for s in spans if s["name"] == "doc.ingest")
+    children = [s for s in spans if s["parent"] == ingest["span"]]
+    assert sorted({s["name"] for s in children}) == ["doc.chunk", "doc.embed_chunks", "doc.extract_pdf"]
+    assert {s["pdf"] for s in children} == {"a.txt", "b.txt"}
+    assert all(s["trace"] == ingest["trace"] for s in children)
+
+
+def test_dedup_time_is_recorded_when_enabled(tmp_path, trace_file):
+    result = run_ingest(tmp_path, {"a.txt": "gamma delta " * 10}, dedup_threshold=0.8).start().wait()
+    try:
+        record_ingest_spans(result.info)
+    finally:
+        result.cleanup()
+    assert "doc.dedup" in tracing.summary()
+
+
+def test_cancelled_job_returns_none(tmp_path):
+    job = run_ingest(tmp_path, {"a.txt": "alpha " * 20})
+    job.cancel()
+    assert job.start().wait() is None
+
+
+def ingest_deduped(tmp_path, files, existing=None):
+    result = run_ingest(tmp_path, files, chunk_size=CHUNK, dedup_threshold=0.8, existing=existing).start().wait()
+    try:
+        with open(result.signatures_path(), "rb") as f:
+            return result.chunks(), result.duplicates(), f.read()
+    finally:
+        result.cleanup()
+
+
+def test_near_duplicate_index_finds_only_similar_chunks():
+    hasher = MinHasher()
+    index = NearDuplicateIndex(num_perm=hasher.num_perm, threshold=0.8)
+    index.add(7, hasher.signature(para("x")))
+    assert index.find(hasher.signature(para("x"))) == 7
+    assert index.find(hasher.signature(para("y"))) is None
+
+
+def test_duplicates_within_new_files_point_at_the_kept_chunk(tmp_path):
+    chunks, duplicates, _ = ingest_deduped(tmp_path, {
+        "a.txt": para("a") + para("b") + para("a"),
+        "b.txt": para("c") + para("b"),
+    })
+    assert chunks == [para("a"), para("b"), para("c")]
+    assert sorted(duplicates) == [[0, "a.txt"], [1, "b.txt"]]
+
+
+def test_duplicate_ids_count_existing_chunks_first(tmp_path):
+    # An index that already holds two chunks, without a signatures file yet
+    meta_file = tmp_path / "index.json"
+    meta_file.write_text(json.dumps({"chunks": [para("old0"), para("old1")], "sources": [["old.txt"], ["old.txt"]]}))
+    existing = {"meta_file": str(meta_file), "signatures_file": str(tmp_path / "index.minhash")}
+
+    chunks, duplicates, signatures = ingest_deduped(tmp_path, {"new.txt": para("n") + para("old1") + para("n")},
+                                                    existing=existing)
+    assert chunks == [para("n")]
+    # Ids run over old then new chunks, the order DocumentEngine appends them in
+    combined = [para("old0"), para("old1")] + chunks
+    assert sorted(duplicates) == [[1, "new.txt"], [2, "new.txt"]]
+    assert combined[1] == para("old1") and combined[2] == para("n")
+    assert len(signatures) == len(combined) * MinHasher().num_perm * 4
+
+    # The next run reads the saved signatures instead of re-hashing the index
+    meta_file.write_text(json.dumps({"chunks": combined, "sources": [["old.txt"], ["old.txt"], ["new.txt"]]}))
+    with open(existing["signatures_file"], "wb") as f:
+        f.write(signatures)
+    os.makedirs(tmp_path / "later", exist_ok=True)
+    chunks, duplicates, _ = ingest_deduped(tmp_path / "later", {"later.txt": para("m") + para("n")}, existing=existing)
+    assert chunks == [para("m")]
+    assert duplicates == [[2, "later.txt"]]
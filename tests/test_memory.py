@@ -0,0 +1,78 @@
+import threading
+
+from memory import ConversationMemory
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def wait_for_fold(memory):
+    folding = memory._folding
+    if folding is not None:
+        folding.join(5)
+
+
+def test_turns_stay_in_window_until_summary_is_swapped_in():
+    release = threading.Event()
+
+    def summarizer(summary, turns):
+        release.wait(5)
+        return "summary of " + ", ".join(user for user, _ in turns)
+
+    memory = ConversationMemory(token_budget=8, low_water=0.5, summarizer=summarizer, count_tokens=count_words)
+    for i in range(3):
+        memory.add_turn(f"q{i} a", f"r{i} b")
+
+    # Overflowed and folding, but the folded turns are still visible
+    assert memory._folding is not None
+    assert [user for user, _, _ in memory.turns] == ["q0 a", "q1 a", "q2 a"]
+    assert memory.summary == ""
+
+    release.set()
+    wait_for_fold(memory)
+    assert memory.summary == "summary of q0 a, q1 a"
+    assert [user for user, _, _ in memory.turns] == ["q2 a"]
+    assert memory.window_tokens == 4
+
+
+def test_turns_added_during_fold_are_kept():
+    release = threading.Event()
+    memory = ConversationMemory(token_budget=8, low_water=0.5, count_tokens=count_words,
+                                summarizer=lambda summary, turns: release.wait(5) and "folded")
+    for i in range(3):
+        memory.add_turn(f"q{i} a", f"r{i} b")
+    memory.add_turn("q3 a", "r3 b")
+
+    release.set()
+    wait_for_fold(memory)
+    assert [user for user, _, _ in memory.turns] == ["q2 a", "q3 a"]
+    assert memory.window_tokens == 8
+
+
+def test_failed_fold_keeps_turns_verbatim():
+    def summarizer(summary, turns):
+        raise RuntimeError("LLM down")
+
+    memory = ConversationMemory(token_budget=8, low_water=0.5, summarizer=summarizer, count_tokens=count_words)
+    for i in range(3):
+        memory.add_turn(f"q{i} a", f"r{i} b")
+    wait_for_fold(memory)
+    assert memory.summary == ""
+    assert len(memory.turns) == 3
+    assert memory._folding is None
+
+
+def test_clear_discards_a_fold_in_flight():
+    release = threading.Event()
+    memory = ConversationMemory(token_budget=8, low_water=0.5, count_tokens=count_words,
+                                summarizer=lambda summary, turns: release.wait(5) and "stale")
+    for i in range(3):
+        memory.add_turn(f"q{i} a", f"r{i} b")
+    memory.clear()
+    memory.add_turn("fresh a", "turn b")
+
+    release.set()
+    wait_for_fold(memory)
+    assert memory.summary == ""
+    assert [user for user, _, _ in memory.turns] == ["fresh a"]
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from engines.note_store import NoteStore
+
+
+class Vector(list):
+    def astype(self, dtype):
+        return self
+
+    def tobytes(self):
+        return bytes(len(self))
+
+
+def make_store(tmp_path, **kwargs):
+    return NoteStore(db_path=str(tmp_path / "notes.db"), text_file=str(tmp_path / "notes.txt"),
+                     flush_interval=0, **kwargs)
+
+
+def test_text_file_is_imported_once(tmp_path):
+    (tmp_path / "notes.txt").write_text("buy milk\n\nmeeting with Sam on Friday\n", encoding="utf-8")
+    store = make_store(tmp_path)
+    assert store.count() == 2
+    store.close()
+
+    reopened = make_store(tmp_path)
+    assert reopened.count() == 2
+    assert [text for _, text in reopened.search("meeting")] == ["meeting with Sam on Friday"]
+
+
+def test_interrupted_import_is_rolled_back_and_retried(tmp_path):
+    (tmp_path / "notes.txt").write_text("first\nsecond\n", encoding="utf-8")
+
+    class CrashingStore(NoteStore):
+        def _insert(self, notes):
+            super()._insert(notes)
+            raise RuntimeError("crash before the import was marked done")
+
+    with pytest.raises(RuntimeError):
+        CrashingStore(db_path=str(tmp_path / "notes.db"), text_file=str(tmp_path / "notes.txt"), flush_interval=0)
+
+    store = make_store(tmp_path)
+    assert store.count() == 2
+
+
+def test_saved_notes_are_searchable_and_mirrored_to_text(tmp_path):
+    store = make_store(tmp_path, flush_every=100)
+    store.add("minecraft house design ideas")
+    store.add("meeting notes for the design review")
+    assert [text for _, text in store.search("design meeting")] == ["meeting notes for the design review"]
+    # The last word also matches as a prefix when the exact words find nothing
+    assert [text for _, text in store.search("minecraft hou")] == ["minecraft house design ideas"]
+    store.close()
+    assert (tmp_path / "notes.txt").read_text(encoding="utf-8").splitlines() == [
+        "minecraft house design ideas", "meeting notes for the design review"]
+
+
+def test_embedding_runs_outside_the_store_lock(tmp_path):
+    lookups_blocked = []
+
+    def embed_fn(texts):
+        # Simulates the first call loading a model: a search from another thread must not wait
+        result = {}
+        worker = threading.Thread(target=lambda: result.setdefault("rows", store.recent(1)))
+        worker.start()
+        worker.join(2)
+        lookups_blocked.append(worker.is_alive())
+        return [Vector([1.0, 0.0]) for _ in texts]
+
+    store = make_store(tmp_path, flush_every=100, embed_fn=embed_fn)
+    store.add("embedded note")
+    store.flush()
+    assert lookups_blocked == [False]
+    with store._lock:
+        assert store._db.execute("SELECT COUNT(*) FROM notes WHERE embedding IS NULL").fetchone()[0] == 0
+
+
+def test_imported_notes_are_embedded_in_the_background(tmp_path):
+    (tmp_path / "notes.txt").write_text("old note one\nold note two\n", encoding="utf-8")
+    embedded = threading.Event()
+
+    def embed_fn(texts):
+        embedded.set()
+        return [Vector([1.0]) for _ in texts]
+
+    store = make_store(tmp_path, embed_fn=embed_fn)
+    assert embedded.wait(2)
+    store.close()
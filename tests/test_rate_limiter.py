@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from tracker.rate_limiter import FakeClock, RateLimiter
+
+
+def admit_all(limiter, clock, tokens):
+    """Start one acquire per entry of `tokens` at once; return [(caller, admitted_at)] in admission order"""
+    admitted = []
+
+    async def caller(i, amount):
+        await limiter.acquire(amount)
+        admitted.append((i, clock.time()))
+
+    async def main():
+        await asyncio.gather(*(caller(i, amount) for i, amount in enumerate(tokens)))
+
+    asyncio.run(main())
+    return admitted
+
+
+def test_requests_are_admitted_in_arrival_order_at_the_rpm_rate():
+    clock = FakeClock()
+    limiter = RateLimiter(rpm=2, clock=clock)
+    admitted = admit_all(limiter, clock, [0] * 5)
+    assert [i for i, _ in admitted] == [0, 1, 2, 3, 4]
+    assert [t for _, t in admitted] == pytest.approx([0, 0, 30, 60, 90])
+    assert limiter.total_waited == pytest.approx(90)
+
+
+def test_large_request_holds_back_smaller_ones_behind_it():
+    clock = FakeClock()
+    limiter = RateLimiter(tpm=1000, clock=clock)
+    admitted = admit_all(limiter, clock, [600, 600, 100])
+    # FIFO: the 100-token request could fit at once but waits for the one ahead of it
+    assert [i for i, _ in admitted] == [0, 1, 2]
+    assert [t for _, t in admitted] == pytest.approx([0, 12, 18])
+
+
+def test_settle_corrects_the_token_reservation():
+    clock = FakeClock()
+    limiter = RateLimiter(tpm=1000, clock=clock)
+
+    async def main():
+        await limiter.acquire(500)
+        limiter.settle(500, 900)
+        started = clock.time()
+        await limiter.acquire(500)
+        return clock.time() - started
+
+    # 100 tokens left after the correction; 400 more refill at 1000/60 per second
+    assert asyncio.run(main()) == pytest.approx(24)
+
+
+def test_settle_returns_overestimated_tokens():
+    clock = FakeClock()
+    limiter = RateLimiter(tpm=1000, clock=clock)
+
+    async def main():
+        await limiter.acquire(900)
+        limiter.settle(900, 100)
+        started = clock.time()
+        await limiter.acquire(800)
+        return clock.time() - started
+
+    assert asyncio.run(main()) == 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    clock = FakeClock()
+    limiter = RateLimiter(rpm=1, clock=clock)
+
+    async def main():
+        await limiter.acquire()
+        blocked = asyncio.ensure_future(limiter.acquire())
+        queued = asyncio.ensure_future(limiter.acquire())
+        behind = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        queued.cancel()
+        await asyncio.gather(blocked, behind, return_exceptions=True)
+        return queued.cancelled(), limiter.pressure()["waiting"], clock.time()
+
+    cancelled, waiting, now = asyncio.run(main())
+    assert cancelled
+    assert waiting == 0
+    assert now == pytest.approx(120)
+
+
+def test_cancelling_the_head_wakes_the_next_waiter():
+    clock = FakeClock()
+    limiter = RateLimiter(rpm=1, clock=clock)
+
+    async def main():
+        await limiter.acquire()
+        head = asyncio.ensure_future(limiter.acquire())
+        nxt = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        head.cancel()
+        await asyncio.wait_for(nxt, 1)
+
+    asyncio.run(main())
+    assert limiter.pressure()["waiting"] == 0
+
+
+def test_waiter_on_a_closed_loop_is_skipped():
+    limiter = RateLimiter(rpm=60, clock=FakeClock())
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        head = loop.create_future()
+        head.set_result(None)
+        # A GUI worker's loop that closed while its caller was queued
+        dead_loop = asyncio.new_event_loop()
+        dead_ticket = dead_loop.create_future()
+        dead_loop.close()
+        limiter._queue.extend([(loop, head), (dead_loop, dead_ticket)])
+
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter._leave(head)
+        await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(main())
+    assert limiter.pressure()["waiting"] == 0
+
+
+def test_pressure_reports_the_blocking_bucket():
+    clock = FakeClock()
+    seen = []
+    limiter = RateLimiter(rpm=1, tpm=100000, clock=clock, on_pressure=seen.append)
+    admit_all(limiter, clock, [0, 0])
+    assert any(snapshot["blocked_on"] == "rpm" and snapshot["wait_seconds"] == 60 for snapshot in seen)
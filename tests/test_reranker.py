@@ -0,0 +1,110 @@
+from engines.document_engine import _search_options, MAX_RERANK_BUDGET_MS, MAX_RERANK_CANDIDATES
+from engines.reranker import CrossEncoderReranker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeModel:
+    """Scores a pair by the number in its text; each batch costs `batch_seconds` of fake time"""
+
+    def __init__(self, clock, batch_seconds=0.01):
+        self.clock = clock
+        self.batch_seconds = batch_seconds
+        self.batches = []
+
+    def predict(self, pairs):
+        self.batches.append(len(pairs))
+        self.clock.now += self.batch_seconds
+        return [float(text) for _, text in pairs]
+
+
+def make(batch_seconds=0.01, batch_size=2):
+    clock = FakeClock()
+    model = FakeModel(clock, batch_seconds)
+    return CrossEncoderReranker(model, batch_size=batch_size, clock=clock), model
+
+
+CANDIDATES = [(i, str(score)) for i, score in enumerate([1, 5, 3, 2, 6, 4])]
+
+
+def test_scores_everything_within_budget():
+    reranker, model = make()
+    order, scores = reranker.rerank("query", CANDIDATES, budget=1.0)
+    assert order == [4, 1, 5, 2, 3, 0]
+    assert scores == {i: float(text) for i, text in CANDIDATES}
+    assert model.batches == [2, 2, 2]
+    stats = reranker.get_stats()
+    assert (stats["complete"], stats["partial"], stats["over_budget"], stats["scored"]) == (1, 0, 0, 6)
+
+
+def test_stops_before_a_batch_that_would_miss_the_deadline():
+    reranker, model = make(batch_seconds=0.01)
+    # Two batches fit in 25ms; the third would end at 30ms
+    order, scores = reranker.rerank("query", CANDIDATES, budget=0.025)
+    assert model.batches == [2, 2]
+    assert set(scores) == {0, 1, 2, 3}
+    # Scored chunks first by score, the rest in first-stage order
+    assert order == [1, 2, 3, 0, 4, 5]
+    stats = reranker.get_stats()
+    assert (stats["partial"], stats["over_budget"]) == (1, 0)
+
+
+def test_zero_budget_falls_back_without_counting_over_budget():
+    reranker, model = make()
+    order, scores = reranker.rerank("query", CANDIDATES, budget=0.0)
+    assert order == [i for i, _ in CANDIDATES]
+    assert scores == {}
+    assert model.batches == []
+    stats = reranker.get_stats()
+    assert (stats["fallback"], stats["over_budget"]) == (1, 0)
+
+
+def test_over_budget_counts_a_batch_that_ran_past_the_deadline():
+    reranker, model = make(batch_seconds=0.05)
+    # Without a batch estimate the first batch is assumed to fit, but takes 50ms
+    order, scores = reranker.rerank("query", CANDIDATES, budget=0.01)
+    assert model.batches == [2]
+    assert order[:2] == [1, 0]
+    assert reranker.get_stats()["over_budget"] == 1
+
+
+def test_repeated_query_is_served_from_the_cache():
+    reranker, model = make()
+    first, _ = reranker.rerank("Some  Query", CANDIDATES, budget=1.0)
+    second, scores = reranker.rerank("some query", CANDIDATES, budget=0.0)
+    assert second == first
+    assert len(scores) == len(CANDIDATES)
+    assert model.batches == [2, 2, 2]
+    stats = reranker.get_stats()
+    assert (stats["queries"], stats["cache_hits"], stats["complete"]) == (2, 6, 2)
+
+
+def test_cache_is_bounded():
+    clock = FakeClock()
+    reranker = CrossEncoderReranker(FakeModel(clock), batch_size=8, cache_size=4, clock=clock)
+    reranker.rerank("query", CANDIDATES, budget=1.0)
+    assert reranker.get_stats()["cached"] == 4
+
+
+def test_search_options_parse_and_clamp_tool_arguments():
+    defaults = _search_options()
+    assert _search_options(rerank="false")["rerank"] is False
+    assert _search_options(rerank="Yes")["rerank"] is True
+    assert _search_options(rerank=0)["rerank"] is False
+    assert _search_options(rerank="maybe")["rerank"] == defaults["rerank"]
+
+    assert _search_options(candidates=10_000)["candidates"] == MAX_RERANK_CANDIDATES
+    assert _search_options(candidates=-5)["candidates"] == 1
+    assert _search_options(candidates="12")["candidates"] == 12
+    assert _search_options(candidates="lots")["candidates"] == defaults["candidates"]
+
+    assert _search_options(budget_ms=1e9)["budget_ms"] == MAX_RERANK_BUDGET_MS
+    assert _search_options(budget_ms="-1")["budget_ms"] == 0.0
+    assert _search_options(budget_ms="nan")["budget_ms"] == defaults["budget_ms"]
+    assert _search_options(rerank=None, candidates=None, budget_ms=None) == defaults
@@ -0,0 +1,180 @@
+import asyncio
+
+import pytest
+
+from routing import Backend, BackendRouter
+
+
+class FakeLLM:
+    """Answers after `delay` seconds, or raises `error`; streams yield `chunks`"""
+
+    def __init__(self, answer="ok", delay=0.0, error=None, chunks=("a", "b")):
+        self.answer = answer
+        self.delay = delay
+        self.error = error
+        self.chunks = chunks
+
+    async def achat(self):
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.answer
+
+    def chat(self):
+        if self.error:
+            raise self.error
+        return self.answer
+
+    def stream_chat(self):
+        # Like the real clients: nothing connects until the generator is iterated
+        def gen():
+            if self.error:
+                raise self.error
+            yield from self.chunks
+        return gen()
+
+
+class FakeTracker:
+    def __init__(self, rpm_used, limits):
+        self.rpm_used = rpm_used
+        self.limits = limits
+
+    def get_stats(self):
+        return {"RPM": self.rpm_used, "RPD": 0}
+
+
+def test_sync_stream_fails_over_on_connection_error():
+    down = Backend("down", FakeLLM(error=ConnectionError("refused")))
+    up = Backend("up", FakeLLM(chunks=("x", "y")))
+    router = BackendRouter([down, up])
+
+    stream = router.route_sync(lambda b: b.llm.stream_chat(), streaming=True)
+
+    assert list(stream) == ["x", "y"]
+    assert down.errors == 1
+    assert up.wins == 1
+    assert router.stats["failovers"] == 1
+
+
+def test_sync_empty_stream_is_not_an_error():
+    router = BackendRouter([Backend("only", FakeLLM(chunks=()))])
+    assert list(router.route_sync(lambda b: b.llm.stream_chat(), streaming=True)) == []
+
+
+def test_sync_all_backends_failing_raises():
+    router = BackendRouter([Backend("a", FakeLLM(error=ValueError("bad"))),
+                            Backend("b", FakeLLM(error=ValueError("worse")))])
+    with pytest.raises(RuntimeError, match="a: bad; b: worse"):
+        router.route_sync(lambda b: b.llm.chat())
+    assert router.stats["failures"] == 1
+
+
+def test_async_error_fails_over():
+    router = BackendRouter([Backend("a", FakeLLM(error=ConnectionError("down"))),
+                            Backend("b", FakeLLM(answer="from b"))])
+    assert asyncio.run(router.route(lambda b: b.llm.achat())) == "from b"
+    assert router.stats["failovers"] == 1
+    assert router.stats["hedges"] == 0
+
+
+def test_slow_backend_is_hedged():
+    router = BackendRouter([Backend("slow", FakeLLM(answer="slow", delay=1.0)),
+                            Backend("fast", FakeLLM(answer="fast"))], hedge_after=0.05)
+    assert asyncio.run(router.route(lambda b: b.llm.achat())) == "fast"
+    assert router.stats["hedges"] == 1
+    assert router.stats["hedge_wins"] == 1
+
+
+def test_failover_backend_gets_its_own_hedge_delay():
+    # "a" fails after 0.25s; "b" then needs 0.2s. Measured from b's start the
+    # 0.3s hedge delay has not run out, so "c" must not be started.
+    router = BackendRouter([Backend("a", FakeLLM(delay=0.25, error=ConnectionError("reset"))),
+                            Backend("b", FakeLLM(answer="b", delay=0.2)),
+                            Backend("c", FakeLLM(answer="c"))], hedge_after=0.3)
+    assert asyncio.run(router.route(lambda b: b.llm.achat())) == "b"
+    assert router.stats["hedges"] == 0
+    assert router.backends[2].calls == 0
+
+
+def test_repeated_failures_cool_a_backend_down():
+    flaky = Backend("flaky", FakeLLM(error=ConnectionError("down")), max_failures=2, cooldown=60)
+    steady = Backend("steady", FakeLLM())
+    router = BackendRouter([flaky, steady])
+    for _ in range(2):
+        router.route_sync(lambda b: b.llm.chat())
+    assert router.ranked_backends() == [steady]
+
+
+def test_quota_limits_come_from_the_tracker():
+    busy = Backend("busy", FakeLLM(), tracker=FakeTracker(27, {"rpm": 30}))
+    idle = Backend("idle", FakeLLM(), tracker=FakeTracker(0, {"rpm": 30}))
+    assert busy.quota_headroom() == pytest.approx(0.1)
+    assert BackendRouter([busy, idle]).ranked_backends() == [idle, busy]
+    assert Backend("untracked", FakeLLM(), tracker=FakeTracker(27, {})).quota_headroom() == 1.0
+
+
+class Chunk:
+    """Stream chunk shaped like llama_index's: a delta plus the provider's raw payload"""
+
+    def __init__(self, delta, raw=None):
+        self.delta = delta
+        self.raw = raw or {}
+
+
+class StreamingLLM:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def astream_chat(self):
+        async def gen():
+            for chunk in self.chunks:
+                yield chunk
+        return gen()
+
+
+def tracked_backend(tmp_path, chunks):
+    from tracker.rate_limiter import FakeClock
+    from tracker.tracker import GroqRequestTracker
+    tracker = GroqRequestTracker(store_dir=str(tmp_path), flush_interval=0, limits={"tpm": 10000},
+                                 clock=FakeClock(), estimated_tokens=1000)
+    return Backend("tracked", StreamingLLM(chunks), tracker=tracker), tracker
+
+
+async def consume(router, limit=None):
+    stream = await router.first_chunk(lambda b: b.llm.astream_chat())
+    deltas = []
+    async for chunk in stream:
+        deltas.append(chunk.delta)
+        if len(deltas) == limit:
+            break
+    await stream.aclose()
+    return deltas
+
+
+@pytest.mark.parametrize("final_raw, tokens", [
+    ({"done": True, "prompt_eval_count": 30, "eval_count": 12}, 42),  # Ollama
+    ({"usage": {"prompt_tokens": 50, "completion_tokens": 27, "total_tokens": 77}}, 77),  # OpenAI / Groq
+])
+def test_stream_usage_is_settled_when_it_ends(tmp_path, final_raw, tokens):
+    backend, tracker = tracked_backend(tmp_path, [Chunk("Hel"), Chunk("lo"), Chunk("", final_raw)])
+    router = BackendRouter([backend])
+
+    assert asyncio.run(consume(router)) == ["Hel", "lo", ""]
+    stats = tracker.get_stats()
+    assert (stats["RPM"], stats["TPM"], stats["TPD"]) == (1, tokens, tokens)
+    # The 1000-token reservation was corrected to the real usage
+    assert tracker.limiter.token_buckets[0].tokens == 10000 - tokens
+    assert tracker.estimated_tokens == 0.8 * 1000 + 0.2 * tokens
+    tracker.close()
+
+
+def test_stream_closed_early_is_still_recorded(tmp_path):
+    backend, tracker = tracked_backend(tmp_path, [Chunk("a"), Chunk("b"), Chunk("", {"eval_count": 5})])
+    router = BackendRouter([backend])
+
+    assert asyncio.run(consume(router, limit=1)) == ["a"]
+    stats = tracker.get_stats()
+    # Usage never arrived, so the estimate stands
+    assert (stats["RPM"], stats["TPM"]) == (1, 0)
+    assert tracker.limiter.token_buckets[0].tokens == 10000 - 1000
+    tracker.close()
@@ -0,0 +1,104 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from client import AssistantClient
+from memory import ConversationMemory
+from server import AssistantService, make_handler
+from tracker.tracker import GroqRequestTracker
+
+
+class PlainMemory(ConversationMemory):
+    """ConversationMemory whose history is plain (user, assistant) pairs instead of ChatMessages"""
+
+    def build_history(self, prompt):
+        with self._lock:
+            return [(user, assistant) for user, assistant, _ in self.turns], self.window_tokens
+
+
+class FakeService(AssistantService):
+    """Echoes the prompt back in two deltas, prefixed with how many earlier turns it was given"""
+
+    def _new_memory(self):
+        return PlainMemory(token_budget=1000, count_tokens=lambda text: len(text.split()))
+
+    async def _stream(self, prompt, chat_history, emit):
+        if prompt == "fail":
+            raise RuntimeError("agent failed")
+        emit({"type": "delta", "text": f"{len(chat_history)} earlier: "})
+        emit({"type": "delta", "text": prompt})
+        return f"{len(chat_history)} earlier: {prompt}"
+
+
+@pytest.fixture
+def server(tmp_path):
+    tracker = GroqRequestTracker(store_dir=str(tmp_path), flush_interval=0)
+    service = FakeService(warm_documents=False, agent=object(), tracker=tracker)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield service, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+    tracker.close()
+
+
+def test_chat_streams_delta_and_done_events(server):
+    _, url = server
+    client = AssistantClient(url, timeout=5)
+    events = list(client.chat_stream("hello"))
+    assert [event["type"] for event in events] == ["delta", "delta", "done"]
+    assert "".join(event["text"] for event in events[:2]) == events[-1]["response"] == "0 earlier: hello"
+
+
+def test_sessions_are_isolated(server):
+    service, url = server
+    alice, bob = AssistantClient(url, timeout=5), AssistantClient(url, timeout=5)
+    assert alice.session != bob.session
+
+    alice.chat("one")
+    assert alice.chat("two") == "1 earlier: two"
+    assert bob.chat("three") == "0 earlier: three"
+    assert [user for user, _, _ in service.sessions[alice.session].turns] == ["one", "two"]
+
+
+def test_reset_clears_and_seeds_a_session(server):
+    service, url = server
+    client = AssistantClient(url, timeout=5)
+    client.chat("one")
+    client.reset()
+    assert client.chat("two") == "0 earlier: two"
+
+    client.reset([("earlier question", "earlier answer")])
+    assert client.chat("three") == "1 earlier: three"
+    assert service.sessions[client.session].turns[0][:2] == ("earlier question", "earlier answer")
+
+
+def test_agent_error_is_streamed(server):
+    _, url = server
+    with pytest.raises(RuntimeError, match="agent failed"):
+        AssistantClient(url, timeout=5).chat("fail")
+
+
+def test_missing_field_is_a_400(server):
+    _, url = server
+    request = urllib.request.Request(url + "/notes", data=b"{}", method="POST",
+                                     headers={"Content-Type": "application/json"})
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(request, timeout=5)
+    assert error.value.code == 400
+    assert json.loads(error.value.read()) == {"error": "missing field 'note'"}
+
+
+def test_health_and_stats(server):
+    _, url = server
+    client = AssistantClient(url, timeout=5)
+    assert client.health() == {"status": "ok", "documents_ready": False}
+    client.chat("hello")
+    stats = client.stats()
+    assert stats["sessions"] == 1
+    assert stats["tracker"]["RPM"] == 1
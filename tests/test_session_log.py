@@ -0,0 +1,120 @@
+import os
+from array import array
+
+from memory import ConversationMemory
+from session_log import SessionLog
+
+
+def read_index(log):
+    with open(log.index_path, "rb") as f:
+        return array("Q", f.read()).tolist()
+
+
+def line_offsets(path):
+    offsets, position = [], 0
+    with open(path, "rb") as f:
+        for line in f:
+            offsets.append(position)
+            position += len(line)
+    return offsets
+
+
+def write_session(path, messages):
+    log = SessionLog(path)
+    for sender, message in messages:
+        log.append(sender, message, timestamp="2024-01-01T00:00:00")
+    log.close()
+
+
+def test_append_and_read_across_reopen(tmp_path):
+    path = str(tmp_path / "session.jsonl")
+    write_session(path, [("user", f"q{i}") for i in range(5)])
+
+    log = SessionLog(path)
+    assert len(log) == 5
+    assert [entry["message"] for entry in log.read(1, 3)] == ["q1", "q2"]
+    assert log.append("assistant", "a") == 5
+    assert [entry["message"] for entry in log.tail(2)] == ["q4", "a"]
+    assert read_index(log) == line_offsets(path)
+    log.close()
+
+
+def test_clean_open_leaves_index_untouched(tmp_path):
+    path = str(tmp_path / "session.jsonl")
+    write_session(path, [("user", f"q{i}") for i in range(3)])
+    index_path = str(tmp_path / "session.idx")
+    os.utime(index_path, ns=(1_000_000_000, 1_000_000_000))
+
+    SessionLog(path).close()
+    assert os.stat(index_path).st_mtime_ns == 1_000_000_000
+
+
+def test_torn_last_line_is_dropped(tmp_path):
+    path = str(tmp_path / "session.jsonl")
+    write_session(path, [("user", "q0"), ("assistant", "a0")])
+    complete = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b'{"sender": "user", "mess')
+
+    log = SessionLog(path)
+    assert len(log) == 2
+    assert os.path.getsize(path) == complete
+    assert log.append("user", "q1") == 2
+    assert [entry["message"] for entry in log.read(0, 3)] == ["q0", "a0", "q1"]
+    assert read_index(log) == line_offsets(path)
+    log.close()
+
+
+def test_index_behind_the_log_is_caught_up(tmp_path):
+    path = str(tmp_path / "session.jsonl")
+    write_session(path, [("user", f"q{i}") for i in range(4)])
+    index_path = str(tmp_path / "session.idx")
+    # Crash after the log write but before the index write, mid-entry
+    with open(index_path, "r+b") as f:
+        f.truncate(8 * 2 + 3)
+
+    log = SessionLog(path)
+    assert len(log) == 4
+    assert read_index(log) == line_offsets(path)
+    assert log.tail(1)[0]["message"] == "q3"
+    log.close()
+
+
+def test_index_ahead_of_the_log_is_truncated(tmp_path):
+    path = str(tmp_path / "session.jsonl")
+    write_session(path, [("user", f"q{i}") for i in range(4)])
+    # The log lost its last two lines (e.g. restored from an older copy)
+    keep = line_offsets(path)[2]
+    with open(path, "r+b") as f:
+        f.truncate(keep)
+
+    log = SessionLog(path)
+    assert len(log) == 2
+    assert read_index(log) == line_offsets(path)
+    log.close()
+
+
+def test_missing_index_is_rebuilt(tmp_path):
+    path = str(tmp_path / "session.jsonl")
+    write_session(path, [("user", f"q{i}") for i in range(3)])
+    os.remove(str(tmp_path / "session.idx"))
+
+    log = SessionLog(path)
+    assert len(log) == 3
+    assert read_index(log) == line_offsets(path)
+    log.close()
+
+
+def test_recent_turns_restore_into_memory(tmp_path):
+    path = str(tmp_path / "session.jsonl")
+    write_session(path, [("assistant", "stray greeting"), ("user", "q0"), ("assistant", "a0"),
+                         ("user", "q1"), ("assistant", "a1"), ("user", "unanswered")])
+    log = SessionLog(path)
+    assert log.recent_turns() == [("q0", "a0"), ("q1", "a1")]
+
+    memory = ConversationMemory(token_budget=2, count_tokens=lambda text: len(text.split()))
+    memory.restore(log.recent_turns())
+    # Only the newest turn fits the budget
+    assert [(user, assistant) for user, assistant, _ in memory.turns] == [("q1", "a1")]
+    assert memory.window_tokens == 2
+    log.close()
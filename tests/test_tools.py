@@ -0,0 +1,33 @@
+import asyncio
+import json
+
+import tracing
+from engines.doc_prefetch import current_session
+from engines.tools import threaded
+
+
+@tracing.traced("tool.fake")
+def fake_tool(query):
+    with tracing.span("doc.search"):
+        return f"{current_session.get()}:{query}"
+
+
+def test_threaded_tool_keeps_trace_and_session(trace_file):
+    async def prompt():
+        current_session.set("alice")
+        with tracing.span("prompt_agent"):
+            return await threaded(fake_tool)("syllabus")
+
+    assert asyncio.run(prompt()) == "alice:syllabus"
+    spans = {span["name"]: span for span in map(json.loads, trace_file.read_text(encoding="utf-8").splitlines())}
+    assert spans["tool.fake"]["trace"] == spans["prompt_agent"]["trace"]
+    assert spans["tool.fake"]["parent"] == spans["prompt_agent"]["span"]
+    assert spans["doc.search"]["parent"] == spans["tool.fake"]["span"]
+
+
+def test_threaded_keeps_the_tool_signature():
+    # FunctionTool builds its schema from fn; the async twin must look the same
+    wrapped = threaded(fake_tool)
+    assert wrapped.__name__ == "fake_tool"
+    assert asyncio.iscoroutinefunction(wrapped)
+
@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+from tracker.tracker import GroqRequestTracker, RingCounter, read_day_entries
+
+
+def make_tracker(tmp_path, **kwargs):
+    kwargs.setdefault("flush_interval", 0)
+    kwargs.setdefault("compact_history", False)
+    return GroqRequestTracker(store_dir=str(tmp_path), **kwargs)
+
+
+def test_ring_counter_expires_old_buckets():
+    counter = RingCounter(60, 1.0)
+    for ts in (0.5, 1.5, 30.0, 59.9):
+        counter.add(ts)
+    assert counter.count(59.9) == 4
+    assert counter.count(60.0) == 3   # bucket 0 left the window
+    assert counter.count(90.5) == 1   # only 59.9 is still within 60s
+    assert counter.count(500.0) == 0  # a jump past the whole window clears everything
+
+
+def test_ring_counter_wraps_and_ignores_events_older_than_the_window():
+    counter = RingCounter(4, 10.0)
+    counter.add(5.0)
+    counter.add(45.0, n=3)  # same slot as 5.0 one lap later
+    assert counter.count(45.0) == 3
+    counter.add(1.0)        # already out of the window
+    assert counter.count(45.0) == 3
+    counter.add(20.0, n=2)  # late but still inside it
+    assert counter.count(45.0) == 5
+
+
+def test_record_counts_requests_and_tokens(tmp_path):
+    tracker = make_tracker(tmp_path)
+    now = time.time()
+    tracker.record(ts=now, tokens=120, latency=0.25)
+    tracker.record(ts=now - 1, tokens=30)
+    tracker.record(ts=now - 600)
+    stats = tracker.get_stats()
+    assert (stats["RPM"], stats["RPD"], stats["TPM"], stats["TPD"]) == (2, 3, 150, 150)
+    tracker.close()
+
+
+def test_counters_are_seeded_from_legacy_json_files(tmp_path):
+    now = time.time()
+    today = datetime.now()
+    legacy = tmp_path / f"tracker_{today:%Y-%m-%d}.json"
+    legacy.write_text(json.dumps([now - 5, now - 3600, now - 90000]))
+    tracker = make_tracker(tmp_path)
+    stats = tracker.get_stats()
+    # The entry older than 24h is not counted
+    assert (stats["RPM"], stats["RPD"], stats["TPM"]) == (1, 2, 0)
+    tracker.close()
+
+
+def test_flush_appends_to_the_day_log(tmp_path):
+    tracker = make_tracker(tmp_path, flush_every=100)
+    now = time.time()
+    tracker.record(ts=now, tokens=42, latency=0.5)
+    assert not tracker.store_file.exists()
+    tracker.flush()
+    tracker.record(ts=now + 0.001)
+    tracker.flush()
+
+    lines = tracker.store_file.read_text(encoding="utf-8").splitlines()
+    assert lines == [f"{now:.6f}\t42\t500", f"{now + 0.001:.6f}"]
+    assert [(tokens, latency) for _, tokens, latency in read_day_entries(tmp_path, datetime.now())] == \
+        [(42, 500), (None, None)]
+
+    # A restarted tracker counts what was flushed
+    tracker.close()
+    assert make_tracker(tmp_path).get_stats()["RPM"] == 2
+
+
+def test_full_batch_is_written_by_the_flush_thread(tmp_path):
+    tracker = make_tracker(tmp_path, flush_every=2, flush_interval=60)
+    flushed_on = []
+    done = threading.Event()
+    original = tracker.flush
+
+    def flush():
+        flushed_on.append(threading.current_thread())
+        original()
+        done.set()
+
+    tracker.flush = flush
+    tracker.record()
+    tracker.record()
+    assert done.wait(5)
+    assert flushed_on[0] is not threading.current_thread()
+    assert len(tracker.store_file.read_text(encoding="utf-8").splitlines()) == 2
+    tracker.close()
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import uuid
+import logging
+import inspect
+import functools
+import threading
+import contextvars
+from collections import defaultdict, deque
+from logging.handlers import RotatingFileHandler
+from metrics import percentile
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class _NullSpan:
+    """Returned when tracing is off so instrumented code pays for one flag check"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = uuid.uuid4().hex[:8]
+        self.wall_start = time.time()
+        self._token = _current_span.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer.emit(self.name, duration, self.trace_id, self.span_id, self.parent_id, self.wall_start, self.attrs)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """
+    Nested timed spans written to a rotating JSONL file, plus in-memory
+    per-stage samples for p50/p95 summaries. Disabled unless configured.
+    """
+
+    def __init__(self, window=1000):
+        self.enabled = False
+        self.window = window
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._logger = None
+        self._lock = threading.Lock()
+
+    def configure(self, enabled=None, path=None, max_bytes=5_000_000, backups=3):
+        """Enable/disable tracing; defaults come from ASSISTANT_TRACE and ASSISTANT_TRACE_FILE"""
+        if enabled is None:
+            enabled = os.getenv("ASSISTANT_TRACE", "0").lower() in ("1", "true", "yes")
+        path = path or os.getenv("ASSISTANT_TRACE_FILE", os.path.join("logs", "trace.jsonl"))
+
+        self.enabled = enabled
+        if not enabled:
+            return
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        logger = logging.getLogger("assistant.trace")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        self._logger = logger
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, attrs)
+
+    def record(self, name, duration, **attrs):
+        """Record a span whose timing was measured by the caller"""
+        if not self.enabled:
+            return
+        parent = _current_span.get()
+        self.emit(name, duration, parent.trace_id if parent else uuid.uuid4().hex[:16],
+                  uuid.uuid4().hex[:8], parent.span_id if parent else None, time.time() - duration, attrs)
+
+    def emit(self, name, duration, trace_id, span_id, parent_id, wall_start, attrs):
+        with self._lock:
+            self.samples[name].append(duration)
+        if self._logger is not None:
+            self._logger.info(json.dumps({
+                "trace": trace_id, "span": span_id, "parent": parent_id, "name": name,
+                "start": round(wall_start, 6), "ms": round(duration * 1000, 3), **attrs,
+            }, default=str))
+
+    def summary(self):
+        """{stage: {count, p50_ms, p95_ms}} over the most recent samples"""
+        with self._lock:
+            snapshot = {name: list(values) for name, values in self.samples.items()}
+        return {
+            name: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+            }
+            for name, values in sorted(snapshot.items())
+        }
+
+
+tracer = Tracer()
+span = tracer.span
+record = tracer.record
+configure = tracer.configure
+summary = tracer.summary
+
+
+def traced(name):
+    """Decorator that wraps a sync or async function in a span"""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await fn(*args, **kwargs)
+                with Span(tracer, name, {}):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with Span(tracer, name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
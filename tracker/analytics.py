@@ -0,0 +1,289 @@
+"""
+Historical usage analytics over tracker_data.
+
+Old daily tracker files are compacted into a columnar archive of per-minute
+rollups, so range queries (counts, peak RPM, latency percentiles) read a few
+kilobytes per day instead of every raw timestamp:
+
+    archive/index.json     ordered list of archived days (row i <-> day i)
+    archive/requests.u16   1440 request counts per day (one per minute)
+    archive/tokens.u32     1440 token counts per day
+    archive/latency.u32    LATENCY_BINS log-scale latency histogram per day
+
+GroqRequestTracker compacts finished days on a background thread when it
+starts; --compact does the same by hand.
+
+    python -m tracker.analytics --compact [--delete-raw]
+    python -m tracker.analytics --days 7
+    python -m tracker.analytics --start 2025-09-01 --end 2025-09-30
+"""
+import os
+import json
+import time
+import argparse
+from array import array
+from pathlib import Path
+from datetime import date, datetime, timedelta
+from tracker.tracker import read_day_entries
+
+MINUTES_PER_DAY = 1440
+# Latency histogram: bin i covers up to LATENCY_BASE_MS * LATENCY_GROWTH**i ms; the last bin is overflow
+LATENCY_BASE_MS = 10.0
+LATENCY_GROWTH = 1.25
+LATENCY_BINS = 50
+# A compaction lock older than this was left by a crashed process
+STALE_LOCK_SECONDS = 600
+
+COLUMNS = {
+    "requests": ("H", MINUTES_PER_DAY),
+    "tokens": ("I", MINUTES_PER_DAY),
+    "latency": ("I", LATENCY_BINS),
+}
+
+
+def latency_bin(ms):
+    bound, i = LATENCY_BASE_MS, 0
+    while ms > bound and i < LATENCY_BINS - 1:
+        bound *= LATENCY_GROWTH
+        i += 1
+    return i
+
+
+def latency_bound(i):
+    return LATENCY_BASE_MS * LATENCY_GROWTH ** i
+
+
+def rollup_day(store_dir, day):
+    """Per-minute request/token counts and a latency histogram for one day's raw files"""
+    requests = array("H", [0]) * MINUTES_PER_DAY
+    tokens = array("I", [0]) * MINUTES_PER_DAY
+    latency = array("I", [0]) * LATENCY_BINS
+    midnight = datetime.combine(day, datetime.min.time()).timestamp()
+
+    for ts, used, latency_ms in read_day_entries(store_dir, datetime.combine(day, datetime.min.time())):
+        minute = min(MINUTES_PER_DAY - 1, max(0, int((ts - midnight) // 60)))
+        requests[minute] = min(requests[minute] + 1, 0xFFFF)
+        if used:
+            tokens[minute] += used
+        if latency_ms is not None:
+            latency[latency_bin(latency_ms)] += 1
+    return {"requests": requests, "tokens": tokens, "latency": latency}
+
+
+def raw_days(store_dir):
+    """Days that still have raw tracker_YYYY-MM-DD.{json,log} files"""
+    days = set()
+    for path in Path(store_dir).glob("tracker_*.*"):
+        if path.suffix not in (".json", ".log"):
+            continue
+        try:
+            days.add(datetime.strptime(path.stem[len("tracker_"):], "%Y-%m-%d").date())
+        except ValueError:
+            continue
+    return sorted(days)
+
+
+class UsageArchive:
+    """Columnar, append-only archive of per-minute rollups for compacted days"""
+
+    def __init__(self, store_dir="tracker/tracker_data"):
+        self.store_dir = Path(store_dir)
+        self.dir = self.store_dir / "archive"
+        self.index_file = self.dir / "index.json"
+        self._load_index()
+
+    def _column_file(self, name):
+        return self.dir / f"{name}.{'u16' if COLUMNS[name][0] == 'H' else 'u32'}"
+
+    def _row_bytes(self, name):
+        typecode, width = COLUMNS[name]
+        return array(typecode).itemsize * width
+
+    def _load_index(self):
+        self.days = []
+        if self.index_file.exists():
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                self.days = json.load(f)["days"]
+        self.rows = {day: row for row, day in enumerate(self.days)}
+
+    def _acquire_lock(self):
+        """Take the archive's lock file; False if another process is compacting"""
+        lock = self.dir / "compact.lock"
+        for _ in range(2):
+            try:
+                os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - lock.stat().st_mtime < STALE_LOCK_SECONDS:
+                        return False
+                    lock.unlink()
+                except FileNotFoundError:
+                    pass
+        return False
+
+    def compact(self, before=None, delete_raw=False):
+        """
+        Roll up every raw day before `before` (default today) into the archive;
+        returns the days added. Raw daily files are kept unless delete_raw.
+        Returns [] without waiting if another process is compacting.
+        """
+        before = before or date.today()
+        pending = [day for day in raw_days(self.store_dir) if day < before and day.isoformat() not in self.rows]
+        if not pending:
+            return []
+
+        self.dir.mkdir(exist_ok=True)
+        if not self._acquire_lock():
+            return []
+        try:
+            # Another process may have compacted since this archive was opened
+            self._load_index()
+            pending = [day for day in pending if day.isoformat() not in self.rows]
+            if not pending:
+                return []
+            self._append(pending)
+        finally:
+            (self.dir / "compact.lock").unlink(missing_ok=True)
+
+        if delete_raw:
+            for day in pending:
+                for suffix in (".json", ".log"):
+                    path = self.store_dir / f"tracker_{day.isoformat()}{suffix}"
+                    if path.exists():
+                        path.unlink()
+        return pending
+
+    def _append(self, pending):
+        rollups = [(day, rollup_day(self.store_dir, day)) for day in pending]
+        for name in COLUMNS:
+            path = self._column_file(name)
+            with open(path, "ab") as f:
+                # Drop rows written by a compaction that crashed before updating the index
+                f.truncate(len(self.days) * self._row_bytes(name))
+                for _, rollup in rollups:
+                    rollup[name].tofile(f)
+
+        self.days.extend(day.isoformat() for day in pending)
+        self.rows = {day: row for row, day in enumerate(self.days)}
+        tmp = self.index_file.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "days": self.days}, f)
+        tmp.replace(self.index_file)
+
+    def _read_row(self, name, row):
+        typecode, width = COLUMNS[name]
+        values = array(typecode)
+        with open(self._column_file(name), "rb") as f:
+            f.seek(row * self._row_bytes(name))
+            values.fromfile(f, width)
+        return values
+
+    def day_rollup(self, day):
+        """Rollup for a day from the archive, or computed from raw files if not compacted yet"""
+        row = self.rows.get(day.isoformat())
+        if row is not None:
+            return {name: self._read_row(name, row) for name in COLUMNS}
+        return rollup_day(self.store_dir, day)
+
+    def query(self, start, end):
+        """Totals, busiest minute and latency percentiles for the inclusive date range"""
+        raw = set(raw_days(self.store_dir))
+        latency = [0] * LATENCY_BINS
+        per_day = {}
+        total_requests = total_tokens = 0
+        peak = (0, None)
+
+        day = start
+        while day <= end:
+            if day.isoformat() in self.rows or day in raw:
+                rollup = self.day_rollup(day)
+                requests = sum(rollup["requests"])
+                if requests:
+                    per_day[day.isoformat()] = requests
+                    total_requests += requests
+                    total_tokens += sum(rollup["tokens"])
+                    busiest = max(range(MINUTES_PER_DAY), key=rollup["requests"].__getitem__)
+                    if rollup["requests"][busiest] > peak[0]:
+                        peak = (rollup["requests"][busiest],
+                                datetime.combine(day, datetime.min.time()) + timedelta(minutes=busiest))
+                for i, count in enumerate(rollup["latency"]):
+                    latency[i] += count
+            day += timedelta(days=1)
+
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "requests": total_requests,
+            "tokens": total_tokens,
+            "active_days": len(per_day),
+            "per_day": per_day,
+            "peak_rpm": peak[0],
+            "peak_at": peak[1].strftime("%Y-%m-%d %H:%M") if peak[1] else None,
+            "latency_ms": {f"p{q}": histogram_percentile(latency, q) for q in (50, 95, 99)},
+        }
+
+    def last_days(self, days=7):
+        end = date.today()
+        return self.query(end - timedelta(days=days - 1), end)
+
+
+def compact_finished_days(store_dir="tracker/tracker_data"):
+    """Compact every raw day before today, e.g. at startup; returns the days added"""
+    try:
+        return UsageArchive(store_dir).compact()
+    except (OSError, ValueError, KeyError):
+        return []  # a damaged archive shouldn't stop the tracker; --compact reports the error
+
+
+def histogram_percentile(histogram, q):
+    """Upper bound (ms) of the latency bin holding the q-th percentile, or None without samples"""
+    total = sum(histogram)
+    if not total:
+        return None
+    threshold = total * q / 100.0
+    seen = 0
+    for i, count in enumerate(histogram):
+        seen += count
+        if seen >= threshold:
+            return round(latency_bound(i))
+    return round(latency_bound(LATENCY_BINS - 1))
+
+
+def format_summary(summary):
+    latency = summary["latency_ms"]
+    lines = [
+        f"Usage {summary['start']} to {summary['end']}:",
+        f"  Requests: {summary['requests']} over {summary['active_days']} active day(s), tokens: {summary['tokens']}",
+        f"  Peak RPM: {summary['peak_rpm']}" + (f" at {summary['peak_at']}" if summary["peak_at"] else ""),
+    ]
+    if latency["p50"] is not None:
+        lines.append(f"  Latency p50/p95/p99: <= {latency['p50']} / {latency['p95']} / {latency['p99']} ms")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store-dir", default="tracker/tracker_data")
+    parser.add_argument("--compact", action="store_true", help="roll up raw files from before today into the archive")
+    parser.add_argument("--delete-raw", action="store_true", help="delete raw daily files once compacted")
+    parser.add_argument("--days", type=int, default=7, help="summarize the last N days (default 7)")
+    parser.add_argument("--start", type=date.fromisoformat, help="range start, YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, help="range end, YYYY-MM-DD (default today)")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    archive = UsageArchive(args.store_dir)
+    if args.compact:
+        added = archive.compact(delete_raw=args.delete_raw)
+        print(f"Compacted {len(added)} day(s) into {archive.dir}")
+
+    if args.start:
+        summary = archive.query(args.start, args.end or date.today())
+    else:
+        summary = archive.last_days(args.days)
+    print(json.dumps(summary, indent=2) if args.json else format_summary(summary))
+
+
+if __name__ == "__main__":
+    main()
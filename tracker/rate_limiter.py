@@ -0,0 +1,211 @@
+import time
+import asyncio
+import threading
+from collections import deque
+
+
+class SystemClock:
+    def time(self):
+        return time.monotonic()
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+class FakeClock:
+    """Deterministic clock for exercising limits: sleeping just moves time forward"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    async def sleep(self, seconds):
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+class TokenBucket:
+    """Holds up to `capacity` units, refilled continuously over `period` seconds"""
+
+    def __init__(self, name, capacity, period, clock):
+        self.name = name
+        self.capacity = float(capacity)
+        self.rate = capacity / period
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock.time()
+
+    def _refill(self):
+        now = self.clock.time()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` units are available (requests larger than the bucket wait for a full one)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self._refill()
+        self.tokens -= amount
+
+    def utilization(self):
+        self._refill()
+        return max(0.0, 1 - self.tokens / self.capacity)
+
+
+class RateLimiter:
+    """
+    Client-side admission control for provider limits. Requests per minute/day
+    and tokens per minute/day each get a token bucket; callers of `acquire`
+    are admitted strictly in arrival order, and whoever is at the head sleeps
+    until every bucket can cover its request. Token reservations use an
+    estimate and are corrected with the real usage in `settle`.
+
+    The FIFO is built from per-caller futures woken with call_soon_threadsafe,
+    so callers on different event loops (the GUI makes one per message) can
+    share a limiter.
+    """
+
+    def __init__(self, rpm=None, rpd=None, tpm=None, tpd=None, clock=None, on_pressure=None):
+        self.clock = clock or SystemClock()
+        self.on_pressure = on_pressure
+        self.request_buckets = [TokenBucket(name, limit, period, self.clock) for name, limit, period in
+                                (("rpm", rpm, 60), ("rpd", rpd, 86400)) if limit]
+        self.token_buckets = [TokenBucket(name, limit, period, self.clock) for name, limit, period in
+                              (("tpm", tpm, 60), ("tpd", tpd, 86400)) if limit]
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self.blocked_on = None
+        self.wait_seconds = 0.0
+        self.total_waited = 0.0
+
+    def _wait_time(self, tokens):
+        """Longest wait across all buckets and the bucket responsible for it"""
+        worst, name = 0.0, None
+        for bucket in self.request_buckets:
+            wait = bucket.wait_time(1)
+            if wait > worst:
+                worst, name = wait, bucket.name
+        for bucket in self.token_buckets:
+            wait = bucket.wait_time(tokens)
+            if wait > worst:
+                worst, name = wait, bucket.name
+        return worst, name
+
+    async def acquire(self, tokens=0):
+        """Wait for this caller's turn and for capacity, then reserve one request and `tokens`"""
+        loop = asyncio.get_running_loop()
+        ticket = loop.create_future()
+        with self._lock:
+            self._queue.append((loop, ticket))
+            if len(self._queue) == 1:
+                ticket.set_result(None)
+        self._signal()
+
+        try:
+            await ticket
+            waited = 0.0
+            while True:
+                with self._lock:
+                    wait, name = self._wait_time(tokens)
+                    if wait <= 0:
+                        for bucket in self.request_buckets:
+                            bucket.consume(1)
+                        for bucket in self.token_buckets:
+                            bucket.consume(tokens)
+                        self.blocked_on, self.wait_seconds = None, 0.0
+                        break
+                    self.blocked_on, self.wait_seconds = name, wait
+                self._signal()
+                await self.clock.sleep(wait)
+                waited += wait
+            self.total_waited += waited
+        finally:
+            self._leave(ticket)
+            self._signal()
+
+    def _leave(self, ticket):
+        with self._lock:
+            if self._queue and self._queue[0][1] is ticket:
+                self._queue.popleft()
+                self._wake_head()
+            else:
+                # Cancelled before reaching the head of the queue
+                self._queue = deque(entry for entry in self._queue if entry[1] is not ticket)
+
+    def _wake_head(self):
+        """Hand the turn to the first waiter whose event loop is still open (lock held)"""
+        while self._queue:
+            next_loop, next_ticket = self._queue[0]
+            try:
+                next_loop.call_soon_threadsafe(_wake, next_ticket)
+                return
+            except RuntimeError:
+                # Its loop closed while it queued (the GUI makes one per message); nobody is waiting there
+                self._queue.popleft()
+
+    def settle(self, estimated, actual):
+        """Correct a reservation once the response reports how many tokens it really used"""
+        with self._lock:
+            for bucket in self.token_buckets:
+                bucket.consume(actual - estimated)
+
+    def pressure(self):
+        """Back-pressure snapshot for the UI"""
+        with self._lock:
+            buckets = self.request_buckets + self.token_buckets
+            return {
+                "waiting": len(self._queue),
+                "blocked_on": self.blocked_on,
+                "wait_seconds": round(self.wait_seconds, 2),
+                "utilization": {b.name: round(b.utilization(), 3) for b in buckets},
+            }
+
+    def _signal(self):
+        if self.on_pressure is not None:
+            try:
+                self.on_pressure(self.pressure())
+            except Exception:
+                pass
+
+
+def _wake(ticket):
+    if not ticket.done():
+        ticket.set_result(None)
+
+
+def extract_token_usage(response):
+    """
+    Total tokens reported by an LLM or agent response, or None. Understands
+    Ollama's prompt_eval_count/eval_count and OpenAI/Groq style `usage`.
+    """
+    candidates = [response, getattr(response, "raw", None), getattr(response, "additional_kwargs", None)]
+    message = getattr(response, "message", None)
+    if message is not None:
+        candidates.append(getattr(message, "additional_kwargs", None))
+
+    for item in candidates:
+        if item is None:
+            continue
+        data = item if isinstance(item, dict) else getattr(item, "__dict__", {})
+        usage = data.get("usage")
+        if usage is not None:
+            usage = usage if isinstance(usage, dict) else getattr(usage, "__dict__", {})
+            if usage.get("total_tokens"):
+                return int(usage["total_tokens"])
+        if data.get("total_tokens"):
+            return int(data["total_tokens"])
+        if data.get("prompt_tokens") or data.get("completion_tokens"):
+            return int(data.get("prompt_tokens") or 0) + int(data.get("completion_tokens") or 0)
+        if data.get("prompt_eval_count") or data.get("eval_count"):
+            return int(data.get("prompt_eval_count") or 0) + int(data.get("eval_count") or 0)
+    return None
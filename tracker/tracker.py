@@ -1,54 +1,260 @@
 import time
 import json
-from collections import deque
+import atexit
+import threading
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
+from tracker.rate_limiter import RateLimiter, extract_token_usage
+
+
+class RingCounter:
+    """
+    Event counts over a sliding window split into fixed-width time buckets.
+    Adding an event and reading the window total are O(1) amortized: moving
+    forward only clears the buckets that fell out of the window.
+    """
+
+    def __init__(self, buckets, width):
+        self.size = buckets
+        self.width = width
+        self.counts = [0] * buckets
+        self.head = None
+        self.total = 0
+
+    def _advance(self, bucket):
+        if self.head is None:
+            self.head = bucket
+            return
+        if bucket <= self.head:
+            return
+        for step in range(1, min(bucket - self.head, self.size) + 1):
+            slot = (self.head + step) % self.size
+            self.total -= self.counts[slot]
+            self.counts[slot] = 0
+        self.head = bucket
+
+    def add(self, ts, n=1):
+        bucket = int(ts // self.width)
+        self._advance(bucket)
+        if bucket <= self.head - self.size:
+            return
+        self.counts[bucket % self.size] += n
+        self.total += n
+
+    def count(self, now):
+        self._advance(int(now // self.width))
+        return self.total
+
 
 class GroqRequestTracker:
-    def __init__(self, store_dir="tracker/tracker_data"):
+    """
+    Counts requests and tokens per minute / per day and persists them to an
+    append-only log, one "timestamp[<TAB>tokens<TAB>latency_ms]" line per
+    request in tracker_YYYY-MM-DD.log. Lines are buffered and written in batches (every
+    `flush_every` requests or `flush_interval` seconds, and at exit) by a
+    background thread, so recording stays off the disk. With flush_interval=0
+    there is no thread and full batches are written by the recording call.
+
+    With `limits` (any of rpm, rpd, tpm, tpd) send_request also acts as an
+    admission controller: callers queue fairly until the provider limits
+    allow another request, and `on_pressure` is called with a snapshot
+    whenever the queue or wait changes.
+
+    With `compact_history` (the default) days before today are rolled up into
+    the usage archive (tracker/analytics.py) on a background thread at start,
+    so history queries don't parse their raw files.
+    """
+
+    def __init__(self, store_dir="tracker/tracker_data", flush_every=50, flush_interval=5.0,
+                 limits=None, clock=None, on_pressure=None, estimated_tokens=1000, compact_history=True):
         self.store_dir = Path(store_dir)
         self.store_dir.mkdir(exist_ok=True)
-        
-        self.today_str = datetime.now().strftime("%Y-%m-%d")
-        self.store_file = self.store_dir / f"tracker_{self.today_str}.json"
-        
-        self.request_times = deque()
-        self._load_today_file()
-
-    def _load_today_file(self):
-        if self.store_file.exists():
-            try:
-                data = json.load(self.store_file.open("r"))
-                self.request_times = deque(data)
-            except Exception:
-                self.request_times = deque()
+        self.flush_every = flush_every
+
+        self.minute = RingCounter(60, 1.0)       # per-second buckets, RPM
+        self.day = RingCounter(1440, 60.0)       # per-minute buckets, RPD
+        self.minute_tokens = RingCounter(60, 1.0)
+        self.day_tokens = RingCounter(1440, 60.0)
+        self.estimated_tokens = float(estimated_tokens)
+        self.limits = dict(limits or {})
+        self.limiter = RateLimiter(**limits, clock=clock, on_pressure=on_pressure) if limits else None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flush_requested = threading.Event()
+        self._flusher = None
+        self._compactor = None
+
+        self._load_recent()
+
+        if compact_history:
+            self._compactor = threading.Thread(target=self._compact_history, daemon=True)
+            self._compactor.start()
 
-    def _cleanup(self):
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_loop, args=(flush_interval,), daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
+    @property
+    def store_file(self):
+        return self.log_path(datetime.now())
+
+    def log_path(self, day):
+        return self.store_dir / f"tracker_{day.strftime('%Y-%m-%d')}.log"
+
+    def _load_recent(self):
+        """Seed the counters with the last 24h from today's and yesterday's files"""
         now = time.time()
-        while self.request_times and now - self.request_times[0] > 86400:
-            self.request_times.popleft()
+        today = datetime.now()
+        entries = []
+        for day in (today - timedelta(days=1), today):
+            entries.extend(read_day_entries(self.store_dir, day))
+        for ts, tokens, _ in sorted(entries, key=lambda entry: entry[0]):
+            if now - ts <= 86400:
+                self._count(ts, tokens)
+
+    def _compact_history(self):
+        # analytics imports this module, so it's loaded here rather than at the top
+        from tracker.analytics import compact_finished_days
+        compact_finished_days(self.store_dir)
+
+    def _count(self, ts, tokens):
+        self.minute.add(ts)
+        self.day.add(ts)
+        if tokens:
+            self.minute_tokens.add(ts, tokens)
+            self.day_tokens.add(ts, tokens)
+
+    def record(self, ts=None, tokens=None, latency=None):
+        """Count one request (now by default) and queue it for the log; latency is in seconds"""
+        ts = time.time() if ts is None else ts
+        line = f"{ts:.6f}"
+        if tokens or latency is not None:
+            line += f"\t{tokens or ''}"
+        if latency is not None:
+            line += f"\t{round(latency * 1000)}"
+        with self._lock:
+            self._count(ts, tokens)
+            self._pending.append(line + "\n")
+            should_flush = len(self._pending) >= self.flush_every
+        if should_flush:
+            if self._flusher is not None:
+                # record() runs on the event loop; the file write belongs to the flush thread
+                self._flush_requested.set()
+            else:
+                self.flush()
+
+    @property
+    def on_pressure(self):
+        return self.limiter.on_pressure if self.limiter else None
+
+    @on_pressure.setter
+    def on_pressure(self, callback):
+        if self.limiter is not None:
+            self.limiter.on_pressure = callback
 
     async def send_request(self, api_func, *args, **kwargs):
-        today_str = datetime.now().strftime("%Y-%m-%d")
-        if today_str != self.today_str:
-            self.today_str = today_str
-            self.store_file = self.store_dir / f"tracker_{self.today_str}.json"
-            self.request_times = deque()
-        
+        estimate = await self.admit()
+        started = time.perf_counter()
         result = await api_func(*args, **kwargs)
-        self.request_times.append(time.time())
-        self._save_today_file()
+        self.complete(estimate, extract_token_usage(result), time.perf_counter() - started)
         return result
-    
-    def _save_today_file(self):
-        json.dump(list(self.request_times), self.store_file.open("w"))
+
+    async def admit(self):
+        """Wait for the limiter's go-ahead; returns the token estimate reserved for the request"""
+        estimate = int(self.estimated_tokens)
+        if self.limiter is not None:
+            await self.limiter.acquire(estimate if self.limiter.token_buckets else 0)
+        return estimate
+
+    def complete(self, estimate, tokens, latency):
+        """
+        Account for a finished request admitted with `estimate`: settle the
+        reservation against the reported usage (None if unknown) and record it.
+        Streams call this when their last chunk arrives.
+        """
+        if tokens is not None:
+            self.estimated_tokens = 0.8 * self.estimated_tokens + 0.2 * tokens
+            if self.limiter is not None:
+                self.limiter.settle(estimate, tokens)
+        self.record(tokens=tokens, latency=latency)
+
+    def flush(self):
+        """Append buffered timestamps to their day's log file"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        by_day = {}
+        for line in pending:
+            ts = float(line.split("\t", 1)[0])
+            by_day.setdefault(self.log_path(datetime.fromtimestamp(ts)), []).append(line)
+        for path, lines in by_day.items():
+            with open(path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+    def _flush_loop(self, interval):
+        while not self._stop.is_set():
+            self._flush_requested.wait(interval)
+            self._flush_requested.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def close(self):
+        self._stop.set()
+        self._flush_requested.set()
+        self.flush()
 
     def get_stats(self):
-        self._cleanup()
-        rpm = sum(1 for t in self.request_times if time.time() - t <= 60)
-        rpd = len(self.request_times)
-        return {
-            "RPM": rpm,
-            "RPD": rpd,
-            "File": str(self.store_file)
-        }
+        now = time.time()
+        with self._lock:
+            stats = {
+                "RPM": self.minute.count(now),
+                "RPD": self.day.count(now),
+                "TPM": self.minute_tokens.count(now),
+                "TPD": self.day_tokens.count(now),
+            }
+        stats["File"] = str(self.store_file)
+        if self.limiter is not None:
+            stats["Pressure"] = self.limiter.pressure()
+        return stats
+
+
+def read_day_entries(store_dir, day):
+    """
+    (timestamp, tokens, latency_ms) for every request recorded on a day, from
+    the log and any legacy JSON file. Unknown tokens/latency are None.
+    """
+    store_dir = Path(store_dir)
+    stem = f"tracker_{day.strftime('%Y-%m-%d')}"
+    entries = []
+
+    legacy = store_dir / f"{stem}.json"
+    if legacy.exists():
+        try:
+            with open(legacy, "r", encoding="utf-8") as f:
+                entries.extend((float(ts), None, None) for ts in json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    log = store_dir / f"{stem}.log"
+    if log.exists():
+        with open(log, "r", encoding="utf-8") as f:
+            for line in f:
+                fields = line.rstrip("\n").split("\t") + ["", ""]
+                try:
+                    entries.append((float(fields[0]), int(fields[1]) if fields[1] else None,
+                                    int(fields[2]) if fields[2] else None))
+                except ValueError:
+                    continue  # torn write from a crash
+    return entries
+
+
+def read_day(store_dir, day):
+    """All request timestamps recorded on a day"""
+    return [ts for ts, _, _ in read_day_entries(store_dir, day)]